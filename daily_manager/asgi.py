@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from tasks.handlers import get_asgi_application # Handler com o perfil enxuto de middleware para /api/
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'daily_manager.settings')
 
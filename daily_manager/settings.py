@@ -148,6 +148,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.instrumentation.RequestMetricsMiddleware', # Métricas por requisição (Server-Timing, /api/_metrics); fica por fora para medir tudo
+    'corsheaders.middleware.CorsMiddleware', # Middleware do CORS (o mais no início possível: responde os preflights sem passar pelo resto)
     'django.middleware.security.SecurityMiddleware', # Segurança básica
     'django.contrib.sessions.middleware.SessionMiddleware', # Sessões
     'django.middleware.common.CommonMiddleware', # Funcionalidades comuns
@@ -155,9 +157,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware', # Autenticação
     'django.contrib.messages.middleware.MessageMiddleware', # Mensagens
     'django.middleware.clickjacking.XFrameOptionsMiddleware', # Proteção clickjacking
-    'corsheaders.middleware.CorsMiddleware', # Middleware do CORS (deve ser o primeiro)
 ]
 
+# Perfil enxuto da API (ver tasks/handlers.py): as requisições de API_MIDDLEWARE_PATHS passam só
+# por API_MIDDLEWARE; o resto (ex.: /admin/) continua com MIDDLEWARE. 'full' usa MIDDLEWARE para tudo.
+API_MIDDLEWARE_PROFILE = env.str('API_MIDDLEWARE_PROFILE', default='lean')
+API_MIDDLEWARE_PATHS = ('/api/',)
+API_MIDDLEWARE = [
+    'tasks.instrumentation.RequestMetricsMiddleware', # Métricas por requisição
+    'corsheaders.middleware.CorsMiddleware', # CORS, com os preflights respondidos aqui
+    'django.middleware.security.SecurityMiddleware', # Cabeçalhos de segurança (nosniff, HSTS)
+    'django.middleware.common.CommonMiddleware', # APPEND_SLASH e DISALLOWED_USER_AGENTS
+] # Sem sessões, CSRF, AuthenticationMiddleware e mensagens: a API autentica por JWT no cabeçalho
+
 ROOT_URLCONF = 'daily_manager.urls' # Arquivo principal de rotas (urls.py)
 
 TEMPLATES = [
@@ -188,6 +200,16 @@ DATABASES = {
     )
 }
 
+# Réplicas de leitura opcionais para as listagens e agregações de /api/tasks/ e /api/finances/ (ver tasks/replicas.py).
+# URLs separadas por vírgula; localmente, basta uma cópia do banco: DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+for index, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    DATABASES[f'replica{index}'] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}} # Nos testes, a réplica é o próprio banco
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['tasks.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=5) # Depois de uma escrita, o usuário lê do primário por N segundos
+REPLICA_HEALTH_CHECK_SECONDS = env.int('REPLICA_HEALTH_CHECK_SECONDS', default=10) # Intervalo entre testes de saúde de cada réplica (por processo)
+REPLICA_MAX_LAG_SECONDS = env.float('REPLICA_MAX_LAG_SECONDS', default=30) # PostgreSQL: réplica mais atrasada que isso volta para o primário (0 desliga)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -235,21 +257,77 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField' # Tipo padrão de campo aut
 # Configuração do Django REST Framework para usar JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tasks.authentication.CachedJWTAuthentication', # JWT com o usuário em cache (ver tasks/authentication.py)
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
 
+# Paginação por cursor das listas /api/tasks/ e /api/finances/ (ver tasks/pagination.py)
+API_PAGINATE_BY_DEFAULT = env.bool('API_PAGINATE_BY_DEFAULT', default=False) # Se True, pagina sem precisar de ?page_size=
+API_PAGE_SIZE = env.int('API_PAGE_SIZE', default=50) # Itens por página quando page_size não é informado
+API_MAX_PAGE_SIZE = env.int('API_MAX_PAGE_SIZE', default=500) # Teto para ?page_size=
+API_BULK_MAX_ITEMS = env.int('API_BULK_MAX_ITEMS', default=500) # Máximo de itens por ação em lote (bulk_*)
+API_IMPORT_BATCH_SIZE = env.int('API_IMPORT_BATCH_SIZE', default=1000) # Linhas por transação nas importações (import_data / import/)
+
+# Política da camada fria (manage.py archive_data, ver tasks/archiving.py); 0 desliga
+ARCHIVE_TASKS_AFTER_DAYS = env.int('ARCHIVE_TASKS_AFTER_DAYS', default=180) # Tarefas concluídas há mais de N dias
+ARCHIVE_FINANCES_AFTER_DAYS = env.int('ARCHIVE_FINANCES_AFTER_DAYS', default=0) # Lançamentos com mais de N dias
+
+# Sincronização incremental do cliente offline (/api/sync/, ver tasks/sync.py)
+API_SYNC_PAGE_SIZE = env.int('API_SYNC_PAGE_SIZE', default=500) # Alterações por página (teto: API_MAX_PAGE_SIZE)
+SYNC_TOMBSTONE_DAYS = env.int('SYNC_TOMBSTONE_DAYS', default=90) # Exclusões guardadas por N dias (0 = para sempre); tokens mais antigos recebem reset
+
+# Fila de trabalhos em segundo plano (manage.py run_worker, ver tasks/jobs.py)
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=3) # Tentativas antes de marcar o trabalho como falho
+JOB_LEASE_SECONDS = env.int('JOB_LEASE_SECONDS', default=1800) # Depois disso, um trabalho "running" de um worker que morreu volta para a fila
+JOB_RETENTION_DAYS = env.int('JOB_RETENTION_DAYS', default=7) # Trabalhos terminados (e seus arquivos) são descartados depois de N dias
+MEDIA_ROOT = env('MEDIA_ROOT', default=str(BASE_DIR / 'media')) # Arquivos gerados pelos trabalhos (exportações); com vários servidores, use um storage compartilhado (STORAGES)
+
+# Cache das respostas GET de /api/tasks/ e /api/finances/ (ver tasks/caching.py).
+# O backend é plugável via API_CACHE_URL (ex.: redis://...); o padrão é memória local com limite de entradas.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://default'),
+    'api': {
+        **env.cache_url('API_CACHE_URL', default='locmemcache://api-responses'),
+        'OPTIONS': {'MAX_ENTRIES': env.int('API_CACHE_MAX_ENTRIES', default=1000)}, # Limite de entradas antes de descartar as antigas
+    },
+}
+API_CACHE_ALIAS = 'api' # Alias em CACHES usado pelo cache de respostas
+API_CACHE_ENABLED = env.bool('API_CACHE_ENABLED', default=True)
+API_CACHE_TIMEOUT = env.int('API_CACHE_TIMEOUT', default=300) # Segundos
+
+# Instrumentação por requisição (ver tasks/instrumentation.py)
+API_METRICS_ENABLED = env.bool('API_METRICS_ENABLED', default=True) # Server-Timing e histogramas de /api/_metrics
+API_METRICS_LOG_SAMPLE_RATE = env.float('API_METRICS_LOG_SAMPLE_RATE', default=0.0) # Fração das requisições registradas no log "tasks.metrics" (0 a 1)
+API_SLOW_QUERY_MS = env.float('API_SLOW_QUERY_MS', default=0) # Consultas acima deste tempo vão para o log "tasks.slow_queries" (0 desativa)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'tasks': {'handlers': ['console'], 'level': env('TASKS_LOG_LEVEL', default='INFO')},
+    },
+}
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'tasks.authentication.TokenObtainPairWithClaimsSerializer', # Claims usadas no modo stateless
 }
 
+# Resolução do usuário do JWT (ver tasks/authentication.py)
+API_AUTH_CACHE_TIMEOUT = env.int('API_AUTH_CACHE_TIMEOUT', default=60) # Segundos; atraso máximo para outros workers verem desativação/troca de senha (0 desliga)
+API_AUTH_CACHE_MAX_ENTRIES = env.int('API_AUTH_CACHE_MAX_ENTRIES', default=1000) # Usuários mantidos por processo
+API_AUTH_STATELESS = env.bool('API_AUTH_STATELESS', default=False) # Confia só nas claims assinadas do token, sem ler o usuário
+
 # Configuração do CORS para aceitar requisições do frontend hospedado no Render e localmente
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
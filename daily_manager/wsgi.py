@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from tasks.handlers import get_wsgi_application # Handler com o perfil enxuto de middleware para /api/
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'daily_manager.settings')
 
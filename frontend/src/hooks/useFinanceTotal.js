@@ -20,14 +20,9 @@ export default function useFinanceTotal(type, date, refresh = 0) {
       start = date.startOf('month').format('YYYY-MM-DD');
       end = date.endOf('month').format('YYYY-MM-DD');
     }
-    authFetch(`/api/finances/by_day/?start=${start}&end=${end}`)      .then(res => res.json())
-      .then(data => {
-        let sum = 0;
-        data.forEach(item => {
-          sum += parseFloat(item.total);
-        });
-        setTotal(sum);
-      })
+    // A soma é feita no backend (um único número em vez de uma linha por dia)
+    authFetch(`/api/finances/totals/?start=${start}&end=${end}`)      .then(res => res.json())
+      .then(data => setTotal(parseFloat(data.total) || 0))
       .catch(() => setTotal(0));
   }, [type, date, refresh]);
   return total;
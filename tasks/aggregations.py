@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.db.models import Count, DateField, F, Func, Q, Sum, Window
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+# Agregações calculadas diretamente no banco de dados.
+# Evitam carregar todas as linhas em Python só para devolver poucos números.
+# As funções *_rows devolvem querysets preguiçosos, consumidos tanto pelas views
+# síncronas (for) quanto pelas assíncronas (async for, ver tasks/async_views.py).
+
+
+def progress_rows(queryset):
+    """Linhas (dia local, total, concluídas) agrupadas pelo dia local de criação."""
+    tz = timezone.get_default_timezone() # America/Sao_Paulo (settings.TIME_ZONE)
+    return (
+        queryset.order_by() # Remove ordenação para não interferir no GROUP BY
+        .annotate(day=TruncDate('created_at', tzinfo=tz)) # Dia local de criação
+        .values('day')
+        .annotate(
+            total=Count('id'), # Total de tarefas no dia
+            done=Count('id', filter=Q(is_completed=True)), # Tarefas concluídas no dia
+        )
+        .order_by('day')
+        .values_list('day', 'total', 'done')
+    )
+
+
+def progress_from_rows(rows):
+    """{'YYYY-MM-DD': proporção de concluídas} a partir de linhas (dia, total, concluídas)."""
+    return {day.strftime('%Y-%m-%d'): done / total if total else 0 for day, total, done in rows}
+
+
+def progress_by_day(queryset):
+    """Retorna {'YYYY-MM-DD': proporção de tarefas concluídas} agrupando pelo dia local de criação."""
+    return progress_from_rows(progress_rows(queryset))
+
+
+def finance_sums_by_day(queryset):
+    """[{'created_at__date': dia, 'total': soma}] ordenado por dia (formato de /api/finances/by_day/)."""
+    return (
+        queryset.values('created_at__date')
+        .annotate(total=Sum('value'))
+        .order_by('created_at__date')
+    )
+
+
+# Granularidades de /api/finances/series/ (semanas começam na segunda-feira)
+GRANULARITIES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+CENTS = Decimal('0.01')
+
+
+class RunningSum(Func):
+    """SUM(...) OVER (...) sobre um agregado; o Sum do Django não aceita outro agregado dentro."""
+    function = 'SUM'
+    window_compatible = True
+
+
+def bucket_start(field, granularity, tz=None):
+    """Início do período (date) que contém field, truncado no banco (no fuso tz, se for datetime)."""
+    return GRANULARITIES[granularity](field, tzinfo=tz, output_field=DateField())
+
+
+def finance_sums(value='value'):
+    """Agregações de um período: saldo, entradas (valores positivos) e quantidade."""
+    return {'total': Sum(value), 'income': Sum(value, filter=Q(**{f'{value}__gt': 0})), 'count': Count(value)}
+
+
+def with_running_balance(rows):
+    """Acrescenta o saldo acumulado por período (função de janela sobre o agregado)."""
+    return rows.annotate(running=Window(RunningSum(F('total')), order_by=F('bucket').asc())).order_by('bucket')
+
+
+def finance_bucket_rows(queryset, granularity, tz):
+    """Linhas por período com saldo acumulado, direto dos lançamentos — uma única consulta."""
+    return with_running_balance(
+        queryset.order_by() # Remove ordenação para não interferir no GROUP BY
+        .values(bucket=bucket_start('created_at', granularity, tz))
+        .annotate(**finance_sums())
+    )
+
+
+def finance_tag_bucket_rows(queryset, granularity, tz):
+    """Linhas (período, tag, agregações) pelas tabelas de ligação; lançamentos sem tag ficam de fora."""
+    through = queryset.model._meta.get_field('normalized_tags').remote_field.through
+    return (
+        through.objects.filter(finance__in=queryset.order_by().values('pk'))
+        .values(bucket=bucket_start('finance__created_at', granularity, tz), tag_name=F('tag__name'))
+        .annotate(**finance_sums('finance__value'))
+        .order_by('bucket', 'tag_name')
+    )
+
+
+def money(value):
+    return (value or Decimal('0')).quantize(CENTS)
+
+
+def finance_bucket(row):
+    income = money(row['income'])
+    return {'total': money(row['total']), 'income': income, 'expense': money(row['total']) - income, 'count': row['count']}
+
+
+def finance_series(rows, opening=Decimal('0'), tag_rows=None):
+    """Lista de períodos de /api/finances/series/ a partir das linhas agregadas (lançamentos ou rollups)."""
+    tags = {}
+    for row in tag_rows or ():
+        tags.setdefault(row['bucket'], {})[row['tag_name']] = finance_bucket(row)
+    buckets = []
+    for row in rows:
+        bucket = {'start': row['bucket'].isoformat(), **finance_bucket(row), 'balance': money(opening + (row['running'] or 0))}
+        if tag_rows is not None:
+            bucket['tags'] = tags.get(row['bucket'], {})
+        buckets.append(bucket)
+    return buckets
@@ -0,0 +1,192 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connections, router
+
+from .archiving import filter_archive_tags
+from .filters import filter_by_tags, filter_window
+from .models import ArchivedTask, Tag, Task, TaskTag
+from .tagging import parse_tags
+
+# Tempo até a conclusão das tarefas (GET /api/tasks/analytics/).
+#
+# Agrupa as tarefas do usuário pelo período local de criação (coorte) e, em cada período e no total,
+# por tag ('' = todas): quantidade, concluídas, taxa de conclusão e percentis (p50/p90/p99)
+# e média do tempo entre created_at e completed_at, em segundos. Inclui o arquivo
+# (tasks/archiving.py), senão os períodos antigos só teriam as tarefas pendentes.
+#
+# - PostgreSQL: uma consulta com percentile_cont(...) WITHIN GROUP e GROUPING SETS
+#   (período+tag e só tag); as tags do arquivo saem do texto normalizado com unnest.
+# - Outros bancos (SQLite): uma única passada em streaming pelas linhas (iterator), com os
+#   mesmos percentis por interpolação linear calculados em Python.
+#
+# O resultado é guardado pelo cache de respostas por versão dos dados (cached_response):
+# recarregar o painel não relê o histórico enquanto nenhuma tarefa mudar.
+
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+
+def percentile_cont(values, fraction):
+    """Percentil com interpolação linear (a definição do percentile_cont do PostgreSQL); values ordenado."""
+    position = fraction * (len(values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def local_bucket(moment, granularity, tz):
+    """Início do período local (como TruncDay/Week/Month/Year) que contém moment."""
+    day = moment.astimezone(tz).date()
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday()) # Semanas começam na segunda-feira
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def completion_stats(total, completed, percentiles=None, mean=None):
+    """Formato de cada grupo na resposta; sem tarefas concluídas, os tempos ficam None."""
+    latency = dict.fromkeys([name for name, _ in PERCENTILES] + ['mean'])
+    if percentiles:
+        latency.update({name: round(value, 3) for (name, _), value in zip(PERCENTILES, percentiles)})
+        latency['mean'] = round(mean, 3)
+    return {
+        'total': total,
+        'completed': completed,
+        'completion_rate': round(completed / total, 4) if total else 0,
+        'latency_seconds': latency,
+    }
+
+
+class LatencyGroup:
+    """Acumulador de um grupo (período, tag) na passada em streaming."""
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.latencies = []
+
+    def add(self, is_completed, latency):
+        self.total += 1
+        self.completed += int(is_completed)
+        if latency is not None:
+            self.latencies.append(latency)
+
+    def stats(self):
+        values = sorted(self.latencies)
+        percentiles = [percentile_cont(values, fraction) for _, fraction in PERCENTILES] if values else None
+        return completion_stats(self.total, self.completed, percentiles, sum(values) / len(values) if values else None)
+
+
+def latency_seconds(created_at, completed_at, is_completed):
+    if not is_completed or completed_at is None:
+        return None
+    return max((completed_at - created_at).total_seconds(), 0) # Conclusão anterior à criação (importações) conta como 0
+
+
+def streaming_groups(owner, window, tags, granularity, tz):
+    """{(período ou None, tag): estatísticas} lendo cada linha (tabela quente e arquivo) uma vez."""
+    groups = defaultdict(LatencyGroup)
+    hot = filter_window(Task.objects.filter(owner=owner), window)
+    archived = filter_window(ArchivedTask.objects.filter(owner=owner), window)
+    if tags:
+        hot = filter_by_tags(hot, ','.join(tags), 'any', owner=owner)
+        archived = filter_archive_tags(archived, ','.join(tags), 'any')
+    fields = ('created_at', 'completed_at', 'is_completed', 'tags')
+    for queryset in (hot, archived):
+        for created_at, completed_at, is_completed, names in queryset.order_by().values_list(*fields).iterator(chunk_size=2000):
+            bucket = local_bucket(created_at, granularity, tz)
+            latency = latency_seconds(created_at, completed_at, is_completed)
+            for tag in [''] + [name for name in parse_tags(names) if not tags or name in tags]:
+                groups[(bucket, tag)].add(is_completed, latency)
+                groups[(None, tag)].add(is_completed, latency)
+    return {key: group.stats() for key, group in groups.items()}
+
+
+def postgresql_groups(connection, owner, window, tags, granularity, tz):
+    """{(período ou None, tag): estatísticas} calculados numa única consulta no PostgreSQL."""
+    quote = connection.ops.quote_name
+    task, archived = quote(Task._meta.db_table), quote(ArchivedTask._meta.db_table)
+    link, tag = quote(TaskTag._meta.db_table), quote(Tag._meta.db_table)
+    lower, upper = window
+
+    def where(alias):
+        conditions, params = [f'{alias}.owner_id = %s'], [owner]
+        if lower:
+            conditions.append(f'{alias}.created_at >= %s')
+            params.append(lower)
+        if upper:
+            conditions.append(f'{alias}.created_at < %s')
+            params.append(upper)
+        return ' AND '.join(conditions), params
+
+    hot_where, hot_params = where('t')
+    archive_where, archive_params = where('a')
+    hot_tags = archive_tags = tag_names = ''
+    tag_params = []
+    if tags:
+        hot_tags = f' AND EXISTS (SELECT 1 FROM {link} l2 JOIN {tag} g2 ON g2.id = l2.tag_id WHERE l2.owner_id = t.owner_id AND l2.task_id = t.id AND g2.name = ANY(%s))'
+        archive_tags = " AND string_to_array(a.tags, ', ') && %s::text[]"
+        tag_names = ' AND {} = ANY(%s)'
+        tag_params = [list(tags)]
+    rows = f"""
+        SELECT t.created_at, t.completed_at, t.is_completed, '' AS tag FROM {task} t WHERE {hot_where}{hot_tags}
+        UNION ALL
+        SELECT t.created_at, t.completed_at, t.is_completed, g.name FROM {task} t
+            JOIN {link} l ON l.task_id = t.id JOIN {tag} g ON g.id = l.tag_id WHERE {hot_where}{tag_names.format('g.name')}
+        UNION ALL
+        SELECT a.created_at, a.completed_at, a.is_completed, '' FROM {archived} a WHERE {archive_where}{archive_tags}
+        UNION ALL
+        SELECT a.created_at, a.completed_at, a.is_completed, s.tag FROM {archived} a
+            CROSS JOIN LATERAL unnest(string_to_array(NULLIF(a.tags, ''), ', ')) AS s(tag) WHERE {archive_where}{tag_names.format('s.tag')}
+    """
+    params = [
+        *hot_params, *tag_params, *hot_params, *tag_params,
+        *archive_params, *tag_params, *archive_params, *tag_params,
+    ]
+    sql = f"""
+        SELECT r.bucket, r.tag, count(*), count(*) FILTER (WHERE r.is_completed),
+            percentile_cont(ARRAY[{', '.join(str(fraction) for _, fraction in PERCENTILES)}]) WITHIN GROUP (ORDER BY r.latency),
+            avg(r.latency)
+        FROM (
+            SELECT date_trunc(%s, u.created_at AT TIME ZONE %s)::date AS bucket, u.tag, u.is_completed,
+                CASE WHEN u.is_completed AND u.completed_at IS NOT NULL
+                    THEN GREATEST(EXTRACT(EPOCH FROM u.completed_at - u.created_at), 0) END AS latency
+            FROM ({rows}) u
+        ) r
+        GROUP BY GROUPING SETS ((r.bucket, r.tag), (r.tag))
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [granularity, str(tz), *params])
+        return {
+            (bucket, name): completion_stats(total, completed, percentiles if mean is not None else None, mean)
+            for bucket, name, total, completed, percentiles, mean in cursor.fetchall()
+        }
+
+
+def completion_analytics(owner, window, tag=None, granularity='month', tz=None):
+    """Resposta de /api/tasks/analytics/ para o usuário: total e períodos, cada um com a quebra por tag."""
+    tags = parse_tags(tag)
+    connection = connections[router.db_for_read(Task)]
+    if connection.vendor == 'postgresql':
+        groups = postgresql_groups(connection, owner, window, tags, granularity, tz)
+    else:
+        groups = streaming_groups(owner, window, tags, granularity, tz)
+    empty = completion_stats(0, 0)
+    by_bucket = defaultdict(dict)
+    for (bucket, name), stats in groups.items():
+        if name:
+            by_bucket[bucket][name] = stats
+    periods = [
+        {'start': bucket.isoformat(), **groups.get((bucket, ''), empty), 'tags': dict(sorted(by_bucket[bucket].items()))}
+        for bucket in sorted({bucket for bucket, _ in groups if bucket is not None})
+    ]
+    return {
+        'granularity': granularity,
+        'tz': str(tz),
+        'overall': {**groups.get((None, ''), empty), 'tags': dict(sorted(by_bucket[None].items()))},
+        'periods': periods,
+    }
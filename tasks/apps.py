@@ -4,3 +4,11 @@ from django.apps import AppConfig # Importa a classe base para configuração de
 class TasksConfig(AppConfig): # Configuração do app 'tasks'
     default_auto_field = 'django.db.models.BigAutoField' # Tipo padrão de campo auto-incremento
     name = 'tasks' # Nome do app
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals # noqa: F401 - registra os sinais que mantêm os rollups diários
+        from .instrumentation import install_query_recorder
+        from .replicas import install_failure_detector
+        connection_created.connect(install_query_recorder) # Conta consultas/tempo de banco por requisição
+        connection_created.connect(install_failure_detector) # Réplica com erro de conexão volta para o primário
@@ -0,0 +1,93 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import bump_data_version
+from .models import ArchivedFinance, ArchivedTask, Finance, Task
+from .rollups import FINANCE_ROLLUP_FIELDS, TASK_ROLLUP_FIELDS, apply_finance_rows, apply_task_rows
+from .signals import bulk_maintenance
+from .sync import record_deletions
+from .tagging import parse_tags
+
+# Camada fria (hot/cold) para Task e Finance.
+#
+# Tarefas concluídas há mais de ARCHIVE_TASKS_AFTER_DAYS dias e lançamentos com mais de
+# ARCHIVE_FINANCES_AFTER_DAYS dias saem das tabelas quentes e vão para ArchivedTask/
+# ArchivedFinance em lotes (manage.py archive_data), para que listas, filtros por tag,
+# busca e agregações por linha só leiam o conjunto de trabalho.
+#
+# A movimentação roda com bulk_maintenance() e desconta as linhas movidas dos rollups diários
+# de uma vez por lote: progresso, totais e séries cobrem só os dados quentes, tanto pelos
+# rollups quanto pelas consultas por linha (busca, janela view/date, várias tags), e os dois
+# caminhos dão os mesmos números. O arquivo é consultado sob demanda em /api/archive/tasks/ e
+# /api/archive/finances/ (e entra em /api/tasks/analytics/, que lê o histórico de propósito).
+
+ARCHIVE_SPECS = {
+    'tasks': {
+        'model': Task, 'archive': ArchivedTask,
+        'fields': ('id', 'title', 'description', 'created_at', 'completed_at', 'is_completed', 'tags', 'content_hash', 'owner_id'),
+        'setting': 'ARCHIVE_TASKS_AFTER_DAYS',
+        'rollup_fields': TASK_ROLLUP_FIELDS, 'apply_rollup_rows': apply_task_rows,
+    },
+    'finances': {
+        'model': Finance, 'archive': ArchivedFinance,
+        'fields': ('id', 'description', 'value', 'tags', 'created_at', 'content_hash', 'owner_id'),
+        'setting': 'ARCHIVE_FINANCES_AFTER_DAYS',
+        'rollup_fields': FINANCE_ROLLUP_FIELDS, 'apply_rollup_rows': apply_finance_rows,
+    },
+}
+
+
+def archive_policy(name, days):
+    """Filtro das linhas de ARCHIVE_SPECS[name] que já passaram de days dias."""
+    cutoff = timezone.now() - timedelta(days=days)
+    if name == 'tasks':
+        # Concluídas antes do corte (sem data de conclusão, vale a de criação)
+        return Q(is_completed=True) & (Q(completed_at__lt=cutoff) | Q(completed_at__isnull=True, created_at__lt=cutoff))
+    return Q(created_at__lt=cutoff)
+
+
+def policy_days(name):
+    """Dias configurados para a política (0 ou ausente = não arquivar)."""
+    return getattr(settings, ARCHIVE_SPECS[name]['setting'], 0) or 0
+
+
+def archive_rows(name, days, batch_size=1000, progress=None):
+    """Move as linhas elegíveis em lotes (cada lote numa transação); retorna quantas foram movidas."""
+    spec = ARCHIVE_SPECS[name]
+    model, archive = spec['model'], spec['archive']
+    eligible = model.objects.filter(archive_policy(name, days)).order_by('pk')
+    moved = 0
+    while True:
+        with transaction.atomic(), bulk_maintenance():
+            rows = list(eligible.values(*spec['fields'])[:batch_size])
+            if not rows:
+                break
+            spec['apply_rollup_rows']([tuple(row[field] for field in spec['rollup_fields']) for row in rows], -1)
+            for row in rows:
+                row['tags'] = ', '.join(parse_tags(row['tags'])) # Texto normalizado, para o filtro por tag do arquivo
+            archive.objects.bulk_create([archive(**row) for row in rows], ignore_conflicts=True)
+            model.objects.filter(pk__in=[row['id'] for row in rows]).delete() # Ligações de tags saem em cascata
+            record_deletions(model, [(row['id'], row['owner_id']) for row in rows]) # Para o cliente offline, a linha some da lista
+            for owner in {row['owner_id'] for row in rows}:
+                bump_data_version(model._meta.model_name, owner=owner)
+        moved += len(rows)
+        if progress:
+            progress(moved)
+    return moved
+
+
+def filter_archive_tags(queryset, value, mode=None):
+    """Filtro por tags exatas no arquivo, sobre o texto normalizado ('casa, trabalho')."""
+    names = parse_tags(value)
+    if not names:
+        return queryset
+    conditions = [Q(tags__regex=rf'(^|, ){re.escape(name)}(,|$)') for name in names]
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined | condition if mode == 'any' else combined & condition
+    return queryset.filter(combined)
@@ -0,0 +1,119 @@
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+
+from .aggregations import finance_sums_by_day, progress_from_rows, progress_rows
+from .authentication import AsyncJWTAuthentication
+from .fastpath import aiter_rows, compile_row_spec, render_json
+from .instrumentation import measure_serialization
+from .filters import day_window, filter_window
+from .models import Finance, Task
+from .rollups import finance_rollup_rows, progress_range, task_rollup_rows
+from .serializers import TaskSerializer
+from .views import (
+    build_calendar, calendar_params, calendar_tasks, filter_finances, filter_tasks,
+    finance_totals, finance_totals_query, rollup_tag, uses_row_filters,
+)
+
+# Versões assíncronas das leituras mais usadas, para rodar sob ASGI (daily_manager/asgi.py).
+# Enquanto uma consulta lenta aguarda o banco, o worker continua atendendo outras
+# requisições em vez de ficar preso como um worker síncrono do gunicorn.
+# Mesmos parâmetros, mesma autenticação JWT e o mesmo JSON das rotas síncronas;
+# só as listas sem paginação são atendidas aqui (a paginação por cursor segue no DRF).
+
+
+class AsyncReadView(View):
+    """Base das leituras assíncronas: autentica via JWT e renderiza com o JSONRenderer do DRF.
+
+    Cada subclasse define async read(request), que devolve os dados (ou o JSON já em bytes).
+    """
+
+    http_method_names = ['get']
+    authentication = AsyncJWTAuthentication()
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+            request.user = auth[0]
+            data = await self.read(request, *args, **kwargs)
+        except APIException as exc:
+            return self.error_response(request, exc)
+        if not isinstance(data, bytes):
+            with measure_serialization():
+                data = JSONRenderer().render(data)
+        return HttpResponse(data, content_type='application/json')
+
+    def error_response(self, request, exc):
+        # Mesmo formato do exception_handler do DRF
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = HttpResponse(JSONRenderer().render(detail), status=exc.status_code, content_type='application/json')
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+
+class AsyncTaskListView(AsyncReadView):
+    """GET /api/async/tasks/ (lista por view/date/tag ou ?progress_by_day=1)."""
+
+    async def read(self, request):
+        queryset = filter_tasks(Task.objects.all(), request)
+        if request.GET.get('progress_by_day') == '1':
+            start = request.GET.get('start')
+            end = request.GET.get('end')
+            tag = rollup_tag(request)
+            if tag is not None and not uses_row_filters(request, 'view', 'q'):
+                # Sem filtros por tarefa (no máximo uma tag): lê direto dos rollups diários
+                rows = task_rollup_rows(request.user.pk, *progress_range(start, end), tag)
+            else:
+                if start and end:
+                    queryset = filter_window(queryset, day_window(start, end))
+                rows = progress_rows(queryset)
+            return progress_from_rows([row async for row in rows])
+        spec = compile_row_spec(TaskSerializer())
+        rows = [row async for row in aiter_rows(queryset.order_by('-created_at'), spec)]
+        with measure_serialization():
+            return render_json(rows)
+
+
+class AsyncFinanceByDayView(AsyncReadView):
+    """GET /api/async/finances/by_day/ (soma por dia)."""
+
+    async def read(self, request):
+        start = request.GET.get('start')
+        end = request.GET.get('end')
+        tag = rollup_tag(request)
+        if tag is not None and not uses_row_filters(request, 'date', 'q'):
+            return [{'created_at__date': day, 'total': total} async for day, total, _ in finance_rollup_rows(request.user.pk, start, end, tag)]
+        queryset = filter_window(filter_finances(Finance.objects.all(), request), day_window(start, end))
+        return [row async for row in finance_sums_by_day(queryset)]
+
+
+class AsyncFinanceTotalsView(AsyncReadView):
+    """GET /api/async/finances/totals/ (soma e quantidade no período)."""
+
+    async def read(self, request):
+        queryset, aggregates = finance_totals_query(request)
+        return finance_totals(await queryset.aaggregate(**aggregates))
+
+
+class AsyncCalendarView(AsyncReadView):
+    """GET /api/async/calendar/: rollups e, se pedido, tarefas.
+
+    As consultas rodam uma depois da outra: o ORM assíncrono passa pelo sync_to_async
+    thread-sensitive, numa única thread e conexão. O ganho é o worker atender outras
+    requisições enquanto elas esperam o banco.
+    """
+
+    async def read(self, request):
+        start, end, tag = calendar_params(request)
+        queries = [task_rollup_rows(request.user.pk, start, end, tag), finance_rollup_rows(request.user.pk, start, end, tag)]
+        if request.GET.get('include_tasks') == '1':
+            queries.append(calendar_tasks(request.user.pk, start, end, tag))
+        results = [[row async for row in queryset] for queryset in queries]
+        data = build_calendar(start, end, results[0], results[1])
+        if len(results) > 2:
+            data['tasks'] = results[2]
+        return data
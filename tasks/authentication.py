@@ -0,0 +1,142 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Autenticação JWT sem a consulta do usuário a cada requisição.
+#
+# O JWTAuthentication padrão busca o User no banco em toda chamada. Aqui o usuário é
+# resolvido por um cache LRU com TTL em memória (por processo), invalidado pelos sinais
+# de save/delete do modelo de usuário (tasks/signals.py) — o que cobre desativação e troca
+# de senha feitas pelo ORM. Outros workers só enxergam a mudança quando a entrada expira,
+# então API_AUTH_CACHE_TIMEOUT é o atraso máximo; 0 desliga o cache.
+#
+# Com API_AUTH_STATELESS=True nenhum usuário é lido: request.user vira um TokenUser
+# montado a partir das claims assinadas do token (is_staff/is_superuser são incluídas
+# na emissão por TokenObtainPairWithClaimsSerializer).
+
+
+class UserCache:
+    """LRU limitado com expiração por entrada; seguro entre threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        user_id = str(user_id) # A claim pode vir como int ou str
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+        return copy.copy(user) # Cada requisição recebe a própria cópia (caches de permissão etc.)
+
+    def set(self, user_id, user):
+        timeout = getattr(settings, 'API_AUTH_CACHE_TIMEOUT', 60)
+        if timeout <= 0:
+            return
+        user_id = str(user_id)
+        with self.lock:
+            self.entries[user_id] = (copy.copy(user), time.monotonic() + timeout)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > getattr(settings, 'API_AUTH_CACHE_MAX_ENTRIES', 1000):
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Remove um usuário (pela chave do USER_ID_FIELD) ou, sem argumento, todos."""
+        with self.lock:
+            if user_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(str(user_id), None)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que resolve o usuário pelo user_cache (ou pelas claims, no modo stateless)."""
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if getattr(settings, 'API_AUTH_STATELESS', False):
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(user_id, user)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, user, validated_token):
+        # As mesmas verificações do JWTAuthentication, feitas também sobre o usuário em cache
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication com busca do usuário pelo ORM assíncrono.
+
+    A leitura do cabeçalho e a validação do token não tocam no banco e são reaproveitadas;
+    só get_user ganha uma versão async (aget), para uso nas views de tasks/async_views.py.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if getattr(settings, 'API_AUTH_STATELESS', False):
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(user_id, user)
+        return self.check_user(user, validated_token)
+
+
+class TokenObtainPairWithClaimsSerializer(TokenObtainPairSerializer):
+    """Inclui username/is_staff/is_superuser no token, para o modo stateless (IsAdminUser etc.)."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .caching import bump_data_version
+from .signals import bulk_maintenance
+from .sync import record_deletions, stamp_changes
+from .tagging import sync_tags_bulk
+
+# Ações em lote para os ViewSets de tarefas e finanças.
+# Cada ação valida os itens com o serializer do ViewSet e grava tudo em uma única
+# transação (bulk_create, bulk_update, update() ou delete() filtrados). Como essas
+# operações não disparam os sinais por linha, os rollups, as tags, os carimbos da
+# sincronização (tasks/sync.py) e a versão usada pelo cache são atualizados aqui de uma vez só.
+
+
+def parse_bulk_id(value, field='ids'):
+    """Id enviado numa ação em lote: inteiro ou texto numérico ("12"); erro 400 no resto (inclusive true/1.5)."""
+    if isinstance(value, (int, str)) and not isinstance(value, bool):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValidationError({field: f'Id inválido: {value!r}. Os ids devem ser números inteiros.'})
+
+
+class BulkActionsMixin:
+    rollup_fields = () # Campos que alimentam os rollups (ver tasks/rollups.py)
+    apply_rollup_rows = None # staticmethod(apply_task_rows) ou staticmethod(apply_finance_rows)
+
+    def get_bulk_limit(self):
+        return getattr(settings, 'API_BULK_MAX_ITEMS', 500)
+
+    def get_bulk_items(self, request):
+        """Lista de itens enviada no corpo (lista pura ou {'items': [...]})."""
+        items = request.data if isinstance(request.data, list) else request.data.get('items')
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'items': 'Envie uma lista não vazia de itens.'})
+        if len(items) > self.get_bulk_limit():
+            raise ValidationError({'items': f'Máximo de {self.get_bulk_limit()} itens por requisição.'})
+        return items
+
+    def get_bulk_ids(self, request):
+        """Lista de ids enviada no corpo como {'ids': [...]}."""
+        ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Envie uma lista não vazia de ids.'})
+        if len(ids) > self.get_bulk_limit():
+            raise ValidationError({'ids': f'Máximo de {self.get_bulk_limit()} ids por requisição.'})
+        return [parse_bulk_id(pk) for pk in ids]
+
+    def rollup_row(self, obj):
+        return tuple(getattr(obj, field) for field in self.rollup_fields)
+
+    @action(detail=False, methods=['post'])
+    def bulk_create(self, request):
+        """Cria vários itens de uma vez; se algum for inválido, nada é gravado."""
+        items = self.get_bulk_items(request)
+        serializers = [self.get_serializer(data=item) for item in items]
+        results = [
+            {'index': index, 'status': 'valid'} if serializer.is_valid() else {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+            for index, serializer in enumerate(serializers)
+        ]
+        if any(result['status'] == 'invalid' for result in results):
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+        model = self.get_queryset().model
+        objs = [model(**serializer.validated_data, owner_id=request.user.pk) for serializer in serializers]
+        with transaction.atomic(), bulk_maintenance():
+            stamp_changes(objs)
+            model.objects.bulk_create(objs, batch_size=500)
+            sync_tags_bulk(model, [(obj.pk, obj.tags, obj.owner_id) for obj in objs], created=True)
+            self.apply_rollup_rows([self.rollup_row(obj) for obj in objs])
+            bump_data_version(model._meta.model_name, owner=request.user.pk)
+        data = self.get_serializer(objs, many=True).data
+        results = [{'index': index, 'status': 'created', 'id': obj.pk, 'data': item} for index, (obj, item) in enumerate(zip(objs, data))]
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'])
+    def bulk_update(self, request):
+        """Atualização parcial de vários itens ({'id': ..., campos...}); ids inexistentes são reportados."""
+        items = self.get_bulk_items(request)
+        model = self.get_queryset().model
+        # Ids em texto ("12") valem como números; itens sem id são reportados como not_found
+        ids = [parse_bulk_id(item['id'], 'items') if isinstance(item, dict) and item.get('id') is not None else None for item in items]
+        with transaction.atomic(), bulk_maintenance():
+            instances = self.get_queryset().select_for_update().in_bulk([pk for pk in ids if pk is not None])
+            previous = {pk: (self.rollup_row(obj), obj.tags) for pk, obj in instances.items()}
+            results, serializers = [], []
+            for index, (pk, item) in enumerate(zip(ids, items)):
+                if pk not in instances:
+                    results.append({'index': index, 'id': pk, 'status': 'not_found'})
+                    continue
+                serializer = self.get_serializer(instances[pk], data=item, partial=True)
+                if serializer.is_valid():
+                    results.append({'index': index, 'id': pk, 'status': 'valid'})
+                    serializers.append((index, serializer))
+                else:
+                    results.append({'index': index, 'id': pk, 'status': 'invalid', 'errors': serializer.errors})
+            if any(result['status'] == 'invalid' for result in results):
+                return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+            fields = set()
+            for _, serializer in serializers:
+                for field, value in serializer.validated_data.items():
+                    setattr(serializer.instance, field, value)
+                    fields.add(field)
+            touched = {serializer.instance.pk: serializer.instance for _, serializer in serializers}
+            if fields:
+                stamp_changes(touched.values())
+                model.objects.bulk_update(list(touched.values()), sorted(fields | {'updated_at', 'change_seq'}), batch_size=500)
+                sync_tags_bulk(model, [(pk, obj.tags, obj.owner_id) for pk, obj in touched.items() if obj.tags != previous[pk][1]])
+                self.apply_rollup_rows([previous[pk][0] for pk in touched], -1)
+                self.apply_rollup_rows([self.rollup_row(obj) for obj in touched.values()])
+                bump_data_version(model._meta.model_name, owner=request.user.pk)
+        for index, serializer in serializers:
+            results[index] = {'index': index, 'id': serializer.instance.pk, 'status': 'updated', 'data': serializer.data}
+        return Response({'results': results})
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """Exclui vários itens por id com um único delete() filtrado."""
+        ids = self.get_bulk_ids(request)
+        with transaction.atomic(), bulk_maintenance():
+            queryset = self.get_queryset().filter(pk__in=ids)
+            rows = {row[0]: row[1:] for row in queryset.select_for_update().values_list('pk', *self.rollup_fields)}
+            queryset.filter(pk__in=list(rows)).delete()
+            record_deletions(queryset.model, [(pk, row[-1]) for pk, row in rows.items()]) # rollup_fields termina em owner_id
+            self.apply_rollup_rows(list(rows.values()), -1)
+            if rows:
+                bump_data_version(queryset.model._meta.model_name, owner=request.user.pk)
+        return Response({'results': [{'id': pk, 'status': 'deleted' if pk in rows else 'not_found'} for pk in ids]})
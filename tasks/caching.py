@@ -0,0 +1,156 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe
+
+# Cache de respostas GET versionado pelos dados.
+# Cada usuário tem, por modelo, um contador em DataVersion ('task:<id>', 'finance:<id>'),
+# incrementado no commit de cada escrita dele (sinais e ações em lote). A chave do cache e o
+# ETag combinam esses contadores com os parâmetros normalizados da requisição, então uma
+# escrita invalida tudo que o usuário lê do modelo sem precisar apagar chaves, e escritas de
+# outros usuários não invalidam nada. O contador fica no banco para valer entre workers.
+
+
+def bump_data_version(*names, owner=None):
+    """Incrementa a versão dos modelos informados, para o usuário owner, quando a transação da escrita confirmar.
+
+    Dentro da transação, o UPDATE seguraria o lock da linha do modelo até o commit e todas as
+    escritas de todos os usuários fariam fila nela. Entre o commit e o incremento, um leitor
+    pode receber a versão anterior (e um 304) por um instante; a próxima leitura já vê a nova.
+    """
+    transaction.on_commit(lambda: _bump([owner_sequence(name, owner) for name in names]))
+
+
+def _bump(names):
+    from .models import DataVersion
+    for name in names:
+        updated = DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            DataVersion.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+CHANGE_SEQUENCE = 'changes' # Prefixo das linhas de DataVersion usadas como sequência de alterações (ver tasks/sync.py)
+
+
+def owner_sequence(name, owner_id):
+    """Nome da linha de DataVersion do contador name do usuário (linhas sem dono usam name)."""
+    return name if owner_id is None else f'{name}:{owner_id}'
+
+
+def next_change_seq(owner_id, count=1, using=None):
+    """Reserva count números da sequência de alterações do usuário e devolve o primeiro.
+
+    Precisa rodar na mesma transação que grava as linhas: o UPDATE segura o lock da linha
+    do contador do usuário até o commit, então os números dele ficam visíveis na ordem em
+    que foram dados. Escritas de usuários diferentes não disputam a mesma linha.
+    """
+    from .models import DataVersion
+    connection = connections[using or router.db_for_write(DataVersion)]
+    name = owner_sequence(CHANGE_SEQUENCE, owner_id)
+    version = _advance_sequence(connection, name, count)
+    if version is None: # Primeira alteração do usuário; ignore_conflicts vale para duas ao mesmo tempo
+        DataVersion.objects.using(connection.alias).bulk_create([DataVersion(name=name, version=0)], ignore_conflicts=True)
+        version = _advance_sequence(connection, name, count)
+    return version - count + 1
+
+
+def _advance_sequence(connection, name, count):
+    from .models import DataVersion
+    if not connection.features.can_return_rows_from_bulk_insert: # Sem UPDATE ... RETURNING: duas consultas
+        versions = DataVersion.objects.using(connection.alias).filter(name=name)
+        versions.update(version=F('version') + count, updated_at=timezone.now())
+        return versions.values_list('version', flat=True).first()
+    quote = connection.ops.quote_name
+    updated_at = DataVersion._meta.get_field('updated_at').get_db_prep_save(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(DataVersion._meta.db_table)} SET version = version + %s, updated_at = %s WHERE name = %s RETURNING version',
+            [count, updated_at, name],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_data_versions(names):
+    """Retorna ({nome: versão}, última modificação) com uma única consulta."""
+    from .models import DataVersion
+    rows = DataVersion.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    versions = {name: 0 for name in names}
+    last_modified = None
+    for name, version, updated_at in rows:
+        versions[name] = version
+        last_modified = max(filter(None, [last_modified, updated_at]))
+    return versions, last_modified
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def build_cache_key(view, request, versions):
+    """Chave estável: view, ação, usuário, caminho, parâmetros ordenados e versões dos dados.
+
+    Views cuja resposta depende de mais que os parâmetros (ex.: o mês atual quando start/end
+    faltam) acrescentam o que resolveram com cache_key_parts(request).
+    """
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    extra = view.cache_key_parts(request) if hasattr(view, 'cache_key_parts') else ()
+    raw = repr((
+        view.__class__.__name__, getattr(view, 'action', None), getattr(request.user, 'pk', None),
+        request.path, params, request.accepted_media_type, sorted(versions.items()), extra,
+    ))
+    return 'api-response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(if_modified_since and last_modified and int(last_modified.timestamp()) <= if_modified_since)
+
+
+def cached_response(method):
+    """Decora ações GET de um ViewSet com cache_models definido.
+
+    Responde 304 quando o cliente já tem a versão atual (If-None-Match/If-Modified-Since),
+    devolve o JSON do cache quando existe e, senão, executa a ação e guarda o resultado.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        cacheable = request.method == 'GET' and request.accepted_renderer.format == 'json'
+        if not getattr(settings, 'API_CACHE_ENABLED', True) or not cacheable:
+            return method(self, request, *args, **kwargs)
+        versions, last_modified = get_data_versions([owner_sequence(name, request.user.pk) for name in self.cache_models])
+        key = build_cache_key(self, request, versions)
+        etag = f'W/"{key.rsplit(":", 1)[1][:32]}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if last_modified:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        if _not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            cache = get_response_cache()
+            cached = cache.get(key)
+            if cached is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response # Erros e respostas em streaming não são cacheados
+                if hasattr(response, 'data'):
+                    content = request.accepted_renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+                    charset = request.accepted_renderer.charset
+                    cached = (content, f'{request.accepted_media_type}; charset={charset}' if charset else request.accepted_media_type)
+                else:
+                    cached = (response.content, response['Content-Type']) # Já renderizada (ex.: caminho rápido de listas)
+                cache.set(key, cached, getattr(settings, 'API_CACHE_TIMEOUT', 300))
+            response = HttpResponse(cached[0], content_type=cached[1])
+        for header, value in headers.items():
+            response[header] = value
+        return response
+    return wrapper
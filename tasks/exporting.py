@@ -0,0 +1,106 @@
+import csv
+import io
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from .fastpath import compile_row_spec, iter_rows, render_json
+from .filters import day_window, filter_window
+from .jobs import enqueue_response, job_params, wants_background
+
+# Exportação em streaming (CSV ou NDJSON) de tarefas e finanças.
+# As linhas são lidas com QuerySet.iterator() em blocos e escritas em pedaços,
+# então a memória usada não depende do tamanho do histórico.
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+ROWS_PER_CHUNK = 500 # Linhas agrupadas em cada pedaço enviado/gravado
+
+
+def iter_export_rows(queryset, serializer):
+    """Dicts no formato da API; usa o caminho rápido quando o serializer permite."""
+    spec = compile_row_spec(serializer)
+    if spec is not None:
+        return iter_rows(queryset, spec)
+    return (type(serializer)(obj, context=serializer.context).data for obj in queryset.iterator(chunk_size=2000))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def iter_csv(rows, fieldnames):
+    """Pedaços (bytes) de um CSV com cabeçalho."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(row.get(name)) for name in fieldnames])
+        count += 1
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson(rows):
+    """Pedaços (bytes) de um NDJSON: um objeto JSON por linha."""
+    chunk = []
+    for row in rows:
+        chunk.append(render_json(row))
+        if len(chunk) == ROWS_PER_CHUNK:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+
+def iter_export(queryset, serializer, export_format):
+    """Pedaços (bytes) do arquivo de exportação no formato pedido ('csv' ou 'ndjson')."""
+    queryset = queryset.order_by('created_at', 'id') # Ordem cronológica, estável entre exportações
+    rows = iter_export_rows(queryset, serializer)
+    if export_format == 'csv':
+        fieldnames = [name for name, field in serializer.fields.items() if not field.write_only]
+        return iter_csv(rows, fieldnames)
+    return iter_ndjson(rows)
+
+
+class ExportMixin:
+    """Ação GET export/?output=csv|ndjson[&start=&end=] com os mesmos filtros da listagem.
+
+    Com ?background=1, responde 202 com um trabalho da fila (GET /api/jobs/<id>/output/ baixa o arquivo).
+    """
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        if wants_background(request): # Exportações grandes: gera o arquivo no worker (tasks/jobs.py)
+            self.export_format(request)
+            return enqueue_response(request, 'export', {**job_params(request), 'model': self.get_queryset().model._meta.model_name})
+        chunks, content_type, filename = self.export_file(request)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def export_format(self, request):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Formato inválido. Use: {", ".join(EXPORT_FORMATS)}.'})
+        return export_format
+
+    def export_file(self, request):
+        """(pedaços, content type, nome do arquivo) da exportação; usado também pelo worker."""
+        export_format = self.export_format(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = filter_window(queryset, day_window(request.query_params.get('start'), request.query_params.get('end')))
+        filename = f'{queryset.model._meta.verbose_name_plural.replace(" ", "-")}-{timezone.localdate():%Y%m%d}.{export_format}'
+        return iter_export(queryset, self.get_serializer(), export_format), EXPORT_FORMATS[export_format], filename
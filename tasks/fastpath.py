@@ -0,0 +1,158 @@
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .instrumentation import measure_serialization
+from .models import CentsField
+
+try:
+    import orjson # Opcional: acelera a geração do JSON quando instalado
+except ImportError:
+    orjson = None
+
+# Caminho rápido (somente leitura) para listas grandes.
+# Em vez de instanciar um modelo e chamar to_representation campo a campo para cada linha,
+# busca apenas as colunas do serializer com values_list() e aplica conversores
+# pré-compilados que reproduzem a saída do DRF. O JSON resultante é idêntico, byte a byte,
+# ao que o JSONRenderer produziria para o mesmo serializer. Valores em centavos (CentsField)
+# são lidos como inteiros e formatados direto, sem passar por Decimal.
+
+_IDENTITY_FIELDS = (drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField)
+
+
+def _datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != drf_fields.ISO_8601 or getattr(field, 'timezone', None) is not None:
+        return None # Formatos customizados usam o caminho normal
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _decimal_converter(field):
+    coerce = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.normalize_output or not coerce or field.decimal_places is None:
+        return None
+    quantum = Decimal('.1') ** field.decimal_places
+
+    def convert(value):
+        return '{:f}'.format(value.quantize(quantum, rounding=field.rounding))
+    return convert
+
+
+def _format_cents(cents):
+    reais, rest = divmod(abs(cents), 100)
+    return f'{"-" if cents < 0 else ""}{reais}.{rest:02d}'
+
+
+def _cents_column(serializer, field):
+    """Coluna inteira para um DecimalField de 2 casas sobre um CentsField do modelo, ou None."""
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None or field.decimal_places != 2:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not isinstance(model_field, CentsField):
+        return None
+    return ExpressionWrapper(F(field.source), output_field=BigIntegerField()) # Sem o from_db_value do CentsField
+
+
+def compile_row_spec(serializer):
+    """[(nome, coluna, conversor)] para os campos do serializer, ou None se algum campo não for suportado."""
+    spec = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if '.' in field.source or field.source == '*':
+            return None
+        if isinstance(field, drf_fields.DateTimeField):
+            converter = _datetime_converter(field)
+            if converter is None:
+                return None
+        elif isinstance(field, drf_fields.DecimalField):
+            converter = _decimal_converter(field)
+            if converter is None:
+                return None
+            column = _cents_column(serializer, field)
+            if column is not None:
+                spec.append((name, column, _format_cents))
+                continue
+        elif isinstance(field, _IDENTITY_FIELDS) and type(field).to_representation in (
+            drf_fields.IntegerField.to_representation, drf_fields.CharField.to_representation, drf_fields.BooleanField.to_representation,
+        ):
+            converter = None # Valores do banco já saem no tipo certo
+        else:
+            return None
+        spec.append((name, field.source, converter))
+    return spec
+
+
+def iter_rows(queryset, spec, chunk_size=2000):
+    """Gera dicts no mesmo formato do serializer, lendo apenas as colunas necessárias em blocos."""
+    names = [name for name, _, _ in spec]
+    converters = [converter for _, _, converter in spec]
+    for values in queryset.values_list(*[source for _, source, _ in spec]).iterator(chunk_size=chunk_size):
+        yield dict(zip(names, [
+            value if converter is None or value is None else converter(value)
+            for converter, value in zip(converters, values)
+        ]))
+
+
+async def aiter_rows(queryset, spec, chunk_size=2000):
+    """Versão assíncrona de iter_rows (aiterator), usada pelas views de tasks/async_views.py."""
+    # values() e não values_list(): no Django 5.2 o iterável de values_list() executa a
+    # consulta já ao ser criado, fora da thread do banco, e o aiterator() falha no modo async
+    columns = [source for _, source, _ in spec if isinstance(source, str)]
+    expressions = {f'{name}_raw': source for name, source, _ in spec if not isinstance(source, str)} # Colunas em centavos
+    async for values in queryset.values(*columns, **expressions).aiterator(chunk_size=chunk_size):
+        row = {}
+        for name, source, converter in spec:
+            value = values[source if isinstance(source, str) else f'{name}_raw']
+            row[name] = value if converter is None or value is None else converter(value)
+        yield row
+
+
+def serialize_rows(queryset, spec):
+    """Lista de dicts no mesmo formato do serializer."""
+    return list(iter_rows(queryset, spec))
+
+
+def render_json(data):
+    """JSON compacto equivalente ao JSONRenderer (usa orjson quando disponível)."""
+    if orjson is None or not (JSONRenderer.compact and not JSONRenderer.ensure_ascii and JSONRenderer.strict):
+        return JSONRenderer().render(data)
+    # O JSONRenderer sempre escapa \u2028/\u2029; o orjson não
+    return orjson.dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def render_list(queryset, serializer):
+    """Bytes JSON da lista inteira pelo caminho rápido, ou None se o serializer não for suportado."""
+    spec = compile_row_spec(serializer)
+    if spec is None:
+        return None
+    return render_json(serialize_rows(queryset, spec))
+
+
+class FastListMixin:
+    """Listas sem paginação pedidas em JSON usam o caminho rápido; o resto segue o ListModelMixin."""
+
+    def list(self, request, *args, **kwargs):
+        paginator = self.paginator
+        paginated = paginator is not None and getattr(paginator, 'is_requested', lambda request: True)(request)
+        plain_json = type(request.accepted_renderer) is JSONRenderer and 'indent' not in request.accepted_media_type
+        if not paginated and plain_json:
+            with measure_serialization():
+                content = render_list(self.filter_queryset(self.get_queryset()), self.get_serializer())
+            if content is not None:
+                return HttpResponse(content, content_type=request.accepted_media_type)
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,100 @@
+import zoneinfo
+from datetime import date as date_cls, datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .tagging import parse_tags
+
+# Filtros compartilhados entre as views de tarefas e finanças.
+# Janelas de data viram intervalos semiabertos (created_at >= início AND created_at < fim)
+# calculados no horário local, para que o banco use os índices em created_at
+# em vez de aplicar uma função de data em cada linha.
+
+
+def parse_day(value, param='date'):
+    """Converte 'YYYY-MM-DD' (ou um datetime ISO) em date; erro 400 se inválido."""
+    if isinstance(value, date_cls):
+        return value
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except ValueError:
+        raise ValidationError({param: f'Data inválida: {value}'})
+
+
+def local_midnight(day, tz=None):
+    """Primeiro instante do dia local (tz ou settings.TIME_ZONE) como datetime aware."""
+    local = timezone.make_aware(datetime.combine(day, time.min), tz or timezone.get_default_timezone())
+    # Converte para UTC: normaliza dias em que 00:00 não existe (início do horário de verão)
+    return local.astimezone(dt_timezone.utc)
+
+
+def day_window(start=None, end=None, tz=None):
+    """Intervalo semiaberto cobrindo os dias locais start..end (inclusive); limites são opcionais."""
+    lower = local_midnight(parse_day(start, 'start'), tz) if start else None
+    upper = local_midnight(parse_day(end, 'end') + timedelta(days=1), tz) if end else None
+    return lower, upper
+
+
+def parse_timezone(value, param='tz'):
+    """Fuso IANA (ex.: 'America/Sao_Paulo'); sem valor, o settings.TIME_ZONE. Erro 400 se desconhecido."""
+    if not value:
+        return timezone.get_default_timezone()
+    try:
+        return zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError, OSError): # OSError: nome de diretório, como 'America'
+        raise ValidationError({param: f'Fuso horário inválido: {value}'})
+
+
+def view_window(view, date):
+    """Intervalo semiaberto para view=day|week|month a partir da data de referência; None se a view for desconhecida."""
+    try:
+        ref = parse_day(date)
+    except ValidationError:
+        ref = timezone.localdate() # Mantém o comportamento antigo: data inválida usa hoje
+    if view == 'day':
+        return day_window(ref, ref)
+    if view == 'week':
+        monday = ref - timedelta(days=ref.weekday())
+        return day_window(monday, monday + timedelta(days=6))
+    if view == 'month':
+        first = ref.replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        return local_midnight(first), local_midnight(following)
+    return None
+
+
+def filter_window(queryset, window, field='created_at'):
+    """Aplica um intervalo (início, fim) semiaberto; limites None são ignorados."""
+    if not window:
+        return queryset
+    lower, upper = window
+    if lower is not None:
+        queryset = queryset.filter(**{f'{field}__gte': lower})
+    if upper is not None:
+        queryset = queryset.filter(**{f'{field}__lt': upper})
+    return queryset
+
+
+def filter_by_tags(queryset, value, mode=None, owner=None):
+    """Filtra por tags exatas usando os índices das tabelas de ligação.
+
+    value aceita uma ou mais tags separadas por vírgula; mode='any' retorna itens com
+    qualquer uma delas, e o padrão ('all') exige todas. Com owner, lê só as ligações do
+    usuário pelo índice (dono, tag, item).
+    """
+    names = parse_tags(value)
+    if not names:
+        return queryset
+    through = queryset.model._meta.get_field('normalized_tags').remote_field.through
+    fk = queryset.model._meta.model_name # 'task' ou 'finance'
+    links = through.objects.filter(tag__name__in=names)
+    if owner is not None:
+        links = links.filter(owner=owner)
+    if mode == 'any' or len(names) == 1:
+        ids = links.values(fk)
+    else:
+        # AND: só itens ligados a todas as tags pedidas
+        ids = links.values(fk).annotate(matched=Count('tag')).filter(matched=len(names)).values(fk)
+    return queryset.filter(pk__in=ids)
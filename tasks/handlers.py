@@ -0,0 +1,73 @@
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIHandler as DjangoWSGIHandler
+
+# Perfis de middleware por caminho.
+#
+# A API autentica só com JWT no cabeçalho, então sessões, CSRF, AuthenticationMiddleware,
+# mensagens e clickjacking são trabalho perdido em /api/. Com API_MIDDLEWARE_PROFILE='lean'
+# o handler monta duas cadeias na inicialização: settings.API_MIDDLEWARE para os caminhos
+# de API_MIDDLEWARE_PATHS e settings.MIDDLEWARE (completa) para o resto, como /admin/.
+# A escolha é um startswith por requisição; cada cadeia mantém os próprios process_view,
+# process_exception etc., então nada muda para as views de cada lado.
+#
+# daily_manager/wsgi.py e asgi.py (e o runserver, via WSGI_APPLICATION) usam estes handlers;
+# o test client do Django monta só a cadeia completa, a não ser que receba um handler com o
+# mixin (como faz o comando bench).
+
+
+class MiddlewareChain(BaseHandler):
+    """Handler auxiliar que só serve para montar a cadeia de uma lista de middlewares."""
+
+    def __init__(self, middleware):
+        super().__init__()
+        self.middleware = list(middleware)
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler lê settings.MIDDLEWARE; a troca só acontece na inicialização do worker
+        full = settings.MIDDLEWARE
+        settings.MIDDLEWARE = self.middleware
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = full
+
+
+class MiddlewareProfileMixin:
+    """Mixin de handler: envia as requisições de API_MIDDLEWARE_PATHS pela cadeia enxuta."""
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async)
+        if getattr(settings, 'API_MIDDLEWARE_PROFILE', 'full') != 'lean':
+            return
+        api = MiddlewareChain(settings.API_MIDDLEWARE)
+        api.load_middleware(is_async)
+        paths = tuple(settings.API_MIDDLEWARE_PATHS)
+        api_chain, full_chain = api._middleware_chain, self._middleware_chain
+
+        def chain(request):
+            # Em modo async as duas cadeias devolvem corrotinas, aguardadas por get_response_async
+            return (api_chain if request.path_info.startswith(paths) else full_chain)(request)
+        self._middleware_chain = chain
+
+
+class WSGIHandler(MiddlewareProfileMixin, DjangoWSGIHandler):
+    pass
+
+
+class ASGIHandler(MiddlewareProfileMixin, DjangoASGIHandler):
+    pass
+
+
+def get_wsgi_application():
+    """Como django.core.wsgi.get_wsgi_application, com os perfis de middleware."""
+    django.setup(set_prefix=False)
+    return WSGIHandler()
+
+
+def get_asgi_application():
+    """Como django.core.asgi.get_asgi_application, com os perfis de middleware."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,364 @@
+import csv
+import hashlib
+import io
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+
+from .caching import bump_data_version
+from .filters import local_midnight
+from .models import ArchivedFinance, ArchivedTask, Finance, Task
+from .rollups import FINANCE_ROLLUP_FIELDS, TASK_ROLLUP_FIELDS, apply_finance_rows, apply_task_rows
+from .serializers import FinanceSerializer, TaskSerializer
+from .signals import bulk_maintenance
+from .sync import stamp_changes
+from .tagging import sync_tags_bulk
+
+# Importação em massa de tarefas e lançamentos financeiros (CSV, NDJSON ou OFX).
+# A entrada é lida em streaming, validada campo a campo com os campos do serializer
+# da API e gravada em lotes de tamanho fixo, cada um em sua transação: bulk_create,
+# ou COPY no PostgreSQL (psycopg2). Linhas repetidas são ignoradas pelo content_hash,
+# tanto dentro do arquivo quanto em relação a importações anteriores do mesmo usuário.
+# A consulta prévia só poupa trabalho: a gravação ignora conflitos na restrição única
+# (owner, content_hash), então duas importações simultâneas do mesmo arquivo não geram
+# IntegrityError, e o relatório conta só o que de fato entrou.
+
+IMPORT_FORMATS = ('csv', 'ndjson', 'ofx')
+
+# Configuração por modelo: serializer usado na validação, campos que entram no hash,
+# apelidos aceitos nas colunas e como atualizar os rollups.
+IMPORT_SPECS = {
+    Task: {
+        'serializer': TaskSerializer,
+        'hash_fields': ('title', 'description'),
+        'aliases': {'titulo': 'title', 'título': 'title', 'descricao': 'description', 'descrição': 'description', 'date': 'created_at', 'data': 'created_at'},
+        'rollup_fields': TASK_ROLLUP_FIELDS,
+        'apply_rollup_rows': apply_task_rows,
+        'archive': ArchivedTask, # Linhas arquivadas também contam como já importadas
+    },
+    Finance: {
+        'serializer': FinanceSerializer,
+        'hash_fields': ('description', 'value'),
+        'aliases': {
+            'descricao': 'description', 'descrição': 'description', 'memo': 'description',
+            'valor': 'value', 'amount': 'value', 'date': 'created_at', 'data': 'created_at',
+        },
+        'rollup_fields': FINANCE_ROLLUP_FIELDS,
+        'apply_rollup_rows': apply_finance_rows,
+        'archive': ArchivedFinance,
+    },
+}
+
+
+class ImportReport:
+    """Contadores de uma importação (lidas, inseridas, duplicadas, inválidas) e vazão."""
+
+    max_errors = 100 # Quantos erros de exemplo guardar
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0
+
+    def add_error(self, line, detail):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': detail})
+
+    def as_dict(self):
+        return {
+            'read': self.read, 'inserted': self.inserted, 'duplicates': self.duplicates, 'invalid': self.invalid,
+            'seconds': round(self.elapsed, 3), 'rows_per_second': round(self.rate), 'errors': self.errors,
+        }
+
+    def __str__(self):
+        return (
+            f'{self.read} lidas, {self.inserted} inseridas, {self.duplicates} duplicadas, '
+            f'{self.invalid} inválidas - {self.rate:.0f} linhas/s'
+        )
+
+
+# Leitura dos formatos ------------------------------------------------------
+# Cada leitor gera (registro, erro): registro é um dict de strings; erro, uma mensagem.
+
+def read_csv(stream, delimiter=','):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text, delimiter=delimiter):
+        yield {key.strip().lower(): value for key, value in row.items() if key}, None
+
+
+def read_ndjson(stream):
+    for raw in io.TextIOWrapper(stream, encoding='utf-8-sig'):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as exc:
+            yield None, f'JSON inválido: {exc}'
+            continue
+        if isinstance(record, dict):
+            yield {key.lower(): value for key, value in record.items()}, None
+        else:
+            yield None, 'Cada linha deve ser um objeto JSON.'
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+def read_ofx(stream):
+    """Transações (<STMTTRN>) de um extrato OFX 1.x (SGML) ou 2.x (XML)."""
+    current = None
+    for raw in io.TextIOWrapper(stream, encoding='latin-1'):
+        for closing, tag, value in _OFX_TAG.findall(raw):
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield {
+                        'created_at': current.get('DTPOSTED', ''),
+                        'value': current.get('TRNAMT', ''),
+                        'description': current.get('MEMO') or current.get('NAME', ''),
+                        'external_id': current.get('FITID', ''),
+                    }, None
+                current = None if closing else {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def read_records(stream, file_format, delimiter=','):
+    if file_format == 'csv':
+        return read_csv(stream, delimiter)
+    if file_format == 'ndjson':
+        return read_ndjson(stream)
+    if file_format == 'ofx':
+        return read_ofx(stream)
+    raise ValueError(f'Formato desconhecido: {file_format}')
+
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'jsonl': 'ndjson', 'json': 'ndjson', 'qfx': 'ofx'}.get(extension, extension)
+
+
+# Normalização e validação --------------------------------------------------
+
+_OFX_DATE = re.compile(r'^(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::\w+)?\])?$')
+
+
+def parse_created_at(value):
+    """Aceita ISO (data ou data/hora), DD/MM/AAAA e datas OFX; datas sem hora viram 00:00 local."""
+    if isinstance(value, datetime):
+        return value if timezone.is_aware(value) else timezone.make_aware(value, timezone.get_default_timezone())
+    value = (value or '').strip()
+    match = _OFX_DATE.match(value)
+    if match:
+        day, clock, offset = match.groups()
+        parsed = datetime.strptime(day + (clock or '000000'), '%Y%m%d%H%M%S')
+        if offset is not None:
+            return parsed.replace(tzinfo=dt_timezone(timedelta(hours=float(offset))))
+        return timezone.make_aware(parsed, timezone.get_default_timezone())
+    if re.match(r'^\d{2}/\d{2}/\d{4}$', value):
+        return local_midnight(datetime.strptime(value, '%d/%m/%Y').date())
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValidationError({'created_at': f'Data inválida: {value!r}'})
+    if len(value) == 10:
+        return local_midnight(parsed.date())
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, timezone.get_default_timezone())
+
+
+def _normalize_amount(value):
+    # "1.234,56" (formato brasileiro) -> "1234.56"
+    if isinstance(value, str) and ',' in value:
+        return value.replace('.', '').replace(',', '.')
+    return value
+
+
+def content_hash(model, values, external_id='', dated=True):
+    """Hash do registro; sem data na origem (dated=False), o horário da importação fica de fora."""
+    spec = IMPORT_SPECS[model]
+    created_at = values['created_at'].astimezone(dt_timezone.utc).isoformat() if dated else ''
+    parts = [model._meta.model_name, created_at, str(external_id or '')]
+    parts += [str(values.get(field, '')) for field in spec['hash_fields']]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+class RecordCleaner:
+    """Valida um registro com os campos graváveis do serializer (como em to_internal_value)."""
+
+    def __init__(self, model):
+        self.model = model
+        self.spec = IMPORT_SPECS[model]
+        serializer = self.spec['serializer']()
+        self.fields = [(name, field) for name, field in serializer.fields.items() if not field.read_only]
+
+    def clean(self, record):
+        record = {self.spec['aliases'].get(key, key): value for key, value in record.items()}
+        if 'value' in record:
+            record['value'] = _normalize_amount(record['value'])
+        values, errors = {}, {}
+        for name, field in self.fields:
+            raw = record.get(name, empty)
+            if raw == '' and not field.required:
+                raw = empty # Colunas vazias no CSV equivalem a campo ausente
+            try:
+                values[field.source] = field.run_validation(raw)
+            except SkipField:
+                pass
+            except ValidationError as exc:
+                errors[name] = exc.detail
+        try:
+            values['created_at'] = parse_created_at(record['created_at']) if record.get('created_at') else timezone.now()
+        except ValidationError as exc:
+            errors.update(exc.detail)
+        if errors:
+            raise ValidationError(errors)
+        values['content_hash'] = content_hash(self.model, values, record.get('external_id'), dated=bool(record.get('created_at')))
+        return values
+
+
+# Gravação -----------------------------------------------------------------
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def supports_copy():
+    """COPY só está disponível no PostgreSQL com psycopg2 (copy_expert)."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, 'copy_expert')
+
+
+def copy_insert(model, objs):
+    """Insere via COPY FROM STDIN numa tabela temporária e INSERT ... ON CONFLICT DO NOTHING;
+    devolve {content_hash: pk} das linhas que entraram (COPY direto falharia no primeiro conflito)."""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    for obj in objs:
+        buffer.write('\t'.join(_copy_value(field.get_db_prep_save(getattr(obj, field.attname), connection)) for field in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    table, staging = quote(model._meta.db_table), quote(f'{model._meta.db_table}_import')
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMPORARY TABLE {staging} (LIKE {table})')
+        cursor.cursor.copy_expert(f'COPY {staging} ({columns}) FROM STDIN', buffer)
+        cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} ON CONFLICT DO NOTHING RETURNING content_hash, {quote(model._meta.pk.column)}')
+        inserted = dict(cursor.fetchall())
+        cursor.execute(f'DROP TABLE {staging}')
+    return inserted
+
+
+def bulk_insert(model, objs):
+    """bulk_create ignorando conflitos; devolve {content_hash: pk} das linhas que entraram.
+
+    Com ignore_conflicts os pks não voltam: as linhas deste lote são as que têm o change_seq
+    carimbado aqui (o de uma linha gravada por outra importação é outro).
+    """
+    model.objects.bulk_create(objs, batch_size=1000, ignore_conflicts=True)
+    stamps = {obj.content_hash: obj.change_seq for obj in objs}
+    rows = model.objects.filter(owner_id=objs[0].owner_id, content_hash__in=list(stamps)).values_list('content_hash', 'pk', 'change_seq')
+    return {key: pk for key, pk, seq in rows if stamps[key] == seq}
+
+
+def _flush(model, batch, report, use_copy, owner):
+    spec = IMPORT_SPECS[model]
+    unique = {}
+    for values in batch:
+        unique.setdefault(values['content_hash'], values)
+    existing = set(model.objects.filter(owner=owner, content_hash__in=list(unique)).values_list('content_hash', flat=True))
+    existing.update(spec['archive'].objects.filter(owner=owner, content_hash__in=list(unique)).values_list('content_hash', flat=True))
+    objs = [model(**values, owner_id=owner) for key, values in unique.items() if key not in existing]
+    report.duplicates += len(batch) - len(objs)
+    if not objs:
+        return
+    with transaction.atomic(), bulk_maintenance():
+        stamp_changes(objs)
+        inserted = (copy_insert if use_copy else bulk_insert)(model, objs)
+        kept = [obj for obj in objs if obj.content_hash in inserted] # Sem as que outra importação gravou no meio tempo
+        for obj in kept:
+            obj.pk = inserted[obj.content_hash]
+        if kept:
+            sync_tags_bulk(model, [(obj.pk, obj.tags, obj.owner_id) for obj in kept], created=True)
+            spec['apply_rollup_rows']([tuple(getattr(obj, field) for field in spec['rollup_fields']) for obj in kept])
+            bump_data_version(model._meta.model_name, owner=owner)
+    report.duplicates += len(objs) - len(kept)
+    report.inserted += len(kept)
+
+
+def import_records(model, records, owner, batch_size=1000, use_copy=None, progress=None, progress_every=10000):
+    """Valida e grava os registros do usuário de id owner em lotes; retorna um ImportReport.
+
+    use_copy=None usa COPY automaticamente quando o banco suporta; progress recebe o
+    relatório a cada progress_every linhas lidas.
+    """
+    if use_copy is None:
+        use_copy = supports_copy()
+    cleaner = RecordCleaner(model)
+    report = ImportReport()
+    batch = []
+    for line, (record, error) in enumerate(records, start=1):
+        report.read += 1
+        if error:
+            report.add_error(line, error)
+        else:
+            try:
+                batch.append(cleaner.clean(record))
+            except ValidationError as exc:
+                report.add_error(line, exc.detail)
+        if len(batch) >= batch_size:
+            _flush(model, batch, report, use_copy, owner)
+            batch = []
+        if progress and report.read % progress_every == 0:
+            progress(report)
+    if batch:
+        _flush(model, batch, report, use_copy, owner)
+    return report
+
+
+class ImportMixin:
+    """Ação POST import/ (multipart, campo "file") que importa o arquivo enviado em lotes."""
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_data(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Envie o arquivo no campo "file".'})
+        file_format = request.data.get('file_format') or guess_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            raise ValidationError({'file_format': f'Formato inválido. Use: {", ".join(IMPORT_FORMATS)}.'})
+        model = self.get_queryset().model
+        if file_format == 'ofx' and model is not Finance:
+            raise ValidationError({'file_format': 'OFX só pode ser importado em finanças.'})
+        report = import_records(model, read_records(upload.file, file_format), request.user.pk, batch_size=settings.API_IMPORT_BATCH_SIZE)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED if report.inserted else status.HTTP_200_OK)
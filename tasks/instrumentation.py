@@ -0,0 +1,232 @@
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Instrumentação por requisição: quantidade e tempo de consultas ao banco, tempo de
+# serialização e tempo total, por endpoint. Os números vão para o cabeçalho Server-Timing,
+# para logs estruturados por amostragem e para histogramas em memória expostos em
+# Prometheus por /api/_metrics (cada worker do gunicorn tem os próprios contadores).
+#
+# As consultas são contadas por um execute_wrapper instalado em toda conexão aberta
+# (ver TasksConfig.ready); a requisição corrente fica num ContextVar, que também chega
+# às threads do ORM usadas pelas views assíncronas.
+
+logger = logging.getLogger('tasks.metrics')
+slow_query_logger = logging.getLogger('tasks.slow_queries')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Medidas de uma requisição (tempos em segundos)."""
+
+    def __init__(self, request=None):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.request = request
+
+    @property
+    def endpoint(self):
+        """Nome da rota (view_name), lido da requisição: já vale assim que a URL é resolvida, antes das consultas da view."""
+        match = getattr(self.request, 'resolver_match', None)
+        return (match.view_name if match else None) or 'unmatched'
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        app = max(total - self.db_time - self.serialize_time, 0)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.1f}',
+            f'app;dur={app * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current_metrics():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper: soma tempo/quantidade de consultas na requisição e registra as lentas."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.db_queries += 1
+            metrics.db_time += elapsed
+        threshold = getattr(settings, 'API_SLOW_QUERY_MS', 0)
+        if threshold and elapsed * 1000 >= threshold:
+            slow_query_logger.warning(json.dumps({
+                'ms': round(elapsed * 1000, 1), 'sql': sql, 'many': many,
+                'endpoint': metrics.endpoint if metrics else None, 'alias': context['connection'].alias,
+            }, default=str))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Receptor de connection_created: instala record_query uma única vez por conexão."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure_serialization():
+    """Soma o tempo do bloco como serialização, descontando as consultas feitas dentro dele."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started, db_before = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.serialize_time += (time.perf_counter() - started) - (metrics.db_time - db_before)
+
+
+class MetricsRegistry:
+    """Histogramas e contadores em memória, por (método, endpoint)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, method, endpoint, status, metrics, total):
+        key = (method, endpoint)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {
+                    'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0,
+                    'db_queries': 0, 'db_seconds': 0.0, 'serialize_seconds': 0.0, 'errors': 0,
+                }
+            series['buckets'][bisect_left(self.buckets, total)] += 1
+            series['sum'] += total
+            series['count'] += 1
+            series['db_queries'] += metrics.db_queries
+            series['db_seconds'] += metrics.db_time
+            series['serialize_seconds'] += metrics.serialize_time
+            if status >= 500:
+                series['errors'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+    def render_prometheus(self):
+        """Formato de exposição de texto do Prometheus (0.0.4)."""
+        with self.lock:
+            series = {key: {**value, 'buckets': list(value['buckets'])} for key, value in sorted(self.series.items())}
+        lines = [
+            '# HELP daily_manager_request_duration_seconds Tempo total das requisições.',
+            '# TYPE daily_manager_request_duration_seconds histogram',
+        ]
+        for (method, endpoint), values in series.items():
+            labels = f'method="{method}",endpoint="{endpoint}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'daily_manager_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'daily_manager_request_duration_seconds_sum{{{labels}}} {values["sum"]:.6f}')
+            lines.append(f'daily_manager_request_duration_seconds_count{{{labels}}} {values["count"]}')
+        for name, key, kind, help_text in (
+            ('daily_manager_db_queries_total', 'db_queries', 'd', 'Consultas ao banco.'),
+            ('daily_manager_db_seconds_total', 'db_seconds', 'f', 'Tempo gasto no banco.'),
+            ('daily_manager_serialize_seconds_total', 'serialize_seconds', 'f', 'Tempo de serialização/renderização.'),
+            ('daily_manager_request_errors_total', 'errors', 'd', 'Respostas 5xx.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (method, endpoint), values in series.items():
+                value = values[key] if kind == 'd' else f'{values[key]:.6f}'
+                lines.append(f'{name}{{method="{method}",endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(getattr(settings, 'API_METRICS_BUCKETS', (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)))
+
+
+class RequestMetricsMiddleware:
+    """Mede cada requisição e adiciona o cabeçalho Server-Timing (funciona em WSGI e ASGI)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'API_METRICS_ENABLED', True):
+            return self.get_response(request)
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'API_METRICS_ENABLED', True):
+            return await self.get_response(request)
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total = metrics.total_time
+        endpoint = metrics.endpoint
+        response['Server-Timing'] = metrics.server_timing(total)
+        registry.observe(request.method, endpoint, response.status_code, metrics, total)
+        rate = getattr(settings, 'API_METRICS_LOG_SAMPLE_RATE', 0)
+        if rate and random.random() < rate:
+            logger.info(json.dumps({
+                'method': request.method, 'endpoint': endpoint, 'path': request.path, 'status': response.status_code,
+                'total_ms': round(total * 1000, 1), 'db_ms': round(metrics.db_time * 1000, 1),
+                'db_queries': metrics.db_queries, 'serialize_ms': round(metrics.serialize_time * 1000, 1),
+            }))
+        return response
+
+
+class InstrumentedViewMixin:
+    """Mixin para views do DRF: conta a serialização (serializer.data) e a renderização como 'serialize'."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_representation(instance):
+            with measure_serialization():
+                return to_representation(instance)
+        serializer.to_representation = timed_representation
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            with measure_serialization():
+                response.render() # Renderiza aqui para medir; o Django não renderiza de novo
+        return response
@@ -0,0 +1,214 @@
+import json
+import logging
+import tempfile
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from .models import Job
+from .rollups import rebuild_finance_rollups, rebuild_task_rollups
+from .serializers import JobSerializer
+
+logger = logging.getLogger(__name__)
+
+# Fila de trabalhos em segundo plano guardada no próprio banco (sem broker externo).
+#
+# Exportações e agregações pesadas podem ser pedidas com ?background=1 (ou POST /api/jobs/):
+# a API grava um Job e responde 202 com a URL para acompanhar; "manage.py run_worker" pega
+# os trabalhos da fila, executa o mesmo código do endpoint e guarda a resposta JSON (result)
+# ou o arquivo gerado (output), lidos em GET /api/jobs/<id>/ e /api/jobs/<id>/output/.
+# Os arquivos ficam no storage padrão (MEDIA_ROOT), não no banco: a exportação é escrita em
+# pedaços e servida em streaming, com memória constante no worker e na API.
+#
+# Para vários workers não pegarem o mesmo trabalho:
+# - PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED (cada worker pula as linhas já travadas);
+# - outros bancos (SQLite): UPDATE condicional (status e attempts iguais aos lidos); o banco
+#   serializa as escritas, então só um worker vence a disputa por cada linha.
+# Cada trabalho é uma concessão até locked_until (JOB_LEASE_SECONDS): se o worker morrer, o
+# trabalho volta a ser pego depois disso. Falhas inesperadas são repetidas até
+# JOB_MAX_ATTEMPTS vezes; parâmetros inválidos (erros da API) falham na hora.
+
+RETRY_DELAY = 30 # Segundos antes da 2ª tentativa; dobra a cada nova falha
+CLAIM_CANDIDATES = 10 # Linhas disputadas por rodada no UPDATE condicional
+
+
+class JobRequest:
+    """O que os helpers de views.py leem da requisição (GET, query_params e user), a partir de Job.params."""
+
+    def __init__(self, params, user=None):
+        self.GET = self.query_params = QueryDict(urlencode(params, doseq=True))
+        self.user = user or AnonymousUser() # Os dados lidos são os do dono do trabalho
+        self.method = 'GET'
+
+
+def run_progress(job, request):
+    from .views import task_progress # views importa este módulo
+    return task_progress(request)
+
+
+def run_analytics(job, request):
+    from .views import task_analytics
+    return task_analytics(request)
+
+
+def run_export(job, request):
+    from .views import FinanceViewSet, TaskViewSet
+    viewset = {'task': TaskViewSet, 'finance': FinanceViewSet}[job.params.get('model')]
+    view = viewset(request=request, format_kwarg=None, action='export', args=(), kwargs={})
+    chunks, content_type, filename = view.export_file(request)
+    with tempfile.TemporaryFile() as buffer: # Pedaços vão para o disco, como no streaming da exportação direta
+        for chunk in chunks:
+            buffer.write(chunk)
+        size = buffer.tell()
+        buffer.seek(0)
+        job.output.save(f'{job.pk}-{filename}', File(buffer), save=False)
+    job.content_type, job.filename = content_type, filename
+    return {'filename': filename, 'size': size}
+
+
+def run_rebuild_rollups(job, request):
+    start, end, only = request.GET.get('start'), request.GET.get('end'), request.GET.get('only')
+    result = {}
+    if only in (None, '', 'tasks'):
+        result['tasks'] = rebuild_task_rollups(start, end)
+    if only in (None, '', 'finances'):
+        result['finances'] = rebuild_finance_rollups(start, end)
+    return result
+
+
+# Tipo do trabalho -> (função que o executa, só para administradores)
+JOB_KINDS = {
+    'progress_by_day': (run_progress, False), # GET /api/tasks/?progress_by_day=1
+    'analytics': (run_analytics, False), # GET /api/tasks/analytics/
+    'export': (run_export, False), # GET /api/tasks|finances/export/ (params.model = 'task' ou 'finance')
+    'rebuild_rollups': (run_rebuild_rollups, True), # manage.py rebuild_rollups
+}
+
+
+def validate_job(kind, params, user):
+    """Erro 400/403 para tipos desconhecidos, parâmetros malformados ou tipos restritos."""
+    if kind not in JOB_KINDS:
+        raise ValidationError({'kind': f'Use um de: {", ".join(JOB_KINDS)}.'})
+    if JOB_KINDS[kind][1] and not (user and user.is_staff):
+        raise PermissionDenied('Somente administradores podem enfileirar este trabalho.')
+    if not isinstance(params, dict):
+        raise ValidationError({'params': 'Informe um objeto com os parâmetros da consulta.'})
+    if kind == 'export' and params.get('model') not in ('task', 'finance'):
+        raise ValidationError({'params': "Informe model: 'task' ou 'finance'."})
+
+
+def enqueue(kind, params=None, user=None):
+    """Grava um trabalho na fila e o devolve."""
+    params = params or {}
+    validate_job(kind, params, user)
+    return Job.objects.create(kind=kind, params=params, user_id=user.pk if user and user.is_authenticated else None)
+
+
+def wants_background(request):
+    return request.query_params.get('background') in ('1', 'true')
+
+
+def job_params(request):
+    """Query string da requisição (sem background/format) no formato de Job.params."""
+    return {
+        key: values if len(values) > 1 else values[0]
+        for key, values in request.query_params.lists() if key not in ('background', 'format')
+    }
+
+
+def job_response(request, job, status_code=status.HTTP_202_ACCEPTED):
+    """Resposta 202 com o trabalho e o Location para acompanhar o status."""
+    location = reverse('job-detail', args=[job.pk], request=request)
+    return Response(JobSerializer(job, context={'request': request}).data, status=status_code, headers={'Location': location})
+
+
+def enqueue_response(request, kind, params):
+    return job_response(request, enqueue(kind, params, request.user))
+
+
+def claim_job(worker, kinds=None):
+    """Marca o próximo trabalho disponível como executado por worker e o devolve (ou None)."""
+    now = timezone.now()
+    ready = Job.objects.filter(Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now))
+    if kinds:
+        ready = ready.filter(kind__in=kinds)
+    ready = ready.order_by('run_after', 'id')
+    claim = {
+        'status': Job.RUNNING, 'locked_by': worker, 'attempts': F('attempts') + 1, 'started_at': now,
+        'locked_until': now + timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 1800)),
+    }
+    using = router.db_for_write(Job)
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            pk = ready.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            Job.objects.filter(pk=pk).update(**claim)
+    else:
+        for pk, current, attempts in ready.values_list('pk', 'status', 'attempts')[:CLAIM_CANDIDATES]:
+            if Job.objects.filter(pk=pk, status=current, attempts=attempts).update(**claim):
+                break # Venceu a disputa; se outro worker pegou antes, tenta a próxima linha
+        else:
+            return None
+    return Job.objects.select_related('user').get(pk=pk)
+
+
+def finish_job(job, **fields):
+    """Grava o desfecho se o trabalho ainda for deste worker (a concessão pode ter expirado)."""
+    fields.update(locked_by='', locked_until=None)
+    updated = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts).update(**fields)
+    if not updated:
+        logger.warning('Trabalho %s retomado por outro worker; resultado descartado', job.pk)
+    return bool(updated)
+
+
+def run_job(job):
+    """Executa um trabalho já reservado por claim_job e grava o resultado, a falha ou a nova tentativa."""
+    handler = JOB_KINDS[job.kind][0] if job.kind in JOB_KINDS else None
+    try:
+        if handler is None:
+            raise ValidationError({'kind': f'Tipo desconhecido: {job.kind}.'})
+        result = handler(job, JobRequest(job.params, job.user))
+    except APIException as exc: # Parâmetros inválidos: repetir não adianta
+        job.status = Job.FAILED
+        finish_job(job, status=Job.FAILED, error=json.dumps(exc.detail, ensure_ascii=False), finished_at=timezone.now())
+    except Exception as exc:
+        logger.exception('Erro no trabalho %s (%s)', job.pk, job.kind)
+        error = f'{type(exc).__name__}: {exc}'
+        if job.attempts < getattr(settings, 'JOB_MAX_ATTEMPTS', 3):
+            job.status = Job.QUEUED
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            finish_job(job, status=Job.QUEUED, error=error, run_after=timezone.now() + timedelta(seconds=delay))
+        else:
+            job.status = Job.FAILED
+            finish_job(job, status=Job.FAILED, error=error, finished_at=timezone.now())
+    else:
+        job.status = Job.DONE
+        finished = finish_job(
+            job, status=Job.DONE, result=result, output=job.output.name, content_type=job.content_type,
+            filename=job.filename, error='', finished_at=timezone.now(),
+        )
+        if not finished and job.output:
+            job.output.delete(save=False) # Resultado descartado: o arquivo também
+    return job
+
+
+def prune_jobs(days):
+    """Descarta trabalhos terminados há mais de days dias; retorna quantos saíram."""
+    horizon = timezone.now() - timedelta(days=days)
+    expired = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=horizon)
+    for job in expired.exclude(output='').only('output'):
+        job.output.delete(save=False) # O delete() do queryset não apaga os arquivos do storage
+    deleted, _ = expired.delete()
+    return deleted
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archiving import ARCHIVE_SPECS, archive_policy, archive_rows, policy_days
+from tasks.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        'Move tarefas concluídas e lançamentos antigos para as tabelas de arquivo, em lotes. '
+        'Os dias padrão vêm de ARCHIVE_TASKS_AFTER_DAYS e ARCHIVE_FINANCES_AFTER_DAYS (0 = não arquiva). '
+        'Também descarta os tombstones da sincronização com mais de SYNC_TOMBSTONE_DAYS dias.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=list(ARCHIVE_SPECS), help='Arquiva apenas tarefas ou apenas finanças.')
+        parser.add_argument('--tasks-days', type=int, help='Arquiva tarefas concluídas há mais de N dias.')
+        parser.add_argument('--finances-days', type=int, help='Arquiva lançamentos com mais de N dias.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Linhas por transação.')
+        parser.add_argument('--tombstone-days', type=int, help='Descarta tombstones de /api/sync/ com mais de N dias.')
+        parser.add_argument('--dry-run', action='store_true', help='Só conta as linhas elegíveis.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser pelo menos 1.')
+        for name in ARCHIVE_SPECS:
+            if options['only'] and options['only'] != name:
+                continue
+            days = options[f'{name}_days']
+            days = policy_days(name) if days is None else days
+            if days <= 0:
+                self.stdout.write(f'{name}: política desligada.')
+                continue
+            if options['dry_run']:
+                count = ARCHIVE_SPECS[name]['model'].objects.filter(archive_policy(name, days)).count()
+                self.stdout.write(f'{name}: {count} linhas seriam arquivadas (mais de {days} dias).')
+                continue
+            started = time.perf_counter()
+            moved = archive_rows(name, days, options['batch_size'], progress=lambda moved: self.stdout.write(f'  {name}: {moved}...'))
+            self.stdout.write(self.style.SUCCESS(f'{name}: {moved} linhas arquivadas em {time.perf_counter() - started:.1f}s (mais de {days} dias).'))
+        tombstone_days = options['tombstone_days']
+        tombstone_days = getattr(settings, 'SYNC_TOMBSTONE_DAYS', 0) if tombstone_days is None else tombstone_days
+        if tombstone_days > 0 and not options['dry_run'] and not options['only']:
+            self.stdout.write(f'tombstones: {prune_tombstones(tombstone_days)} descartados (mais de {tombstone_days} dias).')
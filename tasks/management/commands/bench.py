@@ -0,0 +1,256 @@
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.client import ClientHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tasks.authentication import TokenObtainPairWithClaimsSerializer
+from tasks.handlers import MiddlewareProfileMixin
+from tasks.caching import CHANGE_SEQUENCE, owner_sequence
+from tasks.models import DataVersion, Finance, Task
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'bench_baseline.json'
+
+# Cenários: (nome, método, caminho, parâmetros ou corpo JSON[, cabeçalhos]). Os marcadores
+# {today}, {month_start}, {year_start}, {task}, {finance} e {recent_changes} (token de /api/sync/ 50
+# alterações atrás) são preenchidos com valores do banco em uso. As requisições são feitas como o
+# dono dos dados (--owner; por padrão, o usuário com mais tarefas): com muitos usuários
+# (seed_synthetic --users 1000), mede o custo de ler a fatia de um usuário numa tabela compartilhada.
+# Baseline desse cenário: tasks/bench_baseline_1k_users.json (seed_synthetic --users 1000 --tasks 100000
+# --finances 100000, depois bench --baseline tasks/bench_baseline_1k_users.json).
+SCENARIOS = [
+    ('tasks.list', 'get', '/api/tasks/', {}),
+    ('tasks.list.page', 'get', '/api/tasks/', {'page_size': '50'}),
+    ('tasks.list.tag', 'get', '/api/tasks/', {'tag': 'casa'}),
+    ('tasks.list.tags_any', 'get', '/api/tasks/', {'tag': 'casa,estudo', 'tag_mode': 'any', 'page_size': '50'}),
+    ('tasks.list.week', 'get', '/api/tasks/', {'view': 'week', 'date': '{today}'}),
+    ('tasks.progress', 'get', '/api/tasks/', {'progress_by_day': '1', 'start': '{month_start}', 'end': '{today}'}),
+    ('tasks.progress.tag', 'get', '/api/tasks/', {'progress_by_day': '1', 'tag': 'trabalho'}),
+    ('tasks.progress.view', 'get', '/api/tasks/', {'progress_by_day': '1', 'view': 'month', 'date': '{today}', 'start': '{month_start}', 'end': '{today}'}),
+    ('tasks.analytics', 'get', '/api/tasks/analytics/', {'start': '{year_start}'}),
+    ('tasks.analytics.tag', 'get', '/api/tasks/analytics/', {'tag': 'trabalho', 'granularity': 'week'}),
+    ('tasks.detail', 'get', '/api/tasks/{task}/', {}),
+    ('tasks.export', 'get', '/api/tasks/export/', {'start': '{month_start}', 'end': '{today}'}),
+    ('finances.list', 'get', '/api/finances/', {}),
+    ('finances.list.date', 'get', '/api/finances/', {'date': '{today}'}),
+    ('finances.detail', 'get', '/api/finances/{finance}/', {}),
+    ('finances.by_day', 'get', '/api/finances/by_day/', {'start': '{month_start}', 'end': '{today}'}),
+    ('finances.by_day.date', 'get', '/api/finances/by_day/', {'date': '{today}'}),
+    ('finances.by_day.tags_any', 'get', '/api/finances/by_day/', {'start': '{year_start}', 'end': '{today}', 'tag': 'comida,mercado', 'tag_mode': 'any'}), # Soma direto dos lançamentos
+    ('finances.series.month', 'get', '/api/finances/series/', {'granularity': 'month', 'start': '{year_start}', 'breakdown': 'tags'}),
+    ('finances.series.year', 'get', '/api/finances/series/', {'granularity': 'year'}),
+    ('finances.totals', 'get', '/api/finances/totals/', {'start': '{month_start}', 'end': '{today}'}),
+    ('finances.totals.tags_any', 'get', '/api/finances/totals/', {'tag': 'comida,mercado', 'tag_mode': 'any'}),
+    ('calendar', 'get', '/api/calendar/', {'include_tasks': '1'}),
+    ('async.tasks', 'get', '/api/async/tasks/', {'view': 'week', 'date': '{today}'}),
+    ('async.progress', 'get', '/api/async/tasks/', {'progress_by_day': '1', 'start': '{month_start}', 'end': '{today}'}),
+    ('async.finances.by_day', 'get', '/api/async/finances/by_day/', {'start': '{month_start}', 'end': '{today}'}),
+    ('async.finances.totals', 'get', '/api/async/finances/totals/', {}),
+    ('async.calendar', 'get', '/api/async/calendar/', {'include_tasks': '1'}),
+    ('sync.first_page', 'get', '/api/sync/', {}),
+    ('sync.delta', 'get', '/api/sync/', {'since': '{recent_changes}'}),
+    ('metrics', 'get', '/api/_metrics', {}),
+    ('cors.preflight', 'options', '/api/tasks/', '', {'Origin': 'http://localhost:3000', 'Access-Control-Request-Method': 'POST'}),
+    ('tasks.create', 'post', '/api/tasks/', {'title': 'Bench', 'tags': 'casa, trabalho'}),
+    ('tasks.update', 'patch', '/api/tasks/{task}/', {'is_completed': True, 'tags': 'casa'}),
+    ('tasks.bulk_create', 'post', '/api/tasks/bulk_create/', [{'title': f'Bench {i}', 'tags': 'estudo'} for i in range(20)]),
+    ('tasks.bulk_complete', 'post', '/api/tasks/bulk_complete/', {'ids': ['{task}']}),
+    ('finances.create', 'post', '/api/finances/', {'description': 'Bench', 'value': '-10.00', 'tags': 'comida'}),
+    ('finances.update', 'patch', '/api/finances/{finance}/', {'value': '-12.50'}),
+]
+
+
+class ProfiledClientHandler(MiddlewareProfileMixin, ClientHandler):
+    """Handler do test client com os perfis de middleware de produção (tasks/handlers.py)."""
+
+
+def percentile(values, fraction):
+    """Percentil pelo método nearest-rank (values ordenado)."""
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3), 'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3), 'mean_ms': round(sum(timings) / len(timings), 3),
+    }
+
+
+def fill(value, context):
+    if isinstance(value, str):
+        filled = value.format(**context)
+        return int(filled) if value in ('{task}', '{finance}') and filled.isdigit() else filled
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência (p50/p95/p99) e nº de consultas de cada endpoint da API pelo test client, '
+        'sobre os dados do banco atual (as escritas são desfeitas ao final), e compara com um baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Medições por cenário.')
+        parser.add_argument('--warmup', type=int, default=3, help='Execuções descartadas antes de medir.')
+        parser.add_argument('--only', action='append', help='Padrão (fnmatch) dos cenários a rodar; pode repetir.')
+        parser.add_argument('--output', '-o', help='Grava os resultados em JSON neste arquivo.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Arquivo de baseline para comparação.')
+        parser.add_argument('--no-compare', action='store_true', help='Não compara com o baseline.')
+        parser.add_argument('--update-baseline', action='store_true', help='Grava os resultados como novo baseline.')
+        parser.add_argument('--gate', choices=['p50', 'p95', 'p99'], default='p50', help='Percentil comparado com o baseline (p50 é o mais estável).')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Folga relativa sobre o baseline (0.25 = +25%%).')
+        parser.add_argument('--slack-ms', type=float, default=2.0, help='Folga absoluta (ms), para medidas muito curtas.')
+        parser.add_argument('--cache', action='store_true', help='Mantém o cache de respostas ligado (padrão: desligado, mede o trabalho real).')
+        parser.add_argument('--owner', help='Usuário cujos dados são lidos (padrão: o que tem mais tarefas).')
+        parser.add_argument('--startup', type=int, default=0, metavar='N', help='Mede também N vezes a importação de daily_manager.wsgi num processo novo.')
+
+    def measure(self, client, method, path, payload, headers, repeat, warmup):
+        kwargs = {'data': payload, 'headers': headers}
+        if method not in ('get', 'options'):
+            kwargs['content_type'] = 'application/json'
+        gc.collect()
+        gc.disable() # Como no timeit: pausas do coletor não entram nas medidas
+        try:
+            return self._measure(client, method, path, kwargs, repeat, warmup)
+        finally:
+            gc.enable()
+
+    def _measure(self, client, method, path, kwargs, repeat, warmup):
+        timings, queries, status = [], 0, None
+        for run in range(warmup + repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(path, **kwargs)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if run >= warmup:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(captured))
+                status = response.status_code
+        return {'status': status, 'queries': queries, **summarize(timings)}
+
+    def bench_owner(self, username):
+        """Usuário informado em --owner ou, sem ele, o dono de mais tarefas (None num banco vazio)."""
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Usuário inexistente: {username}')
+        return User.objects.annotate(task_count=Count('tasks')).filter(task_count__gt=0).order_by('-task_count', 'pk').first()
+
+    def run_scenarios(self, options):
+        today = timezone.localdate()
+        owner = self.bench_owner(options['owner'])
+        context = {
+            'today': today.isoformat(), 'month_start': today.replace(day=1).isoformat(), 'year_start': today.replace(month=1, day=1).isoformat(),
+            'task': Task.objects.filter(owner=owner).order_by('-created_at').values_list('pk', flat=True).first() if owner else None,
+            'finance': Finance.objects.filter(owner=owner).order_by('-created_at').values_list('pk', flat=True).first() if owner else None,
+            'recent_changes': max(0, (DataVersion.objects.filter(name=owner_sequence(CHANGE_SEQUENCE, owner.pk if owner else None)).values_list('version', flat=True).first() or 0) - 50),
+        }
+        results = {}
+        with transaction.atomic():
+            user = owner or get_user_model().objects.create_user('bench-runner')
+            user.is_staff = True # /api/_metrics é só para administradores; desfeito com o resto
+            user.save(update_fields=['is_staff'])
+            if context['task'] is None:
+                context['task'] = Task.objects.create(title='Bench', owner=user).pk
+            if context['finance'] is None:
+                context['finance'] = Finance.objects.create(description='Bench', value='1.00', owner=user).pk
+            client = Client(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f'Bearer {TokenObtainPairWithClaimsSerializer.get_token(user).access_token}')
+            client.handler = ProfiledClientHandler(enforce_csrf_checks=False) # Mesmas cadeias de middleware do wsgi/asgi
+            for name, method, path, payload, *extra in SCENARIOS:
+                if options['only'] and not any(fnmatch(name, pattern) for pattern in options['only']):
+                    continue
+                results[name] = self.measure(client, method, fill(path, context), fill(payload, context), extra[0] if extra else None, options['repeat'], options['warmup'])
+                self.write_result(name, results[name])
+            transaction.set_rollback(True) # Não deixa o usuário nem as escritas no banco
+        self.owner = owner
+        return results
+
+    def write_result(self, name, result):
+        self.stdout.write(f'{name:<24} {result["status"]:>4} {result["queries"]:>4} '
+                          f'{result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f}')
+
+    def measure_startup(self, runs):
+        """Tempo de um worker novo até ter a aplicação WSGI pronta (imports, setup e middlewares)."""
+        code = 'import daily_manager.wsgi'
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'daily_manager.settings')}
+        subprocess.run([sys.executable, '-c', code], env=env, check=True, cwd=settings.BASE_DIR) # Aquece o cache de bytecode
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], env=env, check=True, cwd=settings.BASE_DIR)
+            timings.append((time.perf_counter() - started) * 1000)
+        return {'status': 200, 'queries': 0, **summarize(timings)}
+
+    def compare(self, results, baseline, options):
+        """Lista de regressões em relação ao baseline (consultas a mais ou percentil acima da folga)."""
+        regressions = []
+        for name, result in results.items():
+            if result['status'] >= 400:
+                regressions.append(f'{name}: status {result["status"]}')
+            reference = baseline.get('results', {}).get(name)
+            if reference is None:
+                continue
+            if result['queries'] > reference['queries']:
+                regressions.append(f'{name}: {result["queries"]} consultas (baseline {reference["queries"]})')
+            key = f'{options["gate"]}_ms'
+            limit = reference[key] * (1 + options['tolerance']) + options['slack_ms']
+            if result[key] > limit:
+                regressions.append(f'{name}: {options["gate"]} {result[key]:.2f}ms > {limit:.2f}ms (baseline {reference[key]:.2f}ms)')
+        return regressions
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"cenário":<24} {"http":>4} {"sql":>4} {"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9}')
+        with override_settings(API_CACHE_ENABLED=options['cache'] and settings.API_CACHE_ENABLED):
+            results = self.run_scenarios(options)
+        if options['startup']:
+            results['startup.wsgi'] = self.measure_startup(options['startup'])
+            self.write_result('startup.wsgi', results['startup.wsgi'])
+        report = {
+            'meta': {
+                'date': timezone.now().isoformat(timespec='seconds'), 'database': connection.vendor,
+                'tasks': Task.objects.count(), 'finances': Finance.objects.count(), 'users': get_user_model().objects.count(),
+                'owner_tasks': Task.objects.filter(owner=self.owner).count() if self.owner else 0,
+                'repeat': options['repeat'], 'cache': options['cache'],
+                'middleware_profile': getattr(settings, 'API_MIDDLEWARE_PROFILE', 'full'),
+                'python': platform.python_version(), 'django': django.get_version(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Baseline atualizado em {baseline_path}.'))
+            return
+        if options['no_compare'] or not baseline_path.exists():
+            return
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        regressions = self.compare(results, baseline, options)
+        if regressions:
+            raise CommandError('Regressões em relação ao baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'Dentro do baseline ({baseline_path.name}, {len(results)} cenários).'))
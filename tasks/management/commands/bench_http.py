@@ -0,0 +1,84 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera carga HTTP contra um servidor já em execução e mede requisições/s e latências (p50/p99). '
+        'Para comparar WSGI e ASGI com o mesmo número de workers, rode o mesmo comando contra, por exemplo, '
+        '"gunicorn daily_manager.wsgi -w 4" e "uvicorn daily_manager.asgi:application --workers 4".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs completas a medir (ex.: http://127.0.0.1:8000/api/calendar/).')
+        parser.add_argument('--concurrency', '-c', type=int, default=16, help='Clientes simultâneos.')
+        parser.add_argument('--duration', '-d', type=float, default=10, help='Segundos de carga por URL.')
+        parser.add_argument('--token', help='Token JWT de acesso (Bearer).')
+        parser.add_argument('--username', help='Usuário para obter o token em /api/token/ (alternativa a --token).')
+        parser.add_argument('--password', help='Senha do usuário.')
+
+    def obtain_token(self, url, username, password):
+        parts = urlsplit(url)
+        connection = http.client.HTTPConnection(parts.netloc, timeout=30)
+        body = json.dumps({'username': username, 'password': password})
+        connection.request('POST', '/api/token/', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise CommandError(f'Falha ao obter token ({response.status}): {response.read()[:200]!r}')
+        return json.loads(response.read())['access']
+
+    def run_load(self, url, headers, concurrency, duration):
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        latencies, errors, lock = [], [0], threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client():
+            connection = http.client.HTTPConnection(parts.netloc, timeout=60) # Keep-alive por cliente
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection(parts.netloc, timeout=60)
+                    continue
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(latencies), errors[0], time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        token = options['token']
+        if not token and options['username']:
+            token = self.obtain_token(options['urls'][0], options['username'], options['password'])
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self.stdout.write(f'{options["concurrency"]} clientes, {options["duration"]:.0f}s por URL')
+        self.stdout.write(f'{"req/s":>8} {"p50 (ms)":>9} {"p99 (ms)":>9} {"erros":>6}  url')
+        for url in options['urls']:
+            latencies, errors, elapsed = self.run_load(url, headers, options['concurrency'], options['duration'])
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f'Nenhuma resposta de {url} ({errors} erros).'))
+                continue
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            self.stdout.write(f'{len(latencies) / elapsed:>8.1f} {p50:>9.1f} {p99:>9.1f} {errors:>6}  {url}')
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from tasks import fastpath
+from tasks.models import Finance, Task
+from tasks.serializers import FinanceSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara a serialização padrão do DRF com o caminho rápido de listas (dados temporários, desfeitos ao final).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='Tamanhos de lista a medir.')
+        parser.add_argument('--repeat', type=int, default=3, help='Repetições por medida (vale o melhor tempo).')
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    def handle(self, *args, **options):
+        engine = 'orjson' if fastpath.orjson else 'json (orjson não instalado)'
+        self.stdout.write(f'Encoder do caminho rápido: {engine}')
+        self.stdout.write(f'{"modelo":<8} {"linhas":>8} {"drf (s)":>10} {"rápido (s)":>11} {"ganho":>7}')
+        for model, serializer_class, make in (
+            (Task, TaskSerializer, lambda i: Task(title=f'Tarefa {i}', description='Descrição de exemplo', tags='casa, trabalho', is_completed=i % 3 == 0)),
+            (Finance, FinanceSerializer, lambda i: Finance(description=f'Lançamento {i}', value=f'{i % 500}.{i % 100:02d}', tags='comida')),
+        ):
+            for rows in options['rows']:
+                with transaction.atomic():
+                    model.objects.bulk_create([make(i) for i in range(rows)], batch_size=2000)
+                    queryset = model.objects.order_by('-created_at')
+                    drf_time, expected = self.best_of(options['repeat'], lambda: JSONRenderer().render(serializer_class(queryset, many=True).data))
+                    fast_time, content = self.best_of(options['repeat'], lambda: fastpath.render_list(queryset, serializer_class()))
+                    if content != expected:
+                        self.stderr.write(self.style.ERROR(f'Saída diferente para {model.__name__} com {rows} linhas!'))
+                    self.stdout.write(f'{model.__name__:<8} {rows:>8} {drf_time:>10.3f} {fast_time:>11.3f} {drf_time / fast_time:>6.1f}x')
+                    transaction.set_rollback(True) # Não deixa os dados de teste no banco
+        self.stdout.write(self.style.SUCCESS(f'Concluído em {timezone.now():%H:%M:%S}.'))
@@ -0,0 +1,50 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.exporting import EXPORT_FORMATS, iter_export
+from tasks.filters import day_window, filter_by_tags, filter_window
+from tasks.models import Finance, Task
+from tasks.serializers import FinanceSerializer, TaskSerializer
+
+MODELS = {
+    'tasks': (Task, TaskSerializer),
+    'finances': (Finance, FinanceSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = 'Exporta tarefas ou finanças em CSV/NDJSON direto para um arquivo (mesmo formato de /api/<modelo>/export/).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS, help='O que exportar.')
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv', help='Formato do arquivo.')
+        parser.add_argument('--output', '-o', default='-', help='Arquivo de saída; "-" para a saída padrão.')
+        parser.add_argument('--start', help='Dia inicial (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Dia final (YYYY-MM-DD).')
+        parser.add_argument('--tag', help='Uma ou mais tags separadas por vírgula (todas precisam estar presentes).')
+        parser.add_argument('--owner', help='Só os itens deste usuário (username); padrão: de todos os usuários.')
+
+    def handle(self, *args, **options):
+        model, serializer_class = MODELS[options['model']]
+        queryset = filter_window(model.objects.all(), day_window(options['start'], options['end']))
+        owner = None
+        if options['owner']:
+            owner = get_user_model().objects.filter(username=options['owner']).first()
+            if owner is None:
+                raise CommandError(f'Usuário não encontrado: {options["owner"]}.')
+            queryset = queryset.filter(owner=owner)
+        if options['tag']:
+            queryset = filter_by_tags(queryset, options['tag'], owner=owner)
+        chunks = iter_export(queryset, serializer_class(), options['export_format'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Exportado para {options["output"]} ({size} bytes).'))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.importing import IMPORT_FORMATS, guess_format, import_records, read_records, supports_copy
+from tasks.models import Finance, Task
+
+MODELS = {
+    'tasks': Task,
+    'finances': Finance,
+}
+
+
+class Command(BaseCommand):
+    help = 'Importa histórico de tarefas ou finanças (CSV, NDJSON ou OFX) em lotes, ignorando linhas já importadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS, help='O que importar.')
+        parser.add_argument('path', help='Arquivo de entrada.')
+        parser.add_argument('--owner', required=True, help='Usuário (username) dono dos itens importados.')
+        parser.add_argument('--format', dest='file_format', choices=IMPORT_FORMATS, help='Formato do arquivo (padrão: pela extensão).')
+        parser.add_argument('--delimiter', default=',', help='Separador das colunas do CSV.')
+        parser.add_argument('--batch-size', type=int, default=settings.API_IMPORT_BATCH_SIZE, help='Linhas por transação.')
+        parser.add_argument('--copy', action='store_true', help='Grava com COPY (somente PostgreSQL).')
+        parser.add_argument('--progress-every', type=int, default=10000, help='Mostra o progresso a cada N linhas lidas.')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        file_format = options['file_format'] or guess_format(options['path'])
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f'Não foi possível identificar o formato de {options["path"]}; use --format.')
+        if file_format == 'ofx' and model is not Finance:
+            raise CommandError('OFX só pode ser importado em finanças.')
+        if options['copy'] and not supports_copy():
+            raise CommandError('--copy exige PostgreSQL com psycopg2.')
+        owner = get_user_model().objects.filter(username=options['owner']).first()
+        if owner is None:
+            raise CommandError(f'Usuário não encontrado: {options["owner"]}.')
+        with open(options['path'], 'rb') as stream:
+            report = import_records(
+                model, read_records(stream, file_format, options['delimiter']), owner.pk,
+                batch_size=options['batch_size'], use_copy=options['copy'] or None,
+                progress=lambda report: self.stderr.write(str(report)), progress_every=options['progress_every'],
+            )
+        for error in report.errors[:10]:
+            self.stderr.write(self.style.WARNING(f'Linha {error["line"]}: {error["errors"]}'))
+        self.stderr.write(self.style.SUCCESS(f'Importação concluída em {report.elapsed:.1f}s: {report}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tasks.partitioning import ensure_finance_partitions, is_partitioned, partition_finance_table
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL: converte tasks_finance em tabela particionada por mês de created_at (uma vez) '
+        'e cria as partições dos próximos meses. Rode periodicamente (ex.: cron mensal).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='Meses futuros com partição criada.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'Particionamento declarativo exige PostgreSQL (banco atual: {connection.vendor}).')
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead não pode ser negativo.')
+        with connection.cursor() as cursor:
+            partitioned = is_partitioned(cursor)
+        if not partitioned:
+            copied = partition_finance_table(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'tasks_finance particionada por mês ({copied} linhas copiadas).'))
+            return
+        created = ensure_finance_partitions(options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(f'Partições conferidas: {created} meses a partir do atual.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tasks.rollups import rebuild_finance_rollups, rebuild_task_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula (ou repara) as tabelas de rollup diário de tarefas e finanças.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Dia inicial (YYYY-MM-DD); padrão: todo o histórico.')
+        parser.add_argument('--end', help='Dia final (YYYY-MM-DD); padrão: todo o histórico.')
+        parser.add_argument('--only', choices=['tasks', 'finances'], help='Recalcula apenas um dos rollups.')
+
+    def handle(self, *args, **options):
+        start, end, only = options['start'], options['end'], options['only']
+        if only in (None, 'tasks'):
+            rows = rebuild_task_rollups(start, end)
+            self.stdout.write(self.style.SUCCESS(f'Rollups de tarefas recalculados: {rows} linhas.'))
+        if only in (None, 'finances'):
+            rows = rebuild_finance_rollups(start, end)
+            self.stdout.write(self.style.SUCCESS(f'Rollups financeiros recalculados: {rows} linhas.'))
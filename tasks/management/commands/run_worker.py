@@ -0,0 +1,60 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.jobs import JOB_KINDS, claim_job, prune_jobs, run_job
+
+PRUNE_INTERVAL = 3600 # Segundos entre limpezas dos trabalhos antigos
+
+
+class Command(BaseCommand):
+    help = 'Executa os trabalhos da fila em segundo plano (exportações e agregações pesadas, ver tasks/jobs.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Sai quando a fila estiver vazia (cron, testes).')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Segundos entre consultas com a fila vazia.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Sai depois de N trabalhos (0 = sem limite).')
+        parser.add_argument('--kinds', help=f'Só estes tipos, separados por vírgula ({", ".join(JOB_KINDS)}).')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        kinds = [kind.strip() for kind in options['kinds'].split(',')] if options['kinds'] else None
+        self.stopping = False
+        previous = self.install_signal_handlers()
+        processed, last_prune = 0, 0
+        try:
+            while not self.stopping:
+                close_old_connections() # Processo longo: descarta conexões expiradas, como ao fim de cada requisição
+                if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    prune_jobs(getattr(settings, 'JOB_RETENTION_DAYS', 7))
+                    last_prune = time.monotonic()
+                job = claim_job(worker, kinds)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                run_job(job)
+                processed += 1
+                self.stdout.write(f'{job.kind} #{job.pk}: {job.status}')
+                if options['max_jobs'] and processed >= options['max_jobs']:
+                    break
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker}: {processed} trabalhos executados.'))
+
+    def install_signal_handlers(self):
+        """SIGTERM/SIGINT terminam o trabalho atual antes de sair; devolve os handlers anteriores."""
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+
+        def stop(signum, frame):
+            self.stopping = True
+        return {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
@@ -0,0 +1,134 @@
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.caching import bump_data_version
+from tasks.models import Finance, Task
+from tasks.rollups import rebuild_finance_rollups, rebuild_task_rollups
+from tasks.signals import bulk_maintenance
+from tasks.sync import stamp_changes
+from tasks.tagging import sync_tags_bulk
+
+# Vocabulário de tags em ordem de popularidade; os pesos seguem uma distribuição de Zipf,
+# como acontece com tags reais (poucas muito usadas, muitas raras).
+TASK_TAGS = ['trabalho', 'casa', 'estudo', 'saúde', 'mercado', 'financeiro', 'família', 'projeto', 'leitura', 'academia', 'carro', 'viagem', 'pets', 'jardim', 'burocracia']
+FINANCE_TAGS = ['comida', 'mercado', 'transporte', 'contas', 'lazer', 'saúde', 'casa', 'educação', 'assinaturas', 'presentes', 'viagem', 'pets']
+TASK_TITLES = ['Responder e-mails', 'Reunião de equipe', 'Lavar a louça', 'Estudar {}', 'Pagar {}', 'Comprar {}', 'Revisar {}', 'Ligar para {}', 'Organizar {}', 'Treino de {}']
+TASK_OBJECTS = ['relatório', 'contas', 'pão', 'documentos', 'médico', 'inglês', 'garagem', 'pernas', 'orçamento', 'mãe']
+FINANCE_DESCRIPTIONS = ['Padaria', 'Supermercado', 'Uber', 'Conta de luz', 'Cinema', 'Farmácia', 'Restaurante', 'Combustível', 'Streaming', 'Feira', 'Internet', 'Livraria']
+TAG_COUNT_WEIGHTS = [0.25, 0.45, 0.22, 0.08] # Probabilidade de 0, 1, 2 ou 3 tags por item
+WEEKDAY_WEIGHTS = [1.2, 1.15, 1.1, 1.1, 1.0, 0.6, 0.5] # Segunda a domingo: menos atividade no fim de semana
+HOUR_WEIGHTS = [0.1] * 6 + [0.5, 1.2, 1.6, 1.8, 1.6, 1.2, 1.0, 1.3, 1.4, 1.3, 1.1, 1.0, 1.2, 1.4, 1.2, 0.8, 0.5, 0.2]
+
+
+def zipf_weights(size, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, size + 1)]
+
+
+class Generator:
+    """Gera tarefas e lançamentos com distribuições realistas de datas, tags e valores."""
+
+    def __init__(self, days, seed, owners):
+        self.random = random.Random(seed)
+        self.owners = owners
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+        self.days = [self.today - timedelta(days=offset) for offset in range(days)]
+        self.day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in self.days]
+        self.task_tag_weights = zipf_weights(len(TASK_TAGS))
+        self.finance_tag_weights = zipf_weights(len(FINANCE_TAGS))
+        self.tz = timezone.get_default_timezone()
+
+    def instant(self):
+        day = self.random.choices(self.days, self.day_weights)[0]
+        hour = self.random.choices(range(24), HOUR_WEIGHTS)[0]
+        moment = datetime.combine(day, dt_time(hour, self.random.randrange(60), self.random.randrange(60)))
+        return min(timezone.make_aware(moment, self.tz), self.now) # Horários de hoje ainda por vir viram agora
+
+    def tags(self, vocabulary, weights):
+        count = self.random.choices(range(4), TAG_COUNT_WEIGHTS)[0]
+        chosen = []
+        while len(chosen) < count:
+            tag = self.random.choices(vocabulary, weights)[0]
+            if tag not in chosen:
+                chosen.append(tag)
+        return ', '.join(chosen)
+
+    def task(self):
+        created_at = self.instant()
+        age = (self.today - timezone.localtime(created_at).date()).days
+        done = self.random.random() < (0.85 if age > 7 else 0.4) # Tarefas antigas costumam estar concluídas
+        completed_at = None
+        if done:
+            completed_at = max(created_at, min(created_at + timedelta(hours=self.random.lognormvariate(2.5, 1.2)), self.now))
+        title = self.random.choice(TASK_TITLES).format(self.random.choice(TASK_OBJECTS))
+        return Task(
+            title=title, description='' if self.random.random() < 0.6 else f'Detalhes de "{title}".',
+            created_at=created_at, is_completed=done, completed_at=completed_at,
+            tags=self.tags(TASK_TAGS, self.task_tag_weights), owner_id=self.random.choice(self.owners),
+        )
+
+    def finance(self):
+        created_at = self.instant()
+        if self.random.random() < 0.08:
+            description = 'Salário' if self.random.random() < 0.6 else 'Freela'
+            value = Decimal(self.random.randrange(150000, 900000)) / 100 # Entradas: poucas e altas
+            tags = 'renda'
+        else:
+            description = self.random.choice(FINANCE_DESCRIPTIONS)
+            value = -min(Decimal(str(round(self.random.lognormvariate(3.4, 0.9), 2))), Decimal('99999.99')) # Gastos: muitos pequenos, poucos grandes
+            tags = self.tags(FINANCE_TAGS, self.finance_tag_weights)
+        return Finance(description=description, value=value, tags=tags, created_at=created_at, owner_id=self.random.choice(self.owners))
+
+
+class Command(BaseCommand):
+    help = 'Gera dados sintéticos (tarefas e finanças) com bulk inserts, para benchmarks e testes de carga.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Quantidade de tarefas.')
+        parser.add_argument('--finances', type=int, default=10000, help='Quantidade de lançamentos financeiros.')
+        parser.add_argument('--days', type=int, default=365, help='Dias de histórico (terminando hoje).')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador (mesma semente, mesmos dados).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Linhas por transação.')
+        parser.add_argument('--users', type=int, default=1, help='Usuários (synthetic-1, synthetic-2, ...) entre os quais os itens são distribuídos.')
+
+    def owners(self, count):
+        """Ids dos usuários synthetic-1..count (criados se ainda não existirem)."""
+        User = get_user_model()
+        names = [f'synthetic-{number}' for number in range(1, count + 1)]
+        User.objects.bulk_create([User(username=name) for name in names], ignore_conflicts=True, batch_size=1000)
+        return sorted(User.objects.filter(username__in=names).values_list('pk', flat=True))
+
+    def insert(self, model, make, count, batch_size):
+        for offset in range(0, count, batch_size):
+            objs = [make() for _ in range(min(batch_size, count - offset))]
+            with transaction.atomic(), bulk_maintenance():
+                stamp_changes(objs)
+                model.objects.bulk_create(objs, batch_size=1000)
+                sync_tags_bulk(model, [(obj.pk, obj.tags, obj.owner_id) for obj in objs], created=True)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days deve ser pelo menos 1.')
+        if options['users'] < 1:
+            raise CommandError('--users deve ser pelo menos 1.')
+        started = time.perf_counter()
+        generator = Generator(options['days'], options['seed'], self.owners(options['users']))
+        self.insert(Task, generator.task, options['tasks'], options['batch_size'])
+        self.insert(Finance, generator.finance, options['finances'], options['batch_size'])
+        # Os inserts não passam pelos sinais: os rollups do período são recalculados de uma vez
+        start, end = generator.days[-1], generator.today
+        rebuild_task_rollups(start, end)
+        rebuild_finance_rollups(start, end)
+        for owner in generator.owners:
+            bump_data_version('task', 'finance', owner=owner)
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["tasks"]} tarefas e {options["finances"]} lançamentos de {options["users"]} usuário(s) entre {start} e {end} '
+            f'em {time.perf_counter() - started:.1f}s (semente {options["seed"]}).'
+        ))
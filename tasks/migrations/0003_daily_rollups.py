@@ -0,0 +1,82 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:16
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _tags(value):
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def populate_rollups(apps, schema_editor):
+    # Preenche os rollups com o histórico existente (mesma regra de tasks.rollups)
+    Task = apps.get_model('tasks', 'Task')
+    Finance = apps.get_model('tasks', 'Finance')
+    TaskDailyRollup = apps.get_model('tasks', 'TaskDailyRollup')
+    FinanceDailyRollup = apps.get_model('tasks', 'FinanceDailyRollup')
+    tz = timezone.get_default_timezone()
+    counts = defaultdict(lambda: [0, 0])
+    for created_at, tags, is_completed in Task.objects.values_list('created_at', 'tags', 'is_completed').iterator(chunk_size=2000):
+        day = timezone.localtime(created_at, tz).date()
+        for tag in [''] + _tags(tags):
+            counts[(day, tag)][0] += 1
+            counts[(day, tag)][1] += int(is_completed)
+    TaskDailyRollup.objects.bulk_create(
+        [TaskDailyRollup(day=day, tag=tag, total=total, completed=done) for (day, tag), (total, done) in counts.items()],
+        batch_size=1000,
+    )
+    sums = defaultdict(lambda: [Decimal('0'), 0])
+    for created_at, tags, value in Finance.objects.values_list('created_at', 'tags', 'value').iterator(chunk_size=2000):
+        day = timezone.localtime(created_at, tz).date()
+        for tag in [''] + _tags(tags):
+            sums[(day, tag)][0] += value
+            sums[(day, tag)][1] += 1
+    FinanceDailyRollup.objects.bulk_create(
+        [FinanceDailyRollup(day=day, tag=tag, total=total, count=count) for (day, tag), (total, count) in sums.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_finance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tag', models.CharField(blank=True, default='', max_length=255)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'tag'), name='finance_rollup_day_tag_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Dia local (America/Sao_Paulo) de criação das tarefas.')),
+                ('tag', models.CharField(blank=True, default='', help_text='Tag normalizada; vazio = todas as tarefas do dia.', max_length=200)),
+                ('total', models.IntegerField(default=0, help_text='Quantidade de tarefas criadas no dia.')),
+                ('completed', models.IntegerField(default=0, help_text='Quantidade dessas tarefas já concluídas.')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'tag'), name='task_rollup_day_tag_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _tags(value):
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def split_tags(apps, schema_editor):
+    # Converte as strings "a, b" existentes em linhas de Tag e nas tabelas de ligação
+    Tag = apps.get_model('tasks', 'Tag')
+    for model_name, link_name, fk in (('Task', 'TaskTag', 'task_id'), ('Finance', 'FinanceTag', 'finance_id')):
+        model = apps.get_model('tasks', model_name)
+        link = apps.get_model('tasks', link_name)
+        pairs = [(pk, tag) for pk, tags in model.objects.values_list('pk', 'tags').iterator(chunk_size=2000) for tag in _tags(tags)]
+        Tag.objects.bulk_create([Tag(name=name) for name in {tag for _, tag in pairs}], ignore_conflicts=True, batch_size=1000)
+        ids = dict(Tag.objects.values_list('name', 'pk'))
+        link.objects.bulk_create([link(**{fk: pk, 'tag_id': ids[tag]}) for pk, tag in pairs], ignore_conflicts=True, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Nome normalizado da tag.', max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FinanceTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='tasks.finance')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_links', to='tasks.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='finance',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='finances', through='tasks.FinanceTag', to='tasks.tag'),
+        ),
+        migrations.CreateModel(
+            name='TaskTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_links', to='tasks.tag')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='tasks.task')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskTag', to='tasks.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='financetag',
+            constraint=models.UniqueConstraint(fields=('tag', 'finance'), name='finance_tag_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasktag',
+            constraint=models.UniqueConstraint(fields=('tag', 'task'), name='task_tag_uniq'),
+        ),
+        migrations.RunPython(split_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['created_at', 'value'], name='finance_created_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['is_completed', 'created_at'], name='task_completed_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    for name in ('task', 'finance'):
+        DataVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
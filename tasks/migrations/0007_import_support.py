@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finance',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash do conteúdo importado, usado para evitar duplicatas.', max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='finance',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Data/hora em que a tarefa foi criada.'),
+        ),
+    ]
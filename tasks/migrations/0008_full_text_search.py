@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from tasks.search import create_search_index, drop_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_import_support'),
+    ]
+
+    operations = [
+        # PostgreSQL: coluna tsvector gerada + GIN; SQLite: tabelas FTS5 mantidas por triggers
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
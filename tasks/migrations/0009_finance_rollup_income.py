@@ -0,0 +1,50 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _tags(value):
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def fill_income(apps, schema_editor):
+    # Recalcula os rollups financeiros já com as entradas separadas (regra de tasks.rollups
+    # neste ponto das migrações; a versão atual do módulo já conta com colunas posteriores)
+    Finance = apps.get_model('tasks', 'Finance')
+    FinanceDailyRollup = apps.get_model('tasks', 'FinanceDailyRollup')
+    tz = timezone.get_default_timezone()
+    sums = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')])
+    for created_at, tags, value in Finance.objects.values_list('created_at', 'tags', 'value').iterator(chunk_size=2000):
+        day = timezone.localtime(created_at, tz).date()
+        for tag in [''] + _tags(tags):
+            sums[(day, tag)][0] += value
+            sums[(day, tag)][1] += 1
+            sums[(day, tag)][2] += max(value, 0)
+    FinanceDailyRollup.objects.all().delete()
+    FinanceDailyRollup.objects.bulk_create(
+        [FinanceDailyRollup(day=day, tag=tag, total=total, count=count, income=income) for (day, tag), (total, count, income) in sums.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financedailyrollup',
+            name='income',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(fill_income, migrations.RunPython.noop),
+    ]
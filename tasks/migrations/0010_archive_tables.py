@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_finance_rollup_income'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFinance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('description', models.CharField(max_length=255)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tags', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'value'], name='archived_finance_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('tags', models.CharField(blank=True, max_length=200)),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='archived_task_created_idx')],
+            },
+        ),
+    ]
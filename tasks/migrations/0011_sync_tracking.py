@@ -0,0 +1,76 @@
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, Max
+from django.db.models.functions import Coalesce
+
+from tasks.caching import CHANGE_SEQUENCE
+from tasks.search import create_search_index
+
+
+def fill_change_seq(apps, schema_editor):
+    # As linhas existentes entram na sequência pela ordem de id (tarefas antes dos lançamentos)
+    Task = apps.get_model('tasks', 'Task')
+    Finance = apps.get_model('tasks', 'Finance')
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    offset = Task.objects.aggregate(last=Max('id'))['last'] or 0
+    Task.objects.update(change_seq=F('id'), updated_at=Coalesce('completed_at', 'created_at'))
+    Finance.objects.update(change_seq=F('id') + offset, updated_at=F('created_at'))
+    last = offset + (Finance.objects.aggregate(last=Max('id'))['last'] or 0)
+    DataVersion.objects.update_or_create(name=CHANGE_SEQUENCE, defaults={'version': last})
+
+
+def recreate_search_index(apps, schema_editor):
+    # No SQLite, adicionar ou remover coluna NOT NULL recria as tabelas e descarta os triggers do FTS5
+    create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_archive_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_index), # Na reversão, roda depois do RemoveField
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change_seq', models.BigIntegerField(unique=True)),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='finance',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='finance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Posição da última alteração na sequência de sincronização.'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Data/hora da última alteração.'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['change_seq'], name='finance_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['change_seq'], name='task_change_seq_idx'),
+        ),
+        migrations.RunPython(fill_change_seq, migrations.RunPython.noop),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
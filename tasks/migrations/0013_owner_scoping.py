@@ -0,0 +1,243 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from tasks.search import create_search_index
+
+
+def _tags(value):
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def recreate_search_index(apps, schema_editor):
+    # No SQLite, alterar content_hash e adicionar colunas NOT NULL recria as tabelas e descarta os triggers do FTS5
+    create_search_index(apps, schema_editor)
+
+
+def clear_rollups(apps, schema_editor):
+    # Os rollups passam a ser por usuário (owner NOT NULL): são recalculados em fill_owner
+    apps.get_model('tasks', 'TaskDailyRollup').objects.all().delete()
+    apps.get_model('tasks', 'FinanceDailyRollup').objects.all().delete()
+
+
+def fill_owner(apps, schema_editor):
+    # Os dados existentes eram de uma instalação de um usuário só: ficam com o primeiro
+    # superusuário (ou, sem ele, o primeiro usuário). Sem usuários, continuam sem dono.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    owner = (
+        User.objects.filter(is_superuser=True).order_by('id').values_list('id', flat=True).first()
+        or User.objects.order_by('id').values_list('id', flat=True).first()
+    )
+    if owner is None:
+        return
+    for name in ('Task', 'Finance', 'ArchivedTask', 'ArchivedFinance', 'Tombstone'):
+        apps.get_model('tasks', name).objects.filter(owner__isnull=True).update(owner_id=owner)
+    for link, parent in (('TaskTag', 'Task'), ('FinanceTag', 'Finance')):
+        Parent = apps.get_model('tasks', parent)
+        field = parent.lower()
+        apps.get_model('tasks', link).objects.update(
+            owner_id=Subquery(Parent.objects.filter(pk=OuterRef(f'{field}_id')).values('owner_id')[:1])
+        )
+    # Recalcula os rollups (regra de tasks.rollups neste ponto das migrações, como em 0009)
+    tz = timezone.get_default_timezone()
+    counts = defaultdict(lambda: [0, 0])
+    sums = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')])
+    for name in ('Task', 'ArchivedTask'):
+        rows = apps.get_model('tasks', name).objects.filter(owner__isnull=False)
+        for created_at, tags, is_completed, owner_id in rows.values_list('created_at', 'tags', 'is_completed', 'owner_id').iterator(chunk_size=2000):
+            day = timezone.localtime(created_at, tz).date()
+            for tag in [''] + _tags(tags):
+                counts[(owner_id, day, tag)][0] += 1
+                counts[(owner_id, day, tag)][1] += int(is_completed)
+    for name in ('Finance', 'ArchivedFinance'):
+        rows = apps.get_model('tasks', name).objects.filter(owner__isnull=False)
+        for created_at, tags, value, owner_id in rows.values_list('created_at', 'tags', 'value', 'owner_id').iterator(chunk_size=2000):
+            day = timezone.localtime(created_at, tz).date()
+            for tag in [''] + _tags(tags):
+                sums[(owner_id, day, tag)][0] += value
+                sums[(owner_id, day, tag)][1] += 1
+                sums[(owner_id, day, tag)][2] += max(value, 0)
+    TaskDailyRollup = apps.get_model('tasks', 'TaskDailyRollup')
+    FinanceDailyRollup = apps.get_model('tasks', 'FinanceDailyRollup')
+    TaskDailyRollup.objects.bulk_create(
+        [TaskDailyRollup(owner_id=owner_id, day=day, tag=tag, total=total, completed=done) for (owner_id, day, tag), (total, done) in counts.items()],
+        batch_size=1000,
+    )
+    FinanceDailyRollup.objects.bulk_create(
+        [FinanceDailyRollup(owner_id=owner_id, day=day, tag=tag, total=total, count=count, income=income) for (owner_id, day, tag), (total, count, income) in sums.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_background_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_index), # Na reversão, roda depois das alterações
+        migrations.RunPython(clear_rollups, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='financedailyrollup',
+            name='finance_rollup_day_tag_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='taskdailyrollup',
+            name='task_rollup_day_tag_uniq',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedfinance',
+            name='archived_finance_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedtask',
+            name='archived_task_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='finance',
+            name='finance_created_value_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='finance',
+            name='finance_change_seq_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_completed_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_change_seq_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedfinance',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='finance',
+            name='owner',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='finances', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='financedailyrollup',
+            name='owner',
+            field=models.ForeignKey(db_index=False, default=None, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='financetag',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='owner',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Usuário dono da tarefa.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='taskdailyrollup',
+            name='owner',
+            field=models.ForeignKey(db_index=False, default=None, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tasktag',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='finance',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash do conteúdo importado, usado para evitar duplicatas.', max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='archivedfinance',
+            index=models.Index(fields=['owner', 'created_at', 'value'], name='archived_finance_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['owner', 'created_at'], name='archived_task_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['owner', 'created_at', 'value'], name='finance_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='finance',
+            index=models.Index(fields=['owner', 'change_seq'], name='finance_owner_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financetag',
+            index=models.Index(fields=['owner', 'tag', 'finance'], name='finance_tag_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'created_at'], name='task_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'is_completed', 'created_at'], name='task_owner_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'change_seq'], name='task_owner_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktag',
+            index=models.Index(fields=['owner', 'tag', 'task'], name='task_tag_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['owner', 'change_seq'], name='tombstone_owner_seq_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='finance',
+            constraint=models.UniqueConstraint(fields=('owner', 'content_hash'), name='finance_owner_content_hash_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='financedailyrollup',
+            constraint=models.UniqueConstraint(fields=('owner', 'day', 'tag'), name='finance_rollup_owner_day_tag_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('owner', 'content_hash'), name='task_owner_content_hash_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(fields=('owner', 'day', 'tag'), name='task_rollup_owner_day_tag_uniq'),
+        ),
+        migrations.RunPython(fill_owner, migrations.RunPython.noop),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Round
+
+import tasks.models
+from tasks.search import create_search_index
+
+# Colunas convertidas de reais (decimal) para centavos (inteiro)
+MONEY_FIELDS = {
+    'Finance': ('value',),
+    'ArchivedFinance': ('value',),
+    'FinanceDailyRollup': ('total', 'income'),
+}
+
+
+def recreate_search_index(apps, schema_editor):
+    # No SQLite, mudar o tipo da coluna recria a tabela e descarta os triggers do FTS5
+    create_search_index(apps, schema_editor)
+
+
+def to_cents(apps, schema_editor):
+    # ROUND recupera o valor exato mesmo onde o SQLite guardava o decimal como REAL (0.29 * 100 = 28.999...)
+    for name, fields in MONEY_FIELDS.items():
+        apps.get_model('tasks', name).objects.update(**{field: Round(F(field) * 100) for field in fields})
+
+
+def to_reais(apps, schema_editor):
+    for name, fields in MONEY_FIELDS.items():
+        apps.get_model('tasks', name).objects.update(**{field: F(field) / Value(100.0) for field in fields}) # 100.0: divisão inteira no SQLite
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_owner_scoping'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_index), # Na reversão, roda depois das alterações
+        # Decimal com espaço para valor * 100 antes de virar inteiro (no PostgreSQL, numeric(10,2) estouraria)
+        migrations.AlterField(
+            model_name='finance',
+            name='value',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='archivedfinance',
+            name='value',
+            field=models.DecimalField(decimal_places=2, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='financedailyrollup',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AlterField(
+            model_name='financedailyrollup',
+            name='income',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.RunPython(to_cents, to_reais),
+        migrations.AlterField(
+            model_name='finance',
+            name='value',
+            field=tasks.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='archivedfinance',
+            name='value',
+            field=tasks.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='financedailyrollup',
+            name='total',
+            field=tasks.models.CentsField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='financedailyrollup',
+            name='income',
+            field=tasks.models.CentsField(default=0),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
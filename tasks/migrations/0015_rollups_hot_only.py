@@ -0,0 +1,68 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def _tags(value):
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _rebuild(apps, task_sources, finance_sources):
+    # Regra de tasks.rollups neste ponto das migrações, como em 0013
+    tz = timezone.get_default_timezone()
+    counts = defaultdict(lambda: [0, 0])
+    sums = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')])
+    for name in task_sources:
+        rows = apps.get_model('tasks', name).objects.filter(owner__isnull=False)
+        for created_at, tags, is_completed, owner_id in rows.values_list('created_at', 'tags', 'is_completed', 'owner_id').iterator(chunk_size=2000):
+            day = timezone.localtime(created_at, tz).date()
+            for tag in [''] + _tags(tags):
+                counts[(owner_id, day, tag)][0] += 1
+                counts[(owner_id, day, tag)][1] += int(is_completed)
+    for name in finance_sources:
+        rows = apps.get_model('tasks', name).objects.filter(owner__isnull=False)
+        for created_at, tags, value, owner_id in rows.values_list('created_at', 'tags', 'value', 'owner_id').iterator(chunk_size=2000):
+            day = timezone.localtime(created_at, tz).date()
+            for tag in [''] + _tags(tags):
+                sums[(owner_id, day, tag)][0] += value
+                sums[(owner_id, day, tag)][1] += 1
+                sums[(owner_id, day, tag)][2] += max(value, 0)
+    TaskDailyRollup = apps.get_model('tasks', 'TaskDailyRollup')
+    FinanceDailyRollup = apps.get_model('tasks', 'FinanceDailyRollup')
+    TaskDailyRollup.objects.all().delete()
+    FinanceDailyRollup.objects.all().delete()
+    TaskDailyRollup.objects.bulk_create(
+        [TaskDailyRollup(owner_id=owner_id, day=day, tag=tag, total=total, completed=done) for (owner_id, day, tag), (total, done) in counts.items()],
+        batch_size=1000,
+    )
+    FinanceDailyRollup.objects.bulk_create(
+        [FinanceDailyRollup(owner_id=owner_id, day=day, tag=tag, total=total, count=count, income=income) for (owner_id, day, tag), (total, count, income) in sums.items()],
+        batch_size=1000,
+    )
+
+
+def hot_only(apps, schema_editor):
+    # As linhas já arquivadas saem dos rollups, como as consultas por linha (ver tasks/archiving.py)
+    _rebuild(apps, ('Task',), ('Finance',))
+
+
+def with_archive(apps, schema_editor):
+    _rebuild(apps, ('Task', 'ArchivedTask'), ('Finance', 'ArchivedFinance'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_finance_cents'),
+    ]
+
+    operations = [
+        migrations.RunPython(hot_only, with_archive),
+    ]
@@ -0,0 +1,43 @@
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def text_to_files(apps, schema_editor):
+    # Exportações já geradas passam do banco para o storage
+    Job = apps.get_model('tasks', 'Job')
+    for job in Job.objects.exclude(output='').iterator(chunk_size=100):
+        job.output_file.save(f'{job.pk}-{job.filename or "output"}', ContentFile(job.output.encode()), save=False)
+        Job.objects.filter(pk=job.pk).update(output_file=job.output_file.name)
+
+
+def files_to_text(apps, schema_editor):
+    Job = apps.get_model('tasks', 'Job')
+    for job in Job.objects.exclude(output_file='').iterator(chunk_size=100):
+        with job.output_file.open('rb') as output:
+            Job.objects.filter(pk=job.pk).update(output=output.read().decode())
+        job.output_file.delete(save=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_rollups_hot_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='output_file',
+            field=models.FileField(blank=True, upload_to='jobs/'),
+        ),
+        migrations.RunPython(text_to_files, files_to_text),
+        migrations.RemoveField(
+            model_name='job',
+            name='output',
+        ),
+        migrations.RenameField(
+            model_name='job',
+            old_name='output_file',
+            new_name='output',
+        ),
+    ]
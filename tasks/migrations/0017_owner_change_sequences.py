@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def split_sequences(apps, schema_editor):
+    # Cada usuário ganha o seu contador a partir do global: os tokens já entregues continuam
+    # valendo e os próximos números ficam acima de tudo o que o cliente já viu
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    versions = dict(DataVersion.objects.filter(name__in=['changes', 'changes_pruned']).values_list('name', 'version'))
+    DataVersion.objects.bulk_create([
+        DataVersion(name=f'{name}:{user}', version=version)
+        for user in User.objects.values_list('id', flat=True).iterator()
+        for name, version in versions.items()
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def merge_sequences(apps, schema_editor):
+    # Volta ao contador global, acima de todos os contadores por usuário. Os números dos
+    # tombstones se repetem entre usuários: eles saem e os tokens antigos recebem reset
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    Tombstone = apps.get_model('tasks', 'Tombstone')
+    last = DataVersion.objects.filter(name__startswith='changes').exclude(name__startswith='changes_pruned').aggregate(last=Max('version'))['last'] or 0
+    Tombstone.objects.all().delete()
+    for name in ('changes', 'changes_pruned'):
+        DataVersion.objects.update_or_create(name=name, defaults={'version': last})
+    DataVersion.objects.filter(name__startswith='changes', name__contains=':').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0016_job_output_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tombstone',
+            name='tombstone_owner_seq_idx',
+        ),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='change_seq',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='tombstone',
+            constraint=models.UniqueConstraint(fields=('owner', 'change_seq'), name='tombstone_owner_seq_uniq'),
+        ),
+        # Por último: na volta, os tombstones repetidos saem antes de change_seq voltar a ser único
+        migrations.RunPython(split_sequences, merge_sequences),
+    ]
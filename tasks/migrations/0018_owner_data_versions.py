@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_versions(apps, schema_editor):
+    # As versões do cache passam a ser por usuário ('task:<id>'), a partir da global
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    versions = list(DataVersion.objects.filter(name__in=['task', 'finance']).values_list('name', 'version'))
+    DataVersion.objects.bulk_create([
+        DataVersion(name=f'{name}:{user}', version=version)
+        for user in User.objects.values_list('id', flat=True).iterator()
+        for name, version in versions
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def merge_versions(apps, schema_editor):
+    DataVersion = apps.get_model('tasks', 'DataVersion')
+    DataVersion.objects.filter(name__regex=r'^(task|finance):').delete()
+    for name in ('task', 'finance'):
+        DataVersion.objects.filter(name=name).update(version=models.F('version') + 1) # Invalida o que foi cacheado com a versão global
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0017_owner_change_sequences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(split_versions, merge_versions),
+    ]
@@ -1,31 +1,281 @@
-from django.db import models
+from decimal import Decimal, InvalidOperation
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from .caching import next_change_seq
+
+# Tag normalizada (minúsculas, sem espaços nas pontas), compartilhada por tarefas e finanças.
+# A string "tags" dos modelos continua sendo o formato de entrada/saída da API;
+# as tabelas de ligação abaixo são o índice usado nos filtros por tag.
+class Tag(models.Model):
+    name = models.CharField(max_length=255, unique=True, help_text="Nome normalizado da tag.")
+
+    def __str__(self):
+        return self.name
+
+# Gravação das tabelas sincronizadas com o cliente offline (/api/sync/, ver tasks/sync.py).
+# Cada gravação recebe o próximo número da sequência de alterações do dono (change_seq) e
+# updated_at; exclusões viram Tombstone. Escritas em lote (bulk_create, update()) precisam
+# carimbar as linhas com tasks.sync.stamp_changes / change_stamps.
+class ChangeTrackedMixin:
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at', 'change_seq'}
+        with transaction.atomic(using=using): # Número e linha entram no mesmo commit
+            self.change_seq = next_change_seq(self.owner_id, using=using)
+            super().save(*args, **kwargs)
+
+# Valor em dinheiro guardado como inteiro de centavos e exposto em reais (Decimal) no Python.
+# Somas, filtros e índices trabalham com inteiros (no SQLite, o DecimalField vira REAL/texto e é
+# reinterpretado a cada leitura); a conversão para Decimal acontece só no valor lido, então
+# as views, os serializers e o JSON da API (2 casas) continuam iguais.
+class CentsField(models.BigIntegerField):
+    description = "Valor monetário em centavos"
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Decimal(value).scaleb(-2)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            raise ValidationError(f'Valor inválido: {value!r}', code='invalid')
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        return int((self.to_python(value) * 100).to_integral_value()) # Reais -> centavos (exato com 2 casas)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': forms.DecimalField, 'decimal_places': 2, **kwargs})
 
 # Modelo Task representa uma tarefa diária do usuário.
 # Cada campo do modelo é uma coluna na tabela do banco de dados.
 # Os modelos do Django facilitam a criação, leitura, atualização e exclusão de dados.
-class Task(models.Model):
+class Task(ChangeTrackedMixin, models.Model):
     title = models.CharField(max_length=200, help_text="Título curto e objetivo da tarefa.") # Título da tarefa
     description = models.TextField(blank=True, help_text="Descrição detalhada da tarefa.") # Descrição (opcional)
-    created_at = models.DateTimeField(auto_now_add=True, help_text="Data/hora em que a tarefa foi criada.") # Data de criação
+    created_at = models.DateTimeField(default=timezone.now, editable=False, help_text="Data/hora em que a tarefa foi criada.") # Data de criação (importações podem informar a original)
     completed_at = models.DateTimeField(null=True, blank=True, help_text="Data/hora em que a tarefa foi concluída.") # Data de conclusão (opcional)
     is_completed = models.BooleanField(default=False, help_text="Indica se a tarefa foi concluída.") # Status de conclusão
     tags = models.CharField(max_length=200, blank=True, help_text="Tags separadas por vírgula para categorizar tarefas.") # Tags simples
+    normalized_tags = models.ManyToManyField(Tag, through='TaskTag', related_name='tasks', blank=True) # Índice das tags (sincronizado com "tags")
+    content_hash = models.CharField(max_length=64, null=True, blank=True, editable=False, help_text="Hash do conteúdo importado, usado para evitar duplicatas.") # Só preenchido por importações
+    updated_at = models.DateTimeField(auto_now=True, help_text="Data/hora da última alteração.") # Informativo; a sincronização usa change_seq
+    change_seq = models.BigIntegerField(default=0, editable=False, help_text="Posição da última alteração na sequência de sincronização.")
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, editable=False, on_delete=models.CASCADE, related_name='tasks', help_text="Usuário dono da tarefa.") # Toda leitura da API filtra por ele
+
+    class Meta:
+        # Os índices começam pelo dono: cada usuário lê só o próprio trecho, qualquer que seja o tamanho da tabela
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='task_owner_created_idx'), # Janelas de data e ordenação
+            models.Index(fields=['owner', 'is_completed', 'created_at'], name='task_owner_completed_idx'), # Progresso por status
+            models.Index(fields=['owner', 'change_seq'], name='task_owner_change_seq_idx'), # Leituras incrementais de /api/sync/
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'content_hash'], name='task_owner_content_hash_uniq'), # Dois usuários podem importar o mesmo arquivo
+        ]
 
     def __str__(self):
         return self.title # Exibe o título ao mostrar o objeto
 
     def mark_completed(self):
         """Marca a tarefa como concluída e define a data de conclusão."""
-        from django.utils import timezone
         self.is_completed = True # Marca como concluída
         self.completed_at = timezone.now() # Define data de conclusão
-        self.save() # Salva no banco
+        self.save(update_fields=['is_completed', 'completed_at']) # Salva só os campos alterados
+
+class Finance(ChangeTrackedMixin, models.Model):
+    description = models.CharField(max_length=255)
+    value = CentsField() # Em reais no Python, centavos no banco
+    tags = models.CharField(max_length=255, blank=True, default='')
+    normalized_tags = models.ManyToManyField(Tag, through='FinanceTag', related_name='finances', blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, editable=False) # Dedupe de importações (ver tasks/importing.py)
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0, editable=False) # Ver ChangeTrackedMixin
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, editable=False, on_delete=models.CASCADE, related_name='finances')
+
+    class Meta:
+        indexes = [
+            # Cobre filtros por dono e janela de data e as somas de value sem ler a tabela
+            models.Index(fields=['owner', 'created_at', 'value'], name='finance_owner_created_idx'),
+            models.Index(fields=['owner', 'change_seq'], name='finance_owner_change_seq_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'content_hash'], name='finance_owner_content_hash_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.description} - R${self.value} ({self.created_at.date()})"
+
+# Tabelas de ligação. Guardam uma cópia do dono do item: o índice (dono, tag, item) atende
+# as buscas por tag lendo só as ligações do usuário; a restrição única (tag, item) evita repetições.
+class TaskTag(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='task_links')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'task'], name='task_tag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'tag', 'task'], name='task_tag_owner_idx'),
+        ]
+
+class FinanceTag(models.Model):
+    finance = models.ForeignKey(Finance, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='finance_links')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'finance'], name='finance_tag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'tag', 'finance'], name='finance_tag_owner_idx'),
+        ]
+
+# Tabelas de consolidação (rollup) diária, mantidas incrementalmente a cada escrita.
+# Cada linha guarda os totais de um dia local de um usuário; tag vazia ('') representa todas as tags.
+class TaskDailyRollup(models.Model):
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False) # Coberto pela restrição única
+    day = models.DateField(help_text="Dia local (America/Sao_Paulo) de criação das tarefas.")
+    tag = models.CharField(max_length=200, blank=True, default='', help_text="Tag normalizada; vazio = todas as tarefas do dia.")
+    total = models.IntegerField(default=0, help_text="Quantidade de tarefas criadas no dia.")
+    completed = models.IntegerField(default=0, help_text="Quantidade dessas tarefas já concluídas.")
 
-class Finance(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'day', 'tag'], name='task_rollup_owner_day_tag_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} [{self.tag or '*'}] {self.completed}/{self.total}"
+
+class FinanceDailyRollup(models.Model):
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False)
+    day = models.DateField()
+    tag = models.CharField(max_length=255, blank=True, default='')
+    total = CentsField(default=0)
+    income = CentsField(default=0) # Só os valores positivos; saídas = total - income
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'day', 'tag'], name='finance_rollup_owner_day_tag_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} [{self.tag or '*'}] R${self.total} ({self.count})"
+
+# Versão dos dados por modelo ('task', 'finance'), incrementada a cada escrita.
+# Faz parte das chaves de cache e dos ETags das respostas (ver tasks/caching.py).
+class DataVersion(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+# Registro das exclusões de tarefas e lançamentos para a sincronização incremental (/api/sync/).
+# Cada linha ocupa um número da mesma sequência de Task.change_seq/Finance.change_seq do dono;
+# as antigas são descartadas por "manage.py archive_data" (SYNC_TOMBSTONE_DAYS).
+class Tombstone(models.Model):
+    change_seq = models.BigIntegerField()
+    model = models.CharField(max_length=50) # 'task' ou 'finance'
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'change_seq'], name='tombstone_owner_seq_uniq'), # Também ordena as exclusões de um usuário
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} (seq {self.change_seq})"
+
+# Camada fria: tarefas concluídas e lançamentos antigos movidos por "manage.py archive_data"
+# (ver tasks/archiving.py). Mantêm o id original; as tags ficam só como texto normalizado,
+# e os rollups diários continuam contando essas linhas.
+class ArchivedTask(models.Model):
+    id = models.BigIntegerField(primary_key=True) # Mesmo id que a tarefa tinha em Task
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    is_completed = models.BooleanField(default=False)
+    tags = models.CharField(max_length=200, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True) # Evita reimportar o que já foi arquivado
+    archived_at = models.DateTimeField(default=timezone.now)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='archived_task_owner_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class ArchivedFinance(models.Model):
+    id = models.BigIntegerField(primary_key=True) # Mesmo id que o lançamento tinha em Finance
     description = models.CharField(max_length=255)
-    value = models.DecimalField(max_digits=10, decimal_places=2)
+    value = CentsField()
     tags = models.CharField(max_length=255, blank=True, default='')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField()
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at', 'value'], name='archived_finance_owner_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - R${self.value} ({self.created_at.date()})"
+
+# Trabalho da fila em segundo plano (tasks/jobs.py): exportações e agregações pesadas
+# enfileiradas pela API (resposta 202) e executadas por "manage.py run_worker".
+class Job(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUSES = [(QUEUED, 'Na fila'), (RUNNING, 'Executando'), (DONE, 'Concluído'), (FAILED, 'Falhou')]
+
+    kind = models.CharField(max_length=50, help_text="Tipo do trabalho (ver tasks.jobs.JOB_KINDS).")
+    params = models.JSONField(default=dict, blank=True, help_text="Parâmetros, no formato da query string do endpoint equivalente.")
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name='jobs') # Quem enfileirou (só ele vê o trabalho)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder) # Resposta JSON do endpoint equivalente
+    output = models.FileField(upload_to='jobs/', blank=True) # Arquivo gerado (exportações), no storage padrão (MEDIA_ROOT)
+    content_type = models.CharField(max_length=100, blank=True)
+    filename = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now) # Novas tentativas esperam um pouco mais a cada falha
+    locked_by = models.CharField(max_length=100, blank=True) # Worker que está executando
+    locked_until = models.DateTimeField(null=True, blank=True) # Fim da concessão; depois disso outro worker retoma
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'), # Busca do próximo trabalho
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
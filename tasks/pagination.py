@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Paginação por cursor (keyset) ordenada por (-created_at, -id).
+# Cada página busca "created_at/id menores que o último item visto", então o custo
+# não cresce com a profundidade da página e inserções novas não duplicam itens.
+# É opcional: só pagina com ?cursor= ou ?page_size= (ou se API_PAGINATE_BY_DEFAULT
+# estiver ativo); ?paginate=0 sempre devolve a lista completa como antes.
+#
+# Com busca (?q=, tasks/search.py) a lista vem ordenada por relevância, que não é uma chave
+# estável entre páginas: aí o cursor guarda o deslocamento (offset) na ordem do ranking,
+# em vez de reordenar por data.
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    paginate_query_param = 'paginate'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def is_requested(self, request):
+        """Decide se a requisição deve ser paginada."""
+        flag = request.query_params.get(self.paginate_query_param)
+        if flag is not None:
+            return flag.lower() not in ('0', 'false', 'no')
+        if self.cursor_query_param in request.query_params or self.page_size_query_param in request.query_params:
+            return True
+        return getattr(settings, 'API_PAGINATE_BY_DEFAULT', False)
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'API_PAGE_SIZE', 50)
+        maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except ValueError:
+            size = default
+        return max(1, min(size, maximum)) # Limita ao teto configurado
+
+    def encode_cursor(self, item):
+        raw = f'{item.created_at.isoformat()}|{item.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def encode_offset(self, offset):
+        return base64.urlsafe_b64encode(f'rank|{offset}'.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            created_at, pk = raw.rsplit('|', 1)
+            if created_at == 'rank': # Cursor de busca: deslocamento no ranking
+                offset = int(pk)
+                if offset < 0:
+                    raise ValueError('deslocamento negativo')
+                return None, offset
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is None:
+                raise ValueError('cursor sem timezone')
+            return created_at, int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None # Mantém a resposta sem paginação
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        created_at, pk = self.decode_cursor(cursor) if cursor else (None, 0)
+        ranked = 'search_rank' in queryset.query.extra_select
+        if cursor and ranked != (created_at is None):
+            raise NotFound(self.invalid_cursor_message) # Cursor de busca numa lista sem busca, ou o contrário
+        if ranked:
+            return self.paginate_ranked(queryset, page_size, pk)
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        page = list(queryset[:page_size + 1]) # Um item extra indica se há próxima página
+        self.next_cursor = self.encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+        return page[:page_size]
+
+    def paginate_ranked(self, queryset, page_size, offset):
+        """Página da busca na ordem de relevância; -id desempata para as páginas não se sobreporem."""
+        queryset = queryset.order_by(*queryset.query.order_by, '-id')
+        page = list(queryset[offset:offset + page_size + 1])
+        self.next_cursor = self.encode_offset(offset + page_size) if len(page) > page_size else None
+        return page[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,149 @@
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .filters import local_midnight
+
+# Particionamento declarativo opcional (só PostgreSQL) de tasks_finance por mês de created_at.
+#
+# partition_finance_table() troca a tabela comum por uma particionada por RANGE (created_at),
+# com uma partição por mês local (limites à meia-noite de settings.TIME_ZONE, os mesmos das
+# janelas de data da API) e uma partição DEFAULT. Consultas com janela de datas passam a ler
+# só as partições do período (partition pruning). ensure_finance_partitions() cria as
+# partições dos próximos meses e deve rodar periodicamente (manage.py partition_finances).
+#
+# A conversão inteira roda numa única transação, com a tabela travada: a aplicação vê a
+# tabela antiga até o commit (escritas esperam o lock) e, se algo falhar, nada muda. As
+# partições mensais são criadas antes da cópia, então a DEFAULT só recebe datas além do
+# horizonte; quando o mês delas ganha partição, as linhas saem da DEFAULT para a nova.
+#
+# Restrições do PostgreSQL para tabelas particionadas, aplicadas na conversão:
+# - a chave primária passa a ser (id, created_at) e a unicidade de (owner, content_hash) vira
+#   (owner, content_hash, created_at); a importação continua deduplicando por consulta;
+# - a FK de tasks_financetag para tasks_finance é removida (o ORM ainda apaga as ligações
+#   em cascata; DELETE direto no banco não); as FKs da própria tabela (owner_id -> auth_user)
+#   são recriadas, já que o LIKE não as copia.
+
+TABLE = 'tasks_finance'
+
+
+def is_partitioned(cursor, table=TABLE):
+    cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s AND relnamespace = 'public'::regnamespace", [table])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+
+def copyable_columns(cursor, table):
+    """Colunas comuns de table, na ordem; colunas geradas (search_vector) não podem ser copiadas."""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = %s AND is_generated = 'NEVER' ORDER BY ordinal_position",
+        [table],
+    )
+    return ', '.join(row[0] for row in cursor.fetchall())
+
+
+def create_partition(cursor, month):
+    """Cria (se não existir) a partição do mês local que começa em month.
+
+    Se a DEFAULT já tem linhas do mês, o PostgreSQL recusaria a nova partição: as linhas
+    passam para uma tabela avulsa, que então é anexada como a partição do mês.
+    """
+    name = partition_name(month)
+    bounds = [local_midnight(month), local_midnight(next_month(month))]
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    if cursor.fetchone()[0] is not None:
+        return
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {TABLE}_default WHERE created_at >= %s AND created_at < %s)', bounds)
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)', bounds)
+        return
+    columns = copyable_columns(cursor, TABLE)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING GENERATED)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {TABLE}_default WHERE created_at >= %s AND created_at < %s RETURNING {columns}) '
+        f'INSERT INTO {name} ({columns}) SELECT {columns} FROM moved',
+        bounds,
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+
+
+def create_partitions(cursor, first, months_ahead):
+    """Cria as partições mensais de first até months_ahead meses depois do atual; retorna quantos meses."""
+    month = month_start(first)
+    last = month_start(timezone.localdate())
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = 0
+    while month <= last:
+        create_partition(cursor, month)
+        month = next_month(month)
+        created += 1
+    return created
+
+
+def ensure_finance_partitions(months_ahead=3, first=None):
+    """Cria as partições mensais de first (padrão: mês atual) até months_ahead meses à frente."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        return create_partitions(cursor, first or timezone.localdate(), months_ahead)
+
+
+def partition_finance_table(months_ahead=3):
+    """Converte tasks_finance em tabela particionada por mês, copiando as linhas. Retorna as linhas copiadas."""
+    if connection.vendor != 'postgresql':
+        raise ImproperlyConfigured(f'O particionamento declarativo exige PostgreSQL (banco atual: {connection.vendor}).')
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE') # Escritas esperam o fim da conversão
+        if is_partitioned(cursor):
+            return 0
+        old = f'{TABLE}_unpartitioned'
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        # Remove as FKs que apontam para a tabela antiga (o nome do constraint é gerado pelo Django)
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass",
+            [old],
+        )
+        for table, name in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {quote(name)}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        # FKs da própria tabela (owner_id -> auth_user), com a mesma definição (DEFERRABLE etc.)
+        cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE contype = 'f' AND conrelid = %s::regclass", [old])
+        for name, definition in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {quote(name)} {definition}')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE UNIQUE INDEX {TABLE}_owner_content_hash_uniq ON {TABLE} (owner_id, content_hash, created_at)')
+        cursor.execute(f'CREATE INDEX {TABLE}_owner_created_idx ON {TABLE} (owner_id, created_at, value)')
+        cursor.execute(f'CREATE INDEX {TABLE}_owner_change_seq_idx ON {TABLE} (owner_id, change_seq)')
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'search_vector'", [TABLE],
+        )
+        if cursor.fetchone(): # Índice da busca textual (tasks/search.py)
+            cursor.execute(f'CREATE INDEX {TABLE}_search_idx ON {TABLE} USING GIN (search_vector)')
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+        cursor.execute(f'SELECT min(created_at) FROM {old}')
+        oldest = cursor.fetchone()[0]
+        # Meses criados antes da cópia: a DEFAULT só recebe datas além do horizonte
+        create_partitions(cursor, timezone.localtime(oldest).date() if oldest else timezone.localdate(), months_ahead)
+        columns = copyable_columns(cursor, old)
+        cursor.execute(f'INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {old}')
+        copied = cursor.rowcount
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), coalesce(max(id), 0) + 1, false) FROM {TABLE}")
+        cursor.execute(f'DROP TABLE {old}')
+    return copied
@@ -0,0 +1,179 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Réplicas de leitura opcionais (DATABASE_REPLICA_URLS, ver settings.py).
+#
+# Só as leituras pesadas do painel saem do primário: os GETs de listagem e agregação de
+# TaskViewSet/FinanceViewSet (replica_actions). ReplicaReadMixin escolhe uma réplica saudável
+# depois da autenticação e a guarda num ContextVar; ReplicaRouter.db_for_read a devolve
+# enquanto durar a requisição. Todo o resto (escritas, consultas dentro de transaction.atomic,
+# detalhes, jobs, sync, autenticação) continua no primário.
+#
+# Leitura das próprias escritas: qualquer POST/PUT/PATCH/DELETE do usuário o fixa no primário
+# por REPLICA_STICKY_SECONDS (marca no cache 'default'), então a tarefa ou o lançamento recém-
+# criado sempre aparece na próxima listagem, mesmo com a réplica atrasada. Com vários workers,
+# CACHE_URL precisa ser compartilhado (ex.: redis://...); a memória local só vale por processo.
+#
+# Saúde: cada processo testa cada réplica (SELECT 1; no PostgreSQL, também o atraso de replay
+# contra REPLICA_MAX_LAG_SECONDS) no máximo a cada REPLICA_HEALTH_CHECK_SECONDS. Réplicas que
+# falham no teste ou numa consulta ficam de fora até o próximo teste; sem nenhuma saudável,
+# as leituras voltam para o primário.
+
+logger = logging.getLogger(__name__)
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+# Atraso de replay do standby; 0 quando já aplicou tudo o que recebeu ou quando o banco não é
+# um standby (dois bancos PostgreSQL locais, sem replicação)
+POSTGRESQL_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def check_replica(alias):
+    """True se a réplica responde e, no PostgreSQL, não está mais atrasada que REPLICA_MAX_LAG_SECONDS."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != 'postgresql':
+                cursor.execute('SELECT 1')
+                return True
+            cursor.execute(POSTGRESQL_LAG_SQL)
+            lag = float(cursor.fetchone()[0] or 0)
+    except DatabaseError as exc:
+        logger.warning('Réplica %s indisponível: %s', alias, exc)
+        connection.close() # O próximo teste abre uma conexão nova
+        return False
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 30)
+    if max_lag and lag > max_lag:
+        logger.warning('Réplica %s atrasada %.1fs (limite %ss)', alias, lag, max_lag)
+        return False
+    return True
+
+
+class ReplicaHealth:
+    """Resultado do último teste de cada réplica, por processo; seguro entre threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {} # alias -> (saudável, instante do teste)
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self.lock:
+            state = self.checked.get(alias)
+        if state is not None and now - state[1] < getattr(settings, 'REPLICA_HEALTH_CHECK_SECONDS', 10):
+            return state[0]
+        healthy = check_replica(alias)
+        with self.lock:
+            self.checked[alias] = (healthy, now)
+        return healthy
+
+    def mark_down(self, alias):
+        """Tira a réplica de uso até o próximo teste (consulta falhou no meio de uma requisição)."""
+        with self.lock:
+            self.checked[alias] = (False, time.monotonic())
+
+    def reset(self):
+        with self.lock:
+            self.checked.clear()
+
+
+health = ReplicaHealth()
+
+
+def detect_replica_failure(execute, sql, params, many, context):
+    """execute_wrapper das conexões de réplica: erros de conexão marcam a réplica como fora."""
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError):
+        health.mark_down(context['connection'].alias)
+        raise
+
+
+def install_failure_detector(sender, connection, **kwargs):
+    """Receptor de connection_created: instala detect_replica_failure nas conexões das réplicas."""
+    if connection.alias in replica_aliases() and detect_replica_failure not in connection.execute_wrappers:
+        connection.execute_wrappers.append(detect_replica_failure)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Fixa as leituras do usuário no primário por REPLICA_STICKY_SECONDS (chamar depois de uma escrita)."""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+    if replica_aliases() and seconds > 0 and user_id is not None:
+        caches['default'].set(_pin_key(user_id), True, seconds)
+
+
+def is_pinned(user_id):
+    return user_id is not None and bool(caches['default'].get(_pin_key(user_id)))
+
+
+def choose_replica(user_id):
+    """Alias da réplica para as leituras do usuário, ou None (primário)."""
+    aliases = replica_aliases()
+    if not aliases or is_pinned(user_id):
+        return None
+    healthy = [alias for alias in aliases if health.is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    """Leituras na réplica escolhida para a requisição (se houver); escritas e migrações no primário."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None # Dentro de uma transação, lê o que a própria transação escreveu
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Réplicas têm os mesmos dados do primário
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases() # As réplicas recebem o esquema pela replicação
+
+
+class ReplicaReadMixin:
+    """Mixin para views do DRF: GETs das ações em replica_actions leem de uma réplica;
+    escritas fixam o usuário no primário (ver pin_to_primary)."""
+
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs) # Autenticação e permissões leem do primário
+        if request.method == 'GET' and getattr(self, 'action', None) in self.replica_actions:
+            alias = choose_replica(request.user.pk)
+            if alias is not None:
+                self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        try:
+            response = super().finalize_response(request, response, *args, **kwargs)
+        finally:
+            token = getattr(self, '_replica_token', None)
+            if token is not None:
+                _read_alias.reset(token)
+                self._replica_token = None
+        if request.method not in SAFE_METHODS and request.user and request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+        return response
@@ -0,0 +1,206 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .aggregations import bucket_start, progress_from_rows, with_running_balance
+from .filters import day_window, filter_window
+from .tagging import parse_tags
+
+# Manutenção e leitura das tabelas de rollup diário (TaskDailyRollup/FinanceDailyRollup).
+# Cada escrita em Task/Finance aplica um delta nas linhas do dono e do dia local afetados,
+# uma linha geral (tag '') e uma linha por tag; as leituras filtram pelo dono, então custam
+# O(dias) do usuário, não do total de usuários. Itens sem dono não entram. O comando rebuild_rollups
+# recalcula tudo a partir das tabelas originais, caso algo saia de sincronia; as tabelas de
+# arquivo ficam de fora, como nas consultas por linha (ver tasks/archiving.py).
+
+
+def local_day(value):
+    """Converte um datetime (UTC) para o dia local definido em settings.TIME_ZONE."""
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def _bump_many(model, deltas, fields):
+    """Aplica {(dono, dia, tag): (delta por campo)} com um INSERT ... IGNORE e UPDATEs com CASE por lote de chaves."""
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+    model.objects.bulk_create([model(owner_id=owner, day=day, tag=tag) for owner, day, tag in deltas], ignore_conflicts=True, batch_size=500)
+    keys = list(deltas)
+    for i in range(0, len(keys), 200): # Lotes pequenos para não estourar a profundidade de expressão do SQLite
+        chunk = keys[i:i + 200]
+        updates = {}
+        for position, field in enumerate(fields):
+            output = model._meta.get_field(field) # Converte os deltas como o campo (reais -> centavos no CentsField)
+            whens = [When(owner_id=owner, day=day, tag=tag, then=Value(deltas[(owner, day, tag)][position], output_field=output)) for owner, day, tag in chunk]
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=output)
+        match = Q()
+        for owner, day, tag in chunk:
+            match |= Q(owner_id=owner, day=day, tag=tag)
+        model.objects.filter(match).update(**updates)
+
+
+# Campos de Task/Finance que determinam a contribuição de cada linha nos rollups
+TASK_ROLLUP_FIELDS = ('created_at', 'tags', 'is_completed', 'owner_id')
+FINANCE_ROLLUP_FIELDS = ('created_at', 'tags', 'value', 'owner_id')
+
+
+def apply_task_rows(rows, sign=1):
+    """Soma (sign=1) ou remove (sign=-1) a contribuição de tuplas (created_at, tags, is_completed, owner_id)."""
+    from .models import TaskDailyRollup
+    deltas = defaultdict(lambda: [0, 0]) # (dono, dia, tag) -> [total, concluídas]
+    for created_at, tags, is_completed, owner in rows:
+        if owner is None:
+            continue
+        day = local_day(created_at)
+        for tag in [''] + parse_tags(tags):
+            deltas[(owner, day, tag)][0] += sign
+            deltas[(owner, day, tag)][1] += sign * int(is_completed)
+    with transaction.atomic(savepoint=False): # Dentro da transação da escrita, dispensa o savepoint
+        _bump_many(TaskDailyRollup, deltas, ('total', 'completed'))
+
+
+def apply_finance_rows(rows, sign=1):
+    """Soma (sign=1) ou remove (sign=-1) a contribuição de tuplas (created_at, tags, value, owner_id)."""
+    from .models import FinanceDailyRollup
+    deltas = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')]) # (dono, dia, tag) -> [soma, quantidade, entradas]
+    for created_at, tags, value, owner in rows:
+        if owner is None:
+            continue
+        day = local_day(created_at)
+        value = Decimal(value)
+        for tag in [''] + parse_tags(tags):
+            deltas[(owner, day, tag)][0] += sign * value
+            deltas[(owner, day, tag)][1] += sign
+            deltas[(owner, day, tag)][2] += sign * max(value, 0)
+    with transaction.atomic(savepoint=False):
+        _bump_many(FinanceDailyRollup, deltas, ('total', 'count', 'income'))
+
+
+def _history_rows(apps, model_name, start, end, fields):
+    """Linhas da tabela quente na janela."""
+    rows = filter_window(apps.get_model('tasks', model_name).objects.filter(owner__isnull=False), day_window(start, end))
+    return rows.values_list(*fields).iterator(chunk_size=2000)
+
+
+def rebuild_task_rollups(start=None, end=None, apps=global_apps):
+    """Recalcula os rollups de tarefas (opcionalmente só entre start e end). Retorna o nº de linhas."""
+    TaskDailyRollup = apps.get_model('tasks', 'TaskDailyRollup')
+    rollups = TaskDailyRollup.objects.all()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    counts = defaultdict(lambda: [0, 0]) # (dono, dia, tag) -> [total, concluídas]
+    for created_at, tags, is_completed, owner in _history_rows(apps, 'Task', start, end, TASK_ROLLUP_FIELDS):
+        day = local_day(created_at)
+        for tag in [''] + parse_tags(tags):
+            counts[(owner, day, tag)][0] += 1
+            counts[(owner, day, tag)][1] += int(is_completed)
+    with transaction.atomic():
+        rollups.delete()
+        TaskDailyRollup.objects.bulk_create(
+            [TaskDailyRollup(owner_id=owner, day=day, tag=tag, total=total, completed=done) for (owner, day, tag), (total, done) in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def rebuild_finance_rollups(start=None, end=None, apps=global_apps):
+    """Recalcula os rollups financeiros (opcionalmente só entre start e end). Retorna o nº de linhas."""
+    FinanceDailyRollup = apps.get_model('tasks', 'FinanceDailyRollup')
+    rollups = FinanceDailyRollup.objects.all()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    sums = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')]) # (dono, dia, tag) -> [soma, quantidade, entradas]
+    for created_at, tags, value, owner in _history_rows(apps, 'Finance', start, end, FINANCE_ROLLUP_FIELDS):
+        day = local_day(created_at)
+        for tag in [''] + parse_tags(tags):
+            sums[(owner, day, tag)][0] += value
+            sums[(owner, day, tag)][1] += 1
+            sums[(owner, day, tag)][2] += max(value, 0)
+    with transaction.atomic():
+        rollups.delete()
+        FinanceDailyRollup.objects.bulk_create(
+            [
+                FinanceDailyRollup(owner_id=owner, day=day, tag=tag, total=total, count=count, income=income)
+                for (owner, day, tag), (total, count, income) in sums.items()
+            ],
+            batch_size=1000,
+        )
+    return len(sums)
+
+
+def task_rollup_rows(owner, start=None, end=None, tag=''):
+    """Linhas (dia, total, concluídas) do rollup de tarefas do usuário, ordenadas por dia."""
+    from .models import TaskDailyRollup
+    qs = TaskDailyRollup.objects.filter(owner=owner, tag=tag, total__gt=0)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs.order_by('day').values_list('day', 'total', 'completed')
+
+
+def finance_rollup_rows(owner, start=None, end=None, tag=''):
+    """Linhas (dia, soma, quantidade) do rollup financeiro do usuário, ordenadas por dia."""
+    from .models import FinanceDailyRollup
+    qs = FinanceDailyRollup.objects.filter(owner=owner, tag=tag, count__gt=0)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs.order_by('day').values_list('day', 'total', 'count')
+
+
+def progress_range(start=None, end=None):
+    """Como no endpoint original de progresso, o intervalo só vale com os dois limites."""
+    return (start, end) if start and end else (None, None)
+
+
+def progress_by_day_from_rollups(owner, start=None, end=None, tag=''):
+    """Mesmo formato de aggregations.progress_by_day, lendo O(dias) linhas de rollup."""
+    return progress_from_rows(task_rollup_rows(owner, *progress_range(start, end), tag))
+
+
+def finance_by_day_from_rollups(owner, start=None, end=None, tag=''):
+    """Mesmo formato de FinanceViewSet.by_day: [{'created_at__date': dia, 'total': soma}]."""
+    return [
+        {'created_at__date': day, 'total': total}
+        for day, total, _ in finance_rollup_rows(owner, start, end, tag)
+    ]
+
+
+# Agregações dos rollups com os mesmos nomes de aggregations.finance_sums
+ROLLUP_FINANCE_SUMS = {'total': Sum('total'), 'income': Sum('income'), 'count': Sum('count')}
+
+
+def _finance_rollups(owner, start, end):
+    from .models import FinanceDailyRollup
+    qs = FinanceDailyRollup.objects.filter(owner=owner, count__gt=0)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs
+
+
+def finance_rollup_buckets(owner, start=None, end=None, tag='', granularity='day'):
+    """Mesmas linhas de aggregations.finance_bucket_rows, somando O(dias) linhas de rollup."""
+    rows = _finance_rollups(owner, start, end).filter(tag=tag).values(bucket=bucket_start('day', granularity))
+    return with_running_balance(rows.annotate(**ROLLUP_FINANCE_SUMS))
+
+
+def finance_rollup_tag_buckets(owner, start=None, end=None, granularity='day'):
+    """Mesmas linhas de aggregations.finance_tag_bucket_rows, pelas linhas de cada tag."""
+    return (
+        _finance_rollups(owner, start, end).exclude(tag='')
+        .values(bucket=bucket_start('day', granularity), tag_name=F('tag'))
+        .annotate(**ROLLUP_FINANCE_SUMS)
+        .order_by('bucket', 'tag_name')
+    )
@@ -0,0 +1,132 @@
+import re
+
+from django.db import connections
+from django.db.backends.sqlite3.base import Database
+from django.db.models import Q
+
+# Busca textual (?q=) indexada sobre tarefas (título e descrição) e finanças (descrição).
+#
+# - PostgreSQL: coluna gerada search_vector (tsvector com stemming em português, título com
+#   peso maior) e índice GIN; ranking por ts_rank_cd.
+# - SQLite: tabela FTS5 "sombra" (<tabela>_fts, external content) mantida por triggers;
+#   ranking por bm25. O FTS5 não tem stemmer para português: usa unicode61 sem acentos
+#   e casamento por prefixo no último termo.
+# - Sem nenhum dos dois (ex.: SQLite compilado sem FTS5) cai para icontains por termo.
+#
+# O índice é criado pela migração 0008_full_text_search com create_search_index(); migrações
+# que recriem as tabelas no SQLite (troca de tipo de coluna etc.) devem chamá-la de novo,
+# porque a recriação da tabela descarta os triggers.
+
+# Tabela -> colunas indexadas (a ordem define os pesos no bm25/setweight)
+SEARCH_COLUMNS = {
+    'tasks_task': ('title', 'description'),
+    'tasks_finance': ('description',),
+}
+# Tabelas do arquivo (tasks/archiving.py): consultadas raramente, sem índice textual (icontains)
+UNINDEXED_COLUMNS = {
+    'tasks_archivedtask': ('title', 'description'),
+    'tasks_archivedfinance': ('description',),
+}
+PG_WEIGHTS = ('A', 'B')
+BM25_WEIGHTS = (10.0, 1.0)
+
+_fts5_support = {}
+
+
+def sqlite_has_fts5(connection):
+    """FTS5 é opção de compilação da biblioteca SQLite, a mesma para todas as conexões do processo.
+
+    Por isso o teste usa um banco em memória próprio, e não o cursor de connection: assim
+    também funciona nas views assíncronas (tasks/async_views.py), fora de sync_to_async.
+    """
+    version = Database.sqlite_version
+    if version not in _fts5_support:
+        probe = Database.connect(':memory:')
+        try:
+            _fts5_support[version] = any(row[0] == 'ENABLE_FTS5' for row in probe.execute('PRAGMA compile_options'))
+        finally:
+            probe.close()
+    return _fts5_support[version]
+
+
+def create_search_index(apps, schema_editor):
+    """Operação de migração (idempotente): cria o índice textual do banco em uso."""
+    connection = schema_editor.connection
+    for table, columns in SEARCH_COLUMNS.items():
+        if connection.vendor == 'postgresql':
+            document = ' || '.join(
+                f"setweight(to_tsvector('portuguese', coalesce({column}, '')), '{weight}')"
+                for column, weight in zip(columns, PG_WEIGHTS)
+            )
+            schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({document}) STORED')
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING GIN (search_vector)')
+        elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+            fts = f'{table}_fts'
+            names = ', '.join(columns)
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            schema_editor.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END')
+            schema_editor.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END")
+            schema_editor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END'
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')") # Indexa as linhas existentes
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    for table in SEARCH_COLUMNS:
+        if connection.vendor == 'postgresql':
+            schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+def search_terms(text):
+    """Palavras da busca, em minúsculas (pontuação e operadores são descartados)."""
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def search(queryset, text):
+    """Filtra o queryset pelos termos de text (todos precisam aparecer) e ordena por relevância."""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if table in UNINDEXED_COLUMNS:
+        return contains_all(queryset, terms, UNINDEXED_COLUMNS[table])
+    columns = SEARCH_COLUMNS[table]
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        return queryset.extra(
+            select={'search_rank': f"ts_rank_cd({table}.search_vector, to_tsquery('portuguese', %s))"}, select_params=[tsquery],
+            where=[f"{table}.search_vector @@ to_tsquery('portuguese', %s)"], params=[tsquery],
+        ).order_by('-search_rank', '-created_at')
+    if connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        fts = f'{table}_fts'
+        match = ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*']) # Prefixo no último termo
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS[:len(columns)])
+        return queryset.extra(
+            select={'search_rank': f'bm25({fts}, {weights})'}, tables=[fts],
+            where=[f'{fts}.rowid = {table}.id', f'{fts} MATCH %s'], params=[match],
+        ).order_by('search_rank', '-created_at') # bm25: menor é mais relevante
+    return contains_all(queryset, terms, columns)
+
+
+def contains_all(queryset, terms, columns):
+    """Sem índice: cada termo precisa aparecer (icontains) em alguma das colunas."""
+    for term in terms:
+        condition = Q()
+        for column in columns:
+            condition |= Q(**{f'{column}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
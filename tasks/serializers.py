@@ -1,14 +1,53 @@
 from rest_framework import serializers
-from .models import Task, Finance
+from rest_framework.reverse import reverse
+from .models import ArchivedFinance, ArchivedTask, Job, Task, Finance
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = '__all__' # Serializa todos os campos do modelo Task
+        exclude = ['normalized_tags', 'content_hash', 'updated_at', 'change_seq', 'owner'] # Serializa todos os campos do modelo Task (tags seguem como texto separado por vírgula)
         # O serializer converte objetos Task em JSON e valida dados recebidos via API
 
 class FinanceSerializer(serializers.ModelSerializer):
+    value = serializers.DecimalField(max_digits=10, decimal_places=2) # Centavos no banco (CentsField), reais com 2 casas na API
+
     class Meta:
         model = Finance
         fields = ['id', 'description', 'value', 'tags', 'created_at']
         # O serializer converte objetos Finance em JSON e valida dados recebidos via API
+
+# Formato de /api/sync/ (tasks/sync.py): o mesmo das listas, mais updated_at.
+# Fica fora das listas e exportações, que pagariam a conversão de mais uma data por linha.
+class TaskSyncSerializer(TaskSerializer):
+    class Meta(TaskSerializer.Meta):
+        exclude = ['normalized_tags', 'content_hash', 'change_seq', 'owner']
+
+class FinanceSyncSerializer(FinanceSerializer):
+    class Meta(FinanceSerializer.Meta):
+        fields = FinanceSerializer.Meta.fields + ['updated_at']
+
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedTask
+        exclude = ['content_hash', 'owner'] # Mesmo formato de TaskSerializer, mais archived_at
+
+class ArchivedFinanceSerializer(serializers.ModelSerializer):
+    value = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        model = ArchivedFinance
+        fields = ['id', 'description', 'value', 'tags', 'created_at', 'archived_at']
+
+class JobSerializer(serializers.ModelSerializer):
+    output = serializers.SerializerMethodField() # URL do arquivo gerado (exportações)
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'params', 'status', 'attempts', 'error', 'result', 'output', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'attempts', 'error', 'result', 'created_at', 'started_at', 'finished_at']
+        # O arquivo fica fora do JSON: consultar o status não relê a exportação inteira
+
+    def get_output(self, job):
+        if job.status != Job.DONE or not job.filename:
+            return None
+        return reverse('job-output', args=[job.pk], request=self.context.get('request'))
@@ -0,0 +1,129 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import user_cache
+from .models import DataVersion, Finance, Task
+from .caching import CHANGE_SEQUENCE, bump_data_version, owner_sequence
+from .rollups import FINANCE_ROLLUP_FIELDS, TASK_ROLLUP_FIELDS, apply_finance_rows, apply_task_rows
+from .sync import PRUNED_SEQUENCE, record_deletions
+from .tagging import sync_tags
+
+# Sinais que mantêm os rollups diários e as tabelas de tags atualizados a cada criação, edição e exclusão.
+# O estado anterior é lido no pre_save para desfazer a contribuição antiga antes de somar a nova.
+# Operações em lote (tasks/bulk.py) desligam os sinais com bulk_maintenance() e aplicam
+# os deltas (e a nova versão dos dados) de todas as linhas de uma vez.
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_maintenance():
+    """Suspende a manutenção por linha; quem usa fica responsável por rollups e tags."""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def _suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def _remember_state(sender, instance, raw, fields):
+    instance._rollup_previous = None
+    if instance.pk and not raw and not _suspended():
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _update_rollups(instance, created, raw, fields, apply_rows):
+    if raw or _suspended():
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = tuple(getattr(instance, field) for field in fields)
+    if previous is None or previous[1] != instance.tags:
+        sync_tags(instance, created) # Mantém o índice de tags em dia
+    if previous == current:
+        return # Nada que afete os rollups mudou
+    if previous:
+        apply_rows([previous], -1)
+    apply_rows([current])
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_state(sender, instance, raw=False, **kwargs):
+    _remember_state(sender, instance, raw, TASK_ROLLUP_FIELDS)
+
+
+@receiver(post_save, sender=Task)
+def update_task_rollups(sender, instance, created=False, raw=False, **kwargs):
+    _update_rollups(instance, created, raw, TASK_ROLLUP_FIELDS, apply_task_rows)
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_from_rollups(sender, instance, **kwargs):
+    if not _suspended():
+        apply_task_rows([tuple(getattr(instance, field) for field in TASK_ROLLUP_FIELDS)], -1)
+
+
+@receiver(pre_save, sender=Finance)
+def remember_finance_state(sender, instance, raw=False, **kwargs):
+    _remember_state(sender, instance, raw, FINANCE_ROLLUP_FIELDS)
+
+
+@receiver(post_save, sender=Finance)
+def update_finance_rollups(sender, instance, created=False, raw=False, **kwargs):
+    _update_rollups(instance, created, raw, FINANCE_ROLLUP_FIELDS, apply_finance_rows)
+
+
+@receiver(post_delete, sender=Finance)
+def remove_finance_from_rollups(sender, instance, **kwargs):
+    if not _suspended():
+        apply_finance_rows([tuple(getattr(instance, field) for field in FINANCE_ROLLUP_FIELDS)], -1)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Finance)
+@receiver(post_delete, sender=Finance)
+def bump_cache_version(sender, instance, raw=False, **kwargs):
+    # Invalida as respostas cacheadas do modelo (ver tasks/caching.py)
+    if not raw and not _suspended():
+        bump_data_version(sender._meta.model_name, owner=instance.owner_id)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Finance)
+def record_tombstone(sender, instance, using=None, **kwargs):
+    # Exclusão visível para /api/sync/ (ver tasks/sync.py); em lote, quem exclui grava os tombstones
+    if not _suspended():
+        record_deletions(sender, [(instance.pk, instance.owner_id)], using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Desativação, troca de senha ou exclusão passam a valer na próxima requisição (ver tasks/authentication.py)
+    user_cache.invalidate(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+USER_COUNTERS = (CHANGE_SEQUENCE, PRUNED_SEQUENCE, 'task', 'finance') # Linhas de DataVersion de cada usuário
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_counters(sender, instance, created, raw=False, using=None, **kwargs):
+    # O contador de alterações (ver tasks/sync.py) e as versões do cache (tasks/caching.py) já existem na primeira escrita
+    if created and not raw:
+        names = (CHANGE_SEQUENCE, 'task', 'finance')
+        DataVersion.objects.using(using).bulk_create([DataVersion(name=owner_sequence(name, instance.pk)) for name in names], ignore_conflicts=True)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_user_counters(sender, instance, using=None, **kwargs):
+    DataVersion.objects.using(using).filter(name__in=[owner_sequence(name, instance.pk) for name in USER_COUNTERS]).delete()
@@ -0,0 +1,162 @@
+import heapq
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Max, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .caching import CHANGE_SEQUENCE, bump_data_version, next_change_seq, owner_sequence
+from .fastpath import compile_row_spec, iter_rows
+from .models import DataVersion, Finance, Task, Tombstone
+from .serializers import FinanceSyncSerializer, TaskSyncSerializer
+
+# Sincronização incremental para o cliente offline (GET /api/sync/?since=<token>).
+#
+# Toda gravação de Task/Finance recebe o próximo número da sequência de alterações do seu
+# dono (change_seq, ver ChangeTrackedMixin e caching.next_change_seq) e toda exclusão vira um
+# Tombstone com o seu número. O token do cliente é o último número já aplicado; a resposta
+# traz, em ordem de sequência e paginadas, as linhas criadas/alteradas e os ids excluídos
+# desde então. Como o número é reservado na mesma transação da escrita (lock na linha do
+# contador do usuário), ler o contador antes das tabelas dá um limite abaixo do qual nada
+# ainda vai aparecer: nenhuma alteração fica para trás entre uma página e outra.
+#
+# Tombstones com mais de SYNC_TOMBSTONE_DAYS dias são descartados (manage.py archive_data);
+# um token anterior ao descarte recebe reset=true e a carga completa, como na primeira vez.
+# Linhas arquivadas (tasks/archiving.py) saem da tabela quente e também viram Tombstone.
+# Cada usuário tem o seu contador (DataVersion 'changes:<id>'), então escritas de usuários
+# diferentes não esperam umas pelas outras; os números só são únicos dentro do mesmo dono,
+# e é só isso que a leitura precisa (índices (owner, change_seq)).
+
+SYNC_MODELS = {
+    'tasks': (Task, TaskSyncSerializer),
+    'finances': (Finance, FinanceSyncSerializer),
+}
+PRUNED_SEQUENCE = 'changes_pruned' # DataVersion 'changes_pruned:<id>': maior change_seq de tombstone já descartado
+
+
+def _by_owner(items, owner_of):
+    """{owner_id: [itens]} em ordem de owner_id (contadores sempre travados na mesma ordem)."""
+    groups = {}
+    for item in items:
+        groups.setdefault(owner_of(item), []).append(item)
+    return dict(sorted(groups.items(), key=lambda group: (group[0] is not None, group[0] or 0)))
+
+
+def stamp_changes(objs, using=None):
+    """Carimba change_seq e updated_at em objetos gravados sem save() (bulk_create, bulk_update, COPY)."""
+    now = timezone.now()
+    for owner, group in _by_owner(objs, lambda obj: obj.owner_id).items():
+        first = next_change_seq(owner, len(group), using)
+        for offset, obj in enumerate(group):
+            obj.change_seq = first + offset
+            obj.updated_at = now
+
+
+def change_stamps(ids, owner, using=None):
+    """Valores de update() que dão a cada id (todos do mesmo dono) o seu próprio change_seq (ids não pode ser vazio)."""
+    first = next_change_seq(owner, len(ids), using)
+    cases = [When(pk=pk, then=Value(first + offset)) for offset, pk in enumerate(ids)]
+    return {'change_seq': Case(*cases, output_field=BigIntegerField()), 'updated_at': timezone.now()}
+
+
+def record_deletions(model, items, using=None):
+    """Grava os tombstones de (id, owner_id) excluídos (chamar na transação da exclusão)."""
+    name = model._meta.model_name
+    tombstones = []
+    for owner, group in _by_owner(items, itemgetter(1)).items():
+        first = next_change_seq(owner, len(group), using)
+        tombstones += [Tombstone(change_seq=first + offset, model=name, object_id=pk, owner_id=owner) for offset, (pk, _) in enumerate(group)]
+    Tombstone.objects.using(using).bulk_create(tombstones)
+
+
+def prune_tombstones(days):
+    """Descarta tombstones com mais de days dias; retorna quantos saíram."""
+    old = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days))
+    horizons = old.values_list('owner').annotate(seq=Max('change_seq')).order_by('owner') # Por usuário: as sequências são independentes
+    deleted = 0
+    with transaction.atomic():
+        for owner, horizon in horizons:
+            name = owner_sequence(PRUNED_SEQUENCE, owner)
+            pruned, _ = DataVersion.objects.get_or_create(name=name)
+            DataVersion.objects.filter(name=name).update(version=max(pruned.version, horizon), updated_at=timezone.now())
+            deleted += Tombstone.objects.filter(owner=owner, change_seq__lte=horizon).delete()[0]
+            bump_data_version('task', 'finance', owner=owner) # Respostas de /api/sync/ em cache podem virar reset
+    return deleted
+
+
+def parse_token(value):
+    """Token de ?since= (vazio = primeira sincronização); erro 400 se inválido."""
+    if value in (None, ''):
+        return 0
+    try:
+        seq = int(value)
+    except ValueError:
+        seq = -1
+    if seq < 0:
+        raise ValidationError({'since': 'Token de sincronização inválido.'})
+    return seq
+
+
+def _stream(model, name, owner, since, watermark, limit):
+    """(change_seq, nome, dict serializado) das até limit + 1 primeiras alterações do usuário numa tabela."""
+    serializer = SYNC_MODELS[name][1]()
+    queryset = model.objects.filter(owner=owner, change_seq__gt=since, change_seq__lte=watermark).order_by('change_seq')[:limit + 1]
+    spec = compile_row_spec(serializer)
+    if spec is None: # Serializer fora do caminho rápido (tasks/fastpath.py)
+        for obj in queryset:
+            yield obj.change_seq, name, serializer.to_representation(obj)
+        return
+    for row in iter_rows(queryset, spec + [('_change_seq', 'change_seq', None)]):
+        yield row.pop('_change_seq'), name, row
+
+
+def _tombstone_stream(owner, since, watermark, limit):
+    tombstones = Tombstone.objects.filter(owner=owner, change_seq__gt=since, change_seq__lte=watermark).order_by('change_seq')
+    for seq, model, object_id in tombstones.values_list('change_seq', 'model', 'object_id')[:limit + 1]:
+        yield seq, 'deleted', (model, object_id)
+
+
+def changes_since(since, limit, owner):
+    """Página de alterações do usuário depois de since, em ordem de change_seq (ver o comentário do módulo)."""
+    sequence, pruned = owner_sequence(CHANGE_SEQUENCE, owner), owner_sequence(PRUNED_SEQUENCE, owner)
+    versions = dict(DataVersion.objects.filter(name__in=[sequence, pruned]).values_list('name', 'version'))
+    watermark = versions.get(sequence, 0)
+    reset = bool(since) and (since < versions.get(pruned, 0) or since > watermark) # Tombstones já descartados, ou token de outro banco
+    if reset:
+        since = 0
+    streams = [_stream(model, name, owner, since, watermark, limit) for name, (model, _) in SYNC_MODELS.items()]
+    if since: # Na carga completa não há o que excluir no cliente
+        streams.append(_tombstone_stream(owner, since, watermark, limit))
+    page = list(islice(heapq.merge(*streams, key=itemgetter(0)), limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    changed = {name: [] for name in SYNC_MODELS}
+    deleted = {name: [] for name in SYNC_MODELS}
+    names = {model._meta.model_name: name for name, (model, _) in SYNC_MODELS.items()}
+    for _, kind, item in page:
+        if kind == 'deleted':
+            deleted[names[item[0]]].append(item[1])
+        else:
+            changed[kind].append(item)
+    return {
+        'since': str(since),
+        'next': str(page[-1][0] if has_more else watermark), # Sem mais páginas, pula direto para o limite lido
+        'has_more': has_more,
+        'reset': reset,
+        **changed,
+        'deleted': deleted,
+    }
+
+
+def sync_page_size(value):
+    """?page_size= de /api/sync/, limitado a API_MAX_PAGE_SIZE."""
+    default = getattr(settings, 'API_SYNC_PAGE_SIZE', 500)
+    try:
+        size = int(value) if value else default
+    except ValueError:
+        size = default
+    return max(1, min(size, getattr(settings, 'API_MAX_PAGE_SIZE', 500)))
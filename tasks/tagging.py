@@ -0,0 +1,39 @@
+# Normalização das tags e sincronização da string "tags" com as tabelas de ligação.
+
+
+def parse_tags(value):
+    """Divide a string de tags separadas por vírgula em uma lista normalizada e sem duplicatas."""
+    tags = []
+    for part in (value or '').split(','):
+        tag = part.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def sync_tags(instance, created=False):
+    """Atualiza normalized_tags (Tag + tabela de ligação) a partir de instance.tags."""
+    from .models import Tag
+    names = parse_tags(instance.tags)
+    if not names and created:
+        return # Item novo sem tags: nada a ligar
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    instance.normalized_tags.set(Tag.objects.filter(name__in=names), through_defaults={'owner_id': instance.owner_id})
+
+
+def sync_tags_bulk(model, items, created=False):
+    """Versão em lote de sync_tags: items é uma lista de (pk, string de tags, owner_id) do mesmo modelo."""
+    from .models import Tag
+    if not items:
+        return
+    through = model._meta.get_field('normalized_tags').remote_field.through
+    fk = model._meta.model_name # 'task' ou 'finance'
+    pairs = [(pk, owner, name) for pk, tags, owner in items for name in parse_tags(tags)]
+    names = {name for _, _, name in pairs}
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True, batch_size=500)
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+    if not created: # Itens recém-criados ainda não têm ligações para remover
+        through.objects.filter(**{f'{fk}__in': [pk for pk, _, _ in items]}).delete()
+    through.objects.bulk_create([through(**{f'{fk}_id': pk, 'tag_id': ids[name], 'owner_id': owner}) for pk, owner, name in pairs], batch_size=1000)
@@ -1,3 +1,1464 @@
-from django.test import TestCase
+import io
+import json
+import sqlite3
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.db import connection, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Sum
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.test.client import AsyncClientHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .aggregations import progress_by_day
+from .authentication import user_cache
+from .caching import get_response_cache
+from .exporting import iter_export
+from . import fastpath, importing, search as search_module
+from .handlers import MiddlewareProfileMixin
+from .filters import day_window, filter_window, local_midnight, view_window
+from .importing import import_records, read_records
+from .instrumentation import registry
+from .management.commands.bench import ProfiledClientHandler
+from .jobs import claim_job, enqueue, prune_jobs, run_job
+from .partitioning import create_partition
+from .models import ArchivedFinance, ArchivedTask, DataVersion, Finance, FinanceDailyRollup, Job, Tag, Task, TaskDailyRollup, Tombstone
+from .serializers import FinanceSerializer, TaskSerializer
+from .replicas import _read_alias, health as replica_health
+from .rollups import rebuild_finance_rollups, rebuild_task_rollups
+from .sync import prune_tombstones
+
+
+def legacy_progress_by_day(queryset):
+    """Implementação original em Python, usada como referência nos testes."""
+    total = defaultdict(int)
+    done = defaultdict(int)
+    for t in queryset:
+        key = timezone.localtime(t.created_at).strftime('%Y-%m-%d')
+        total[key] += 1
+        if t.is_completed:
+            done[key] += 1
+    return {k: done[k] / total[k] if total[k] else 0 for k in total}
+
+
+def default_owner(username='user'):
+    """Usuário dono dos dados criados nos testes (o mesmo autenticado por api_client)."""
+    return get_user_model().objects.get_or_create(username=username)[0]
+
+
+def api_client(username='user'):
+    """Cliente autenticado; limpa o cache de respostas, já que as versões de dados voltam a cada teste."""
+    get_response_cache().clear()
+    client = APIClient()
+    client.force_authenticate(default_owner(username))
+    return client
+
+
+def make_task(created_at, is_completed=False, **kwargs):
+    """Cria uma tarefa forçando o created_at (auto_now_add ignora o valor no create)."""
+    kwargs.setdefault('owner', default_owner())
+    task = Task.objects.create(title=kwargs.pop('title', 'Tarefa'), is_completed=is_completed, **kwargs)
+    Task.objects.filter(pk=task.pk).update(created_at=created_at)
+    return task
+
+
+class ProgressByDayTests(TestCase):
+    # Instantes em UTC próximos à meia-noite local, incluindo as transições
+    # do horário de verão de São Paulo (início 04/11/2018, fim 17/02/2019).
+    INSTANTS = [
+        datetime(2018, 11, 3, 2, 59, tzinfo=dt_timezone.utc), # 02/11 23:59 (-03)
+        datetime(2018, 11, 3, 3, 0, tzinfo=dt_timezone.utc), # 03/11 00:00 (-03)
+        datetime(2018, 11, 4, 2, 59, tzinfo=dt_timezone.utc), # 03/11 23:59 (-03)
+        datetime(2018, 11, 4, 3, 0, tzinfo=dt_timezone.utc), # 04/11 01:00 (-02)
+        datetime(2018, 11, 5, 1, 59, tzinfo=dt_timezone.utc), # 04/11 23:59 (-02)
+        datetime(2018, 11, 5, 2, 0, tzinfo=dt_timezone.utc), # 05/11 00:00 (-02)
+        datetime(2019, 2, 17, 1, 59, tzinfo=dt_timezone.utc), # 16/02 23:59 (-02)
+        datetime(2019, 2, 17, 2, 0, tzinfo=dt_timezone.utc), # 16/02 23:00 (-03)
+        datetime(2019, 2, 17, 2, 59, tzinfo=dt_timezone.utc), # 16/02 23:59 (-03)
+        datetime(2019, 2, 17, 3, 0, tzinfo=dt_timezone.utc), # 17/02 00:00 (-03)
+        datetime(2024, 6, 30, 2, 59, tzinfo=dt_timezone.utc), # 29/06 23:59 (sem horário de verão)
+        datetime(2024, 6, 30, 3, 0, tzinfo=dt_timezone.utc), # 30/06 00:00
+    ]
+
+    def setUp(self):
+        for i, instant in enumerate(self.INSTANTS):
+            make_task(instant, is_completed=i % 3 == 0)
+            make_task(instant + timedelta(seconds=30), is_completed=i % 2 == 0)
+        rebuild_task_rollups() # created_at foi forçado via update(), que não dispara sinais
+
+    def test_matches_legacy_implementation(self):
+        qs = Task.objects.all()
+        self.assertEqual(progress_by_day(qs), legacy_progress_by_day(qs))
+
+    def test_matches_legacy_implementation_with_date_range(self):
+        qs = Task.objects.filter(created_at__date__range=['2018-11-03', '2018-11-04'])
+        result = progress_by_day(qs)
+        self.assertEqual(result, legacy_progress_by_day(qs))
+        self.assertEqual(sorted(result), ['2018-11-03', '2018-11-04'])
+
+    def test_endpoint_returns_same_shape(self):
+        client = api_client()
+        response = client.get('/api/tasks/', {'progress_by_day': '1', 'start': '2019-02-16', 'end': '2019-02-17'})
+        self.assertEqual(response.status_code, 200)
+        expected = legacy_progress_by_day(Task.objects.filter(created_at__date__range=['2019-02-16', '2019-02-17']))
+        self.assertEqual(response.json(), expected)
+
+
+class RollupAssertionsMixin:
+    def snapshot(self):
+        tasks = sorted(TaskDailyRollup.objects.filter(total__gt=0).values_list('day', 'tag', 'total', 'completed'))
+        finances = sorted(FinanceDailyRollup.objects.filter(count__gt=0).values_list('day', 'tag', 'total', 'count'))
+        return tasks, finances
+
+    def assert_rollups_consistent(self):
+        # O estado mantido incrementalmente deve ser igual a uma reconstrução completa
+        incremental = self.snapshot()
+        rebuild_task_rollups()
+        rebuild_finance_rollups()
+        self.assertEqual(incremental, self.snapshot())
+
+
+class DailyRollupTests(RollupAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = api_client()
+
+    def test_task_writes_keep_rollups_in_sync(self):
+        first = Task.objects.create(owner=default_owner(), title='A', tags='casa, Trabalho')
+        second = Task.objects.create(owner=default_owner(), title='B', tags='casa')
+        Task.objects.create(owner=default_owner(), title='C')
+        first.mark_completed()
+        second.tags = 'mercado'
+        second.save()
+        Task.objects.get(title='C').delete()
+        self.assert_rollups_consistent()
+        today = timezone.localdate().isoformat()
+        self.assertEqual(TaskDailyRollup.objects.get(day=today, tag='').total, 2)
+        self.assertEqual(TaskDailyRollup.objects.get(day=today, tag='trabalho').completed, 1)
+        self.assertEqual(TaskDailyRollup.objects.get(day=today, tag='casa').total, 1)
+
+    def test_finance_writes_keep_rollups_in_sync(self):
+        lunch = Finance.objects.create(owner=default_owner(), description='Almoço', value='25.50', tags='comida')
+        Finance.objects.create(owner=default_owner(), description='Uber', value='13.20', tags='transporte')
+        lunch.value = '30.00'
+        lunch.save()
+        Finance.objects.get(description='Uber').delete()
+        self.assert_rollups_consistent()
+
+    def test_progress_endpoint_reads_rollups(self):
+        Task.objects.create(owner=default_owner(), title='A', is_completed=True)
+        Task.objects.create(owner=default_owner(), title='B')
+        today = timezone.localdate().isoformat()
+        with self.assertNumQueries(2): # Versão dos dados (cache) + leitura dos rollups
+            response = self.client.get('/api/tasks/', {'progress_by_day': '1', 'start': today, 'end': today})
+        self.assertEqual(response.json(), {today: 0.5})
+
+    def test_by_day_matches_raw_aggregation(self):
+        Finance.objects.create(owner=default_owner(), description='Almoço', value='25.50', tags='comida')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='comida')
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/api/finances/by_day/', {'start': today, 'end': today})
+        raw = self.client.get('/api/finances/by_day/', {'start': today, 'end': today, 'date': today}) # força a agregação direta
+        self.assertEqual(response.json(), raw.json())
+        self.assertEqual(response.json(), [{'created_at__date': today, 'total': 30.0}])
+
+
+class TagFilterTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        Task.objects.create(owner=default_owner(), title='Revisão', tags='Car, oficina')
+        Task.objects.create(owner=default_owner(), title='Fatura', tags='cartão')
+        Task.objects.create(owner=default_owner(), title='Lavar', tags='car')
+        Finance.objects.create(owner=default_owner(), description='Pneu', value='400.00', tags='car,oficina')
+        Finance.objects.create(owner=default_owner(), description='Anuidade', value='30.00', tags='cartão')
+
+    def titles(self, params):
+        return sorted(t['title'] for t in self.client.get('/api/tasks/', params).json())
+
+    def test_exact_match_instead_of_substring(self):
+        self.assertEqual(self.titles({'tag': 'car'}), ['Lavar', 'Revisão'])
+        descriptions = [f['description'] for f in self.client.get('/api/finances/', {'tag': 'car'}).json()]
+        self.assertEqual(descriptions, ['Pneu'])
+
+    def test_multi_tag_and_or(self):
+        self.assertEqual(self.titles({'tag': 'car,oficina'}), ['Revisão'])
+        self.assertEqual(self.titles({'tag': 'oficina,cartão', 'tag_mode': 'any'}), ['Fatura', 'Revisão'])
+
+    def test_serializer_keeps_comma_separated_format(self):
+        response = self.client.post('/api/tasks/', {'title': 'Nova', 'tags': 'Casa, mercado'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['tags'], 'Casa, mercado')
+        self.assertNotIn('normalized_tags', response.json())
+        task = Task.objects.get(title='Nova')
+        self.assertEqual(sorted(task.normalized_tags.values_list('name', flat=True)), ['casa', 'mercado'])
+        self.client.patch(f'/api/tasks/{task.pk}/', {'tags': 'casa'}, format='json')
+        self.assertEqual(list(task.normalized_tags.values_list('name', flat=True)), ['casa'])
+        self.assertEqual(Tag.objects.filter(name='cartão').count(), 1) # tags compartilhadas entre modelos
+
+
+class DateWindowTests(TestCase):
+    def setUp(self):
+        for instant in ProgressByDayTests.INSTANTS:
+            make_task(instant)
+
+    def ids(self, queryset):
+        return sorted(queryset.values_list('pk', flat=True))
+
+    def test_windows_match_date_lookups(self):
+        # As janelas semiabertas devem selecionar exatamente o mesmo que os lookups __date antigos
+        tasks = Task.objects.all()
+        for day in ['2018-11-03', '2018-11-04', '2019-02-16', '2019-02-17', '2024-06-29']:
+            self.assertEqual(self.ids(filter_window(tasks, view_window('day', day))), self.ids(tasks.filter(created_at__date=day)))
+        self.assertEqual(
+            self.ids(filter_window(tasks, view_window('week', '2018-11-07'))),
+            self.ids(tasks.filter(created_at__date__range=['2018-11-05', '2018-11-11'])),
+        )
+        self.assertEqual(
+            self.ids(filter_window(tasks, view_window('month', '2019-02-10'))),
+            self.ids(tasks.filter(created_at__year=2019, created_at__month=2)),
+        )
+        self.assertEqual(
+            self.ids(filter_window(tasks, day_window('2018-11-03', '2018-11-04'))),
+            self.ids(tasks.filter(created_at__date__range=['2018-11-03', '2018-11-04'])),
+        )
+
+    def test_window_starts_at_local_midnight(self):
+        start, end = view_window('day', '2018-11-04') # Dia em que 00:00 não existe (início do horário de verão)
+        self.assertEqual(start, datetime(2018, 11, 4, 3, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(end, datetime(2018, 11, 5, 2, 0, tzinfo=dt_timezone.utc))
+
+
+class QueryPlanTests(TestCase):
+    """Garante que as consultas por janela de data usam varredura por intervalo em índice."""
+
+    def queries(self):
+        window = day_window('2024-05-01', '2024-05-31')
+        tasks, finances = Task.objects.filter(owner=1), Finance.objects.filter(owner=1) # As views sempre filtram pelo dono
+        return [
+            filter_window(tasks.order_by('-created_at'), window),
+            filter_window(tasks.filter(is_completed=True), window),
+            filter_window(finances, window).values('value'), # Leitura feita pelo Sum('value')
+            filter_window(finances, window).values('created_at__date').annotate(total=Sum('value')),
+        ]
+
+    @skipUnless(connection.vendor == 'sqlite', 'plano específico do SQLite')
+    def test_sqlite_uses_index_range_scans(self):
+        for queryset in self.queries():
+            plan = queryset.explain()
+            self.assertRegex(plan, r'SEARCH tasks_\w+ USING (COVERING )?INDEX \w+ \(owner_id=\? AND (is_completed=\? AND )?created_at>\? AND created_at<\?\)')
+
+    @skipUnless(connection.vendor == 'postgresql', 'plano específico do PostgreSQL')
+    def test_postgresql_uses_index_range_scans(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off') # Tabelas de teste são pequenas demais para o planner preferir índices
+        for queryset in self.queries():
+            plan = queryset.explain()
+            self.assertRegex(plan, r'Index (Only )?Scan|Bitmap Index Scan')
+            self.assertNotIn('Seq Scan', plan)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        base = datetime(2024, 5, 10, 12, 0, tzinfo=dt_timezone.utc)
+        for i in range(7):
+            make_task(base + timedelta(minutes=i // 2), title=f'T{i}') # Pares com o mesmo created_at
+
+    def test_walks_all_pages_in_order_without_duplicates(self):
+        seen = []
+        response = self.client.get('/api/tasks/', {'page_size': 3})
+        while True:
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 3)
+            seen += [t['id'] for t in body['results']]
+            if not body['next']:
+                break
+            response = self.client.get(body['next'])
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_unpaginated_by_default_and_opt_out(self):
+        self.assertEqual(len(self.client.get('/api/tasks/').json()), 7)
+        with self.settings(API_PAGINATE_BY_DEFAULT=True, API_PAGE_SIZE=2):
+            get_response_cache().clear() # A configuração mudou, mas os dados não
+            self.assertEqual(len(self.client.get('/api/tasks/').json()['results']), 2)
+            self.assertEqual(len(self.client.get('/api/tasks/', {'paginate': '0'}).json()), 7)
+
+    def test_page_size_cap_and_invalid_cursor(self):
+        with self.settings(API_MAX_PAGE_SIZE=4):
+            self.assertEqual(len(self.client.get('/api/tasks/', {'page_size': 100}).json()['results']), 4)
+        self.assertEqual(self.client.get('/api/tasks/', {'cursor': 'lixo'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/finances/', {'cursor': 'lixo'}).status_code, 404)
+
+
+class BulkActionTests(RollupAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = api_client()
+
+    def test_bulk_create_tasks_in_few_queries(self):
+        items = [{'title': f'Tarefa {i}', 'tags': 'casa, trabalho' if i % 2 else 'casa'} for i in range(50)]
+        with self.assertNumQueries(10), self.captureOnCommitCallbacks(execute=True): # A versão dos dados sobe depois do commit
+            response = self.client.post('/api/tasks/bulk_create/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['created'] * 50)
+        self.assertEqual(Task.objects.filter(normalized_tags__name='trabalho').count(), 25)
+        self.assert_rollups_consistent()
+
+    def test_bulk_create_is_all_or_nothing(self):
+        response = self.client.post('/api/finances/bulk_create/', {'items': [
+            {'description': 'Almoço', 'value': '25.50'},
+            {'description': 'Sem valor'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['valid', 'invalid'])
+        self.assertFalse(Finance.objects.exists())
+
+    def test_bulk_update_complete_and_delete(self):
+        tasks = [Task.objects.create(owner=default_owner(), title=f'T{i}', tags='casa') for i in range(4)]
+        finance = Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='comida')
+        response = self.client.patch('/api/tasks/bulk_update/', [
+            {'id': tasks[0].pk, 'tags': 'mercado'},
+            {'id': tasks[1].pk, 'title': 'Renomeada'},
+            {'id': 999999, 'title': 'Fantasma'},
+        ], format='json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['updated', 'updated', 'not_found'])
+        self.assertEqual(Task.objects.get(pk=tasks[1].pk).title, 'Renomeada')
+        self.client.patch('/api/finances/bulk_update/', [{'id': finance.pk, 'value': '6.00'}], format='json')
+
+        tasks[2].mark_completed()
+        response = self.client.post('/api/tasks/bulk_complete/', {'ids': [tasks[0].pk, tasks[2].pk, 999999]}, format='json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['completed', 'already_completed', 'not_found'])
+        self.assertIsNotNone(Task.objects.get(pk=tasks[0].pk).completed_at)
+
+        response = self.client.post('/api/tasks/bulk_delete/', {'ids': [tasks[1].pk, tasks[3].pk]}, format='json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['deleted', 'deleted'])
+        self.assertEqual(Task.objects.count(), 2)
+        self.assert_rollups_consistent()
+
+    def test_ids_sent_as_text(self):
+        tasks = [Task.objects.create(owner=default_owner(), title=f'T{i}') for i in range(2)]
+        response = self.client.patch('/api/tasks/bulk_update/', [{'id': str(tasks[0].pk), 'title': 'Texto'}], format='json')
+        self.assertEqual(response.json()['results'], [{'index': 0, 'id': tasks[0].pk, 'status': 'updated', 'data': mock.ANY}])
+        self.assertEqual(Task.objects.get(pk=tasks[0].pk).title, 'Texto')
+        for body in ([{'id': 'doze', 'title': 'X'}], [{'id': 1.5, 'title': 'X'}]):
+            self.assertEqual(self.client.patch('/api/tasks/bulk_update/', body, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/tasks/bulk_delete/', {'ids': [True]}, format='json').status_code, 400)
+        response = self.client.post('/api/tasks/bulk_delete/', {'ids': [str(tasks[1].pk)]}, format='json')
+        self.assertEqual(response.json()['results'], [{'id': tasks[1].pk, 'status': 'deleted'}])
+
+    def test_bulk_limit(self):
+        with self.settings(API_BULK_MAX_ITEMS=2):
+            response = self.client.post('/api/tasks/bulk_delete/', {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        Task.objects.create(owner=default_owner(), title='A')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50')
+
+    def test_repeat_request_hits_cache(self):
+        first = self.client.get('/api/tasks/', {'view': 'month', 'date': timezone.localdate().isoformat()})
+        with self.assertNumQueries(1): # Apenas a leitura da versão dos dados
+            second = self.client.get('/api/tasks/', {'date': timezone.localdate().isoformat(), 'view': 'month'})
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_if_none_match_returns_304_until_data_changes(self):
+        etag = self.client.get('/api/finances/by_day/')['ETag']
+        response = self.client.get('/api/finances/by_day/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        with self.captureOnCommitCallbacks(execute=True): # A versão dos dados sobe no commit da escrita
+            Finance.objects.create(owner=default_owner(), description='Pão', value='8.00')
+        response = self.client.get('/api/finances/by_day/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_writes_invalidate_cached_lists(self):
+        self.assertEqual(len(self.client.get('/api/tasks/').json()), 1)
+        with self.captureOnCommitCallbacks(execute=True): # A versão dos dados sobe no commit da escrita
+            self.client.post('/api/tasks/bulk_create/', [{'title': 'B'}], format='json')
+        self.assertEqual(len(self.client.get('/api/tasks/').json()), 2)
+        task = Task.objects.get(title='A')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/tasks/{task.pk}/', {'title': 'A2'}, format='json')
+        self.assertIn('A2', [t['title'] for t in self.client.get('/api/tasks/').json()])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/bulk_complete/', {'ids': [task.pk]}, format='json')
+        self.assertTrue(self.client.get(f'/api/tasks/{task.pk}/').json()['is_completed'])
+
+    def test_other_users_writes_keep_the_cache(self):
+        response = self.client.get('/api/tasks/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(owner=default_owner('other'), title='De outro')
+            api_client('other').post('/api/finances/bulk_create/', [{'description': 'Outro', 'value': '1.00'}], format='json')
+        with self.assertNumQueries(1): # Só a leitura das versões deste usuário
+            cached = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['Last-Modified'], response['Last-Modified'])
+
+
+class CalendarEndpointTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        Task.objects.create(owner=default_owner(), title='A', tags='casa', is_completed=True)
+        Task.objects.create(owner=default_owner(), title='B')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='casa')
+        Finance.objects.create(owner=default_owner(), description='Pão', value='8.00')
+        self.today = timezone.localdate().isoformat()
+
+    def test_combines_progress_and_finance_in_fixed_queries(self):
+        with self.assertNumQueries(4): # Versões + rollup de tarefas + rollup financeiro + resumo das tarefas
+            response = self.client.get('/api/calendar/', {'start': self.today, 'end': self.today, 'include_tasks': '1'})
+        body = response.json()
+        self.assertEqual(body['days'][self.today], {'tasks': 2, 'completed': 1, 'progress': 0.5, 'finance': 12.5})
+        self.assertEqual(body['totals'], {'tasks': 2, 'completed': 1, 'finance': 12.5, 'finance_count': 2, 'progress': 0.5})
+        self.assertEqual([t['title'] for t in body['tasks']], ['A', 'B'])
+        progress = self.client.get('/api/tasks/', {'progress_by_day': '1', 'start': self.today, 'end': self.today}).json()
+        self.assertEqual(body['days'][self.today]['progress'], progress[self.today])
+
+    def test_single_tag_and_default_month(self):
+        body = self.client.get('/api/calendar/', {'tag': 'casa'}).json()
+        self.assertEqual(body['days'][self.today]['progress'], 1)
+        self.assertEqual(body['totals']['finance'], 4.5)
+        self.assertEqual(body['start'], timezone.localdate().replace(day=1).isoformat())
+        self.assertEqual(self.client.get('/api/calendar/', {'tag': 'a,b'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/calendar/', {'start': 'ontem'}).status_code, 400)
+
+    def test_default_month_is_part_of_the_cache_key(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2026, 9, 30)):
+            september = self.client.get('/api/calendar/')
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2026, 10, 1)):
+            october = self.client.get('/api/calendar/', HTTP_IF_NONE_MATCH=september['ETag'])
+        self.assertEqual(october.status_code, 200) # Sem escritas no meio, mas o mês é outro
+        self.assertEqual((september.json()['start'], october.json()['start']), ('2026-09-01', '2026-10-01'))
+
+    def test_days_without_finances_keep_the_decimal_format(self):
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        make_task(timezone.now() - timedelta(days=1), title='Ontem')
+        rebuild_task_rollups() # make_task grava created_at com update(), sem passar pelos sinais
+        days = self.client.get('/api/calendar/', {'start': yesterday, 'end': self.today}).json()['days']
+        self.assertEqual(type(days[yesterday]['finance']), type(days[self.today]['finance']))
+
+
+class FastListSerializationTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        make_task(datetime(2024, 1, 1, 3, 0, tzinfo=dt_timezone.utc), title='Virada "ano" \u2028 ção', tags='casa')
+        task = Task.objects.create(owner=default_owner(), title='Com\ttab', description='linha\nnova', is_completed=True)
+        task.mark_completed()
+        Finance.objects.create(owner=default_owner(), description='Café ☕', value='4.5', tags='comida')
+        Finance.objects.create(owner=default_owner(), description='Reembolso', value='-10')
+
+    def assert_same_bytes(self, queryset, serializer_class):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(fastpath.render_list(queryset, serializer_class()), expected)
+        with mock.patch.object(fastpath, 'orjson', None): # Sem a dependência opcional
+            self.assertEqual(fastpath.render_list(queryset, serializer_class()), expected)
+
+    def test_byte_for_byte_compatible(self):
+        self.assert_same_bytes(Task.objects.order_by('-created_at'), TaskSerializer)
+        self.assert_same_bytes(Finance.objects.order_by('-created_at'), FinanceSerializer)
+
+    def test_list_endpoints_use_fast_path(self):
+        for url, serializer_class, model in (('/api/tasks/', TaskSerializer, Task), ('/api/finances/', FinanceSerializer, Finance)):
+            response = self.client.get(url)
+            expected = JSONRenderer().render(serializer_class(model.objects.order_by('-created_at'), many=True).data)
+            self.assertEqual(response.content, expected)
+            self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        make_task(datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc), title='Antiga, com vírgula', tags='casa')
+        Task.objects.create(owner=default_owner(), title='Nova', tags='trabalho')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='comida')
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get('/api/tasks/export/', {'tag': 'casa'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,title,description,created_at,completed_at,is_completed,tags')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"Antiga, com vírgula"', lines[1])
+        self.assertIn('2024-05-01T09:00:00-03:00', lines[1])
+
+    def test_ndjson_export_matches_api_format(self):
+        body = self.read(self.client.get('/api/finances/export/', {'output': 'ndjson'}))
+        api = self.client.get('/api/finances/').json()
+        self.assertEqual([json.loads(line) for line in body.splitlines()], api)
+        self.assertEqual(self.client.get('/api/finances/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_date_window_and_command(self):
+        body = self.read(self.client.get('/api/tasks/export/', {'output': 'ndjson', 'start': '2024-05-01', 'end': '2024-05-01'}))
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], ['Antiga, com vírgula'])
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as output:
+            call_command('export_data', 'tasks', '--format', 'ndjson', '--output', output.name, stderr=io.StringIO())
+            titles = [json.loads(line)['title'] for line in open(output.name, encoding='utf-8')]
+        self.assertEqual(titles, ['Antiga, com vírgula', 'Nova'])
+
+
+class ImportTests(RollupAssertionsMixin, TestCase):
+    CSV = (
+        'data;descricao;valor;tags\n'
+        '01/03/2024;Mercado;-1.234,56;casa\n'
+        '2024-03-02;Salário;5000;\n'
+        '2024-03-02;Sem valor;;\n'
+        '01/03/2024;Mercado;-1.234,56;casa\n'
+    )
+    OFX = (
+        'OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKTRANLIST>\n'
+        '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240305120000[-3:BRT]\n<TRNAMT>-42.10\n<FITID>A1\n<MEMO>Padaria\n</STMTTRN>\n'
+        '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240305120000[-3:BRT]\n<TRNAMT>-42.10\n<FITID>A2\n<MEMO>Padaria\n</STMTTRN>\n'
+        '</BANKTRANLIST></OFX>\n'
+    )
+
+    def run_import(self, model, content, file_format, **kwargs):
+        return import_records(model, read_records(io.BytesIO(content.encode()), file_format, **kwargs), default_owner().pk, batch_size=2)
+
+    def test_csv_import_validates_dedupes_and_keeps_rollups(self):
+        report = self.run_import(Finance, self.CSV, 'csv', delimiter=';')
+        self.assertEqual((report.read, report.inserted, report.duplicates, report.invalid), (4, 2, 1, 1))
+        self.assertEqual(report.errors[0]['line'], 3)
+        market = Finance.objects.get(description='Mercado')
+        self.assertEqual(market.value, Decimal('-1234.56'))
+        self.assertEqual(timezone.localtime(market.created_at).date().isoformat(), '2024-03-01')
+        self.assertEqual(list(market.normalized_tags.values_list('name', flat=True)), ['casa'])
+        # Reimportar o mesmo arquivo não duplica nada
+        again = self.run_import(Finance, self.CSV, 'csv', delimiter=';')
+        self.assertEqual((again.inserted, again.duplicates), (0, 3))
+        self.assertEqual(Finance.objects.count(), 2)
+        self.assert_rollups_consistent()
+
+    def test_reimporting_a_dateless_file_adds_nothing(self):
+        content = 'titulo;descricao\nComprar pão;\nLigar para o banco;urgente\n'
+        self.assertEqual(self.run_import(Task, content, 'csv', delimiter=';').inserted, 2)
+        again = self.run_import(Task, content, 'csv', delimiter=';') # created_at é outro agora(), mas o hash não usa
+        self.assertEqual((again.inserted, again.duplicates), (0, 2))
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_ndjson_round_trips_export(self):
+        make_task(datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc), is_completed=True, title='Antiga', tags='casa')
+        rebuild_task_rollups() # make_task grava created_at com update(), sem passar pelos sinais
+        exported = b''.join(iter_export(Task.objects.all(), TaskSerializer(), 'ndjson')).decode()
+        Task.objects.all().delete()
+        report = self.run_import(Task, exported + '{"title": ""}\nnão é json\n', 'ndjson')
+        self.assertEqual((report.inserted, report.invalid), (1, 2))
+        task = Task.objects.get()
+        self.assertEqual((task.title, task.is_completed), ('Antiga', True))
+        self.assertEqual(task.created_at, datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc))
+        self.assert_rollups_consistent()
+
+    def test_ofx_upload_and_command(self):
+        client = api_client()
+        upload = SimpleUploadedFile('extrato.ofx', self.OFX.encode('latin-1'))
+        response = client.post('/api/finances/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['inserted'], 2) # FITIDs diferentes: não são duplicatas
+        self.assertEqual(Finance.objects.filter(created_at=datetime(2024, 3, 5, 15, 0, tzinfo=dt_timezone.utc)).count(), 2)
+        response = client.post('/api/tasks/import/', {'file': SimpleUploadedFile('x.ofx', b'')}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        with tempfile.NamedTemporaryFile('w', suffix='.ofx', encoding='latin-1') as source:
+            source.write(self.OFX)
+            source.flush()
+            stderr = io.StringIO()
+            call_command('import_data', 'finances', source.name, '--owner', 'user', stderr=stderr)
+        self.assertIn('0 inseridas, 2 duplicadas', stderr.getvalue())
+
+    def test_concurrent_import_of_the_same_file(self):
+        # Outra importação grava uma das linhas entre a consulta de duplicatas e o insert
+        records = list(read_records(io.BytesIO(self.CSV.encode()), 'csv', delimiter=';'))
+        stamp_changes, raced = importing.stamp_changes, []
+
+        def concurrent_import(objs):
+            if not raced:
+                raced.append(None) # A importação concorrente passa por aqui também
+                raced[0] = import_records(Finance, records[:1], default_owner().pk).inserted
+            stamp_changes(objs)
+
+        with mock.patch('tasks.importing.stamp_changes', side_effect=concurrent_import):
+            report = import_records(Finance, records, default_owner().pk)
+        self.assertEqual((raced, report.inserted, report.duplicates, report.invalid), ([1], 1, 2, 1))
+        self.assertEqual(sorted(Finance.objects.values_list('description', flat=True)), ['Mercado', 'Salário'])
+        self.assert_rollups_consistent()
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        self.sync = api_client()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(default_owner()).access_token}') # O mesmo usuário, pelo JWT
+        Task.objects.create(owner=default_owner(), title='A', tags='casa', is_completed=True)
+        Task.objects.create(owner=default_owner(), title='B', tags='trabalho')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='casa')
+        Finance.objects.create(owner=default_owner(), description='Pão', value='8.00')
+        self.today = timezone.localdate().isoformat()
+
+    def assertSameJSON(self, path, params):
+        response = self.client.get(f'/api/async/{path}', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(response.content, self.sync.get(f'/api/{path}', params).content)
+
+    def test_matches_sync_endpoints(self):
+        day = {'start': self.today, 'end': self.today}
+        self.assertSameJSON('tasks/', {})
+        self.assertSameJSON('tasks/', {'tag': 'casa', 'view': 'month', 'date': self.today})
+        self.assertSameJSON('tasks/', {'progress_by_day': '1', **day})
+        self.assertSameJSON('tasks/', {'progress_by_day': '1', 'tag': 'casa,trabalho', 'tag_mode': 'any', **day})
+        self.assertSameJSON('finances/by_day/', day)
+        self.assertSameJSON('finances/by_day/', {'date': self.today})
+        self.assertSameJSON('finances/totals/', {'tag': 'casa'})
+        self.assertSameJSON('finances/totals/', {'date': self.today})
+        self.assertSameJSON('calendar/', {**day, 'include_tasks': '1'})
+        self.assertEqual(self.client.get('/api/async/finances/totals/').json(), {'total': 12.5, 'count': 2})
+
+    def test_search_on_fresh_worker(self):
+        # Sem o suporte a FTS5 já detectado: a detecção não pode abrir um cursor síncrono
+        for path, params in (('tasks/', {'q': 'b'}), ('finances/by_day/', {'q': 'cafe'}), ('finances/totals/', {'q': 'pão'})):
+            with mock.patch.dict(search_module._fts5_support, clear=True):
+                self.assertSameJSON(path, params)
+
+    def test_requires_valid_jwt_and_reports_errors(self):
+        self.assertEqual(self.client.get('/api/async/calendar/', {'start': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/async/calendar/', {'tag': 'a,b'}).json(), {'tag': 'O calendário aceita no máximo uma tag.'})
+        anonymous = APIClient().get('/api/async/tasks/')
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(anonymous['WWW-Authenticate'], 'Bearer realm="api"')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalido')
+        self.assertEqual(self.client.get('/api/async/calendar/').status_code, 401)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        registry.reset()
+        Task.objects.create(owner=default_owner(), title='A')
+
+    def test_server_timing_counts_queries(self):
+        response = self.client.get('/api/tasks/', {'page_size': '10'})
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'app', 'total'})
+        # Versões de dados + página de tarefas (a autenticação forçada não consulta o banco)
+        self.assertIn('desc="2 queries"', timing['db'])
+
+    def test_metrics_endpoint_is_admin_only_prometheus(self):
+        self.client.get('/api/tasks/')
+        self.client.get('/api/tasks/')
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+        admin = APIClient()
+        admin.force_authenticate(get_user_model().objects.create_user('admin', is_staff=True))
+        response = admin.get('/api/_metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('daily_manager_request_duration_seconds_count{method="GET",endpoint="task-list"} 2', body)
+        self.assertIn('daily_manager_request_duration_seconds_bucket{method="GET",endpoint="task-list",le="+Inf"} 2', body)
+        self.assertIn('# TYPE daily_manager_db_queries_total counter', body)
+
+    def test_sampled_and_slow_query_logs(self):
+        with self.settings(API_METRICS_LOG_SAMPLE_RATE=1, API_SLOW_QUERY_MS=0.000001):
+            with self.assertLogs('tasks.metrics', 'INFO') as metrics, self.assertLogs('tasks.slow_queries', 'WARNING') as slow:
+                self.client.get('/api/calendar/')
+        entry = json.loads(metrics.records[0].getMessage())
+        self.assertEqual((entry['endpoint'], entry['status'], entry['db_queries']), ('calendar', 200, 3))
+        slow_entries = [json.loads(record.getMessage()) for record in slow.records]
+        self.assertIn('SELECT', slow_entries[0]['sql'])
+        self.assertEqual({entry['endpoint'] for entry in slow_entries}, {'calendar'}) # Rota já resolvida quando a view consulta
+        with self.assertNoLogs('tasks', 'INFO'):
+            self.client.get('/api/calendar/')
+
+
+class SyntheticDataAndBenchTests(RollupAssertionsMixin, TestCase):
+    def seed(self, **options):
+        call_command('seed_synthetic', stdout=io.StringIO(), **{'tasks': 150, 'finances': 80, 'days': 30, 'seed': 7, **options})
+
+    def test_seed_is_reproducible_and_keeps_rollups(self):
+        morning = local_midnight(timezone.localdate()) + timedelta(hours=9) # Horários gerados para mais tarde hoje ficam em agora
+        with mock.patch('django.utils.timezone.now', return_value=morning):
+            self.seed()
+            self.seed()
+        rows = list(Task.objects.order_by('id').values_list('title', 'tags', 'is_completed', 'created_at'))
+        self.assertEqual(len(rows), 300)
+        self.assertEqual(rows[:150], rows[150:])
+        self.assertFalse(Task.objects.filter(created_at__gt=morning).exists())
+        self.assertFalse(Finance.objects.filter(created_at__gt=morning).exists())
+        self.assertFalse(Task.objects.filter(completed_at__lt=F('created_at')).exists())
+        self.assertEqual(Finance.objects.count(), 160)
+        oldest = timezone.localdate() - timedelta(days=29)
+        self.assertFalse(Task.objects.filter(created_at__lt=local_midnight(oldest)).exists())
+        self.assertTrue(Tag.objects.filter(name='trabalho', task_links__isnull=False).exists())
+        self.assert_rollups_consistent()
+
+    def test_bench_records_json_and_fails_over_baseline(self):
+        self.seed(tasks=20, finances=20)
+        options = {'only': ['tasks.progress*', 'finances.create'], 'repeat': 2, 'warmup': 0, 'stdout': io.StringIO()}
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/bench.json'
+            call_command('bench', output=output, no_compare=True, **options)
+            with open(output, encoding='utf-8') as report:
+                results = json.load(report)['results']
+            self.assertEqual(set(results), {'tasks.progress', 'tasks.progress.tag', 'tasks.progress.view', 'finances.create'})
+            self.assertEqual(results['finances.create']['status'], 201)
+            self.assertLessEqual(results['tasks.progress']['p50_ms'], results['tasks.progress']['p99_ms'])
+            self.assertEqual(Finance.objects.count(), 20) # As escritas do benchmark são desfeitas
+            call_command('bench', baseline=output, tolerance=10, **options) # Dentro do próprio baseline
+            results['tasks.progress']['queries'] = 0
+            with open(output, 'w', encoding='utf-8') as report:
+                json.dump({'results': results}, report)
+            with self.assertRaisesMessage(CommandError, 'tasks.progress: 2 consultas (baseline 0)'):
+                call_command('bench', baseline=output, tolerance=10, **options)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        self.budget = Task.objects.create(owner=default_owner(), title='Revisar orçamento', description='planilha anual', tags='trabalho')
+        self.bakery = Task.objects.create(owner=default_owner(), title='Comprar pão', description='padaria da esquina', tags='casa', is_completed=True)
+        self.meeting = Task.objects.create(owner=default_owner(), title='Reunião de equipe', description='levar o orçamento impresso', tags='trabalho')
+        Finance.objects.create(owner=default_owner(), description='Padaria Central', value='-12.00', tags='comida')
+        Finance.objects.create(owner=default_owner(), description='Supermercado', value='-80.00', tags='mercado')
+
+    def titles(self, params):
+        return [task['title'] for task in self.client.get('/api/tasks/', params).json()]
+
+    def test_ranked_accent_insensitive_and_prefix(self):
+        # Título pesa mais que descrição; sem acento e por prefixo também casa
+        self.assertEqual(self.titles({'q': 'orcamento'}), ['Revisar orçamento', 'Reunião de equipe'])
+        self.assertEqual(self.titles({'q': 'padar'}), ['Comprar pão'])
+        self.assertEqual(self.titles({'q': 'orçamento impresso'}), ['Reunião de equipe'])
+        # Operadores do FTS são descartados: só pontuação equivale a não buscar
+        self.assertEqual(len(self.titles({'q': '"*)( -- ^'})), 3)
+        descriptions = [item['description'] for item in self.client.get('/api/finances/', {'q': 'padaria'}).json()]
+        self.assertEqual(descriptions, ['Padaria Central'])
+
+    def test_combines_with_filters_pagination_and_aggregates(self):
+        self.assertEqual(self.titles({'q': 'orcamento', 'tag': 'trabalho', 'view': 'day', 'date': timezone.localdate().isoformat()}), ['Revisar orçamento', 'Reunião de equipe'])
+        self.assertEqual(self.titles({'q': 'orcamento', 'tag': 'casa'}), [])
+        # Páginas seguem o ranking (o título pesa mais), não a data: a reunião é a mais recente
+        page = self.client.get('/api/tasks/', {'q': 'orcamento', 'page_size': '1'}).json()
+        self.assertEqual([task['title'] for task in page['results']], ['Revisar orçamento'])
+        last = self.client.get(page['next']).json()
+        self.assertEqual([task['title'] for task in last['results']], ['Reunião de equipe'])
+        self.assertIsNone(last['next'])
+        today = timezone.localdate().isoformat()
+        progress = self.client.get('/api/tasks/', {'progress_by_day': '1', 'q': 'pão', 'start': today, 'end': today}).json()
+        self.assertEqual(progress, {today: 1.0})
+        self.assertEqual(self.client.get('/api/finances/totals/', {'q': 'padaria'}).json(), {'total': -12.0, 'count': 1})
+        self.assertEqual(self.client.get('/api/finances/by_day/', {'q': 'super'}).json()[0]['total'], -80.0)
+
+    def test_index_follows_writes(self):
+        self.bakery.title = 'Comprar café'
+        self.bakery.save()
+        self.meeting.delete()
+        Task.objects.bulk_create([Task(title='Café com o time', owner=default_owner())])
+        self.assertEqual(self.titles({'q': 'pão'}), [])
+        self.assertEqual(sorted(self.titles({'q': 'cafe'})), ['Café com o time', 'Comprar café'])
+        self.assertEqual(self.titles({'q': 'impresso'}), [])
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.invalidate()
+        self.user = get_user_model().objects.create_user('cached', password='pass')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def user_queries(self, path='/api/tasks/'):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in captured if 'auth_user' in query['sql']]
+
+    def test_user_is_read_once_then_served_from_cache(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+        self.assertEqual(self.user_queries('/api/async/tasks/'), [])
+        with override_settings(API_AUTH_CACHE_TIMEOUT=0):
+            user_cache.invalidate()
+            self.assertEqual(len(self.user_queries()), 1)
+            self.assertEqual(len(self.user_queries()), 1)
+
+    def test_user_changes_invalidate_the_entry(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 401)
+        self.assertEqual(self.client.get('/api/async/tasks/').status_code, 401)
+        self.user.is_active = True
+        self.user.save()
+        self.user_queries()
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+            self.user_queries()
+            self.user.set_password('other')
+            self.user.save()
+            self.assertIsNone(user_cache.get(self.user.pk))
+            self.assertEqual(self.client.get('/api/tasks/').status_code, 401) # Token emitido antes da troca de senha
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.user_queries()
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 401)
+
+    def test_lru_bound(self):
+        with override_settings(API_AUTH_CACHE_MAX_ENTRIES=2):
+            for user_id in (1, 2, 3):
+                user_cache.set(user_id, self.user)
+            self.assertIsNone(user_cache.get(1))
+            self.assertIsNotNone(user_cache.get('3'))
+
+    @override_settings(API_AUTH_STATELESS=True)
+    def test_stateless_mode_trusts_token_claims(self):
+        staff = get_user_model().objects.create_user('staff', password='pass', is_staff=True)
+        token = APIClient().post('/api/token/', {'username': 'staff', 'password': 'pass'}).json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.user_queries(), [])
+        self.assertEqual(self.user_queries('/api/_metrics'), [])
+        self.assertEqual(self.user_queries('/api/async/tasks/'), [])
+        staff.delete() # Sem consulta, a exclusão só vale quando o token expira
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+
+
+class MiddlewareProfileTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('profiled', password='pass')
+        self.authorization = f'Bearer {RefreshToken.for_user(user).access_token}'
+        self.client = Client(HTTP_AUTHORIZATION=self.authorization)
+        self.client.handler = ProfiledClientHandler(enforce_csrf_checks=True)
+
+    def test_api_uses_lean_chain_and_admin_keeps_full_stack(self):
+        response = self.client.post('/api/tasks/', {'title': 'Sem CSRF'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('X-Frame-Options', response) # Clickjacking/sessões/CSRF ficam fora de /api/
+        self.assertIn('X-Content-Type-Options', response)
+        self.assertIn('Server-Timing', response)
+        admin = self.client.get('/admin/login/')
+        self.assertEqual(admin['X-Frame-Options'], 'DENY')
+        self.assertIn('csrftoken', admin.cookies)
+        self.assertEqual(self.client.post('/admin/login/', {'username': 'profiled', 'password': 'pass'}).status_code, 403)
+
+    def test_cors_preflight_is_answered_without_touching_the_view(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.options('/api/tasks/', headers={'Origin': 'http://localhost:3000', 'Access-Control-Request-Method': 'POST'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'http://localhost:3000')
+        self.assertEqual(len(captured), 0)
+
+    @override_settings(API_MIDDLEWARE_PROFILE='full')
+    def test_full_profile_keeps_single_chain(self):
+        self.client.handler = ProfiledClientHandler(enforce_csrf_checks=True)
+        self.assertEqual(self.client.get('/api/tasks/')['X-Frame-Options'], 'DENY')
+
+    async def test_async_chain(self):
+        handler = type('Handler', (MiddlewareProfileMixin, AsyncClientHandler), {})
+        client = AsyncClient()
+        client.handler = handler(enforce_csrf_checks=True)
+        response = await client.get('/api/async/tasks/', headers={'Authorization': self.authorization})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotIn('X-Frame-Options', response)
+
+
+class FinanceSeriesTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        tz = timezone.get_default_timezone()
+        for moment, value, tags in [
+            (datetime(2025, 12, 31, 23, 30), '100.00', 'renda'), # 02:30 de 01/01 em UTC
+            (datetime(2026, 1, 5, 10), '-30.00', 'comida'),
+            (datetime(2026, 1, 20, 12), '-20.00', 'comida, lazer'),
+            (datetime(2026, 2, 2, 9), '50.00', ''),
+            (datetime(2026, 3, 15, 18), '-10.00', 'lazer'),
+        ]:
+            Finance.objects.create(owner=default_owner(), description='Lançamento', value=value, tags=tags, created_at=timezone.make_aware(moment, tz))
+
+    def series(self, **params):
+        response = self.client.get('/api/finances/series/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_monthly_buckets_with_split_and_running_balance(self):
+        data = self.series(granularity='month', start='2026-01-01')
+        self.assertEqual(data['opening_balance'], 100.0)
+        self.assertEqual(data['tz'], 'America/Sao_Paulo')
+        self.assertEqual(data['buckets'], [
+            {'start': '2026-01-01', 'total': -50.0, 'income': 0.0, 'expense': -50.0, 'count': 2, 'balance': 50.0},
+            {'start': '2026-02-01', 'total': 50.0, 'income': 50.0, 'expense': 0.0, 'count': 1, 'balance': 100.0},
+            {'start': '2026-03-01', 'total': -10.0, 'income': 0.0, 'expense': -10.0, 'count': 1, 'balance': 90.0},
+        ])
+        years = self.series(granularity='year')['buckets']
+        self.assertEqual([(bucket['start'], bucket['balance']) for bucket in years], [('2025-01-01', 100.0), ('2026-01-01', 90.0)])
+        weeks = self.series(granularity='week', start='2026-01-01', end='2026-01-31')['buckets']
+        self.assertEqual([bucket['start'] for bucket in weeks], ['2026-01-05', '2026-01-19']) # Segundas-feiras
+
+    def test_timezone_moves_buckets_and_window(self):
+        data = self.series(granularity='month', start='2026-01-01', end='2026-01-31', tz='UTC')
+        self.assertEqual(data['opening_balance'], 0.0)
+        self.assertEqual(data['buckets'][0]['income'], 100.0)
+        self.assertEqual(data['buckets'][0]['count'], 3)
+        response = self.client.get('/api/finances/series/', {'granularity': 'quarter', 'tz': 'America'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/finances/series/', {'tz': 'Marte/Olympus'}).json(), {'tz': 'Fuso horário inválido: Marte/Olympus'})
+
+    def test_tag_breakdown_and_filters(self):
+        january = self.series(granularity='month', start='2026-01-01', end='2026-01-31', breakdown='tags')['buckets'][0]
+        self.assertEqual(january['tags'], {
+            'comida': {'total': -50.0, 'income': 0.0, 'expense': -50.0, 'count': 2},
+            'lazer': {'total': -20.0, 'income': 0.0, 'expense': -20.0, 'count': 1},
+        })
+        # O saldo de abertura vem dos rollups com uma tag e da tabela com várias: mesmos números
+        single = self.series(granularity='month', start='2026-02-01', tag='lazer')
+        multiple = self.series(granularity='month', start='2026-02-01', tag='lazer,inexistente', tag_mode='any')
+        self.assertEqual(single, multiple)
+        self.assertEqual(single['opening_balance'], -20.0)
+        self.assertEqual(single['buckets'][0]['balance'], -30.0)
+
+    def test_rollups_and_rows_agree(self):
+        Finance.objects.get(value=50).delete() # Os sinais mantêm as entradas dos rollups
+        for granularity in ('day', 'week', 'month', 'year'):
+            params = {'granularity': granularity, 'start': '2026-01-01', 'breakdown': 'tags'}
+            with CaptureQueriesContext(connection) as captured:
+                from_rollups = self.series(**params)
+            self.assertFalse(any('"tasks_finance"' in query['sql'] for query in captured))
+            with mock.patch('tasks.views.series_rollup_tag', return_value=None):
+                get_response_cache().clear()
+                self.assertEqual(self.series(**params), from_rollups)
+
+
+class ArchiveTests(RollupAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = api_client()
+        old = timezone.now() - timedelta(days=400)
+        for index, tags in enumerate(['casa', 'casa, trabalho', 'trabalho']):
+            task = make_task(old + timedelta(days=index), is_completed=True, title=f'Antiga {index}', tags=tags)
+            Task.objects.filter(pk=task.pk).update(completed_at=old + timedelta(days=index))
+        make_task(old, title='Antiga pendente', tags='casa') # Pendente: nunca é arquivada
+        make_task(timezone.now() - timedelta(days=1), is_completed=True, title='Recente', tags='casa')
+        Finance.objects.create(owner=default_owner(), description='Aluguel antigo', value='-900.00', tags='casa', created_at=old)
+        Finance.objects.create(owner=default_owner(), description='Mercado', value='-50.00', tags='casa', created_at=timezone.now())
+        rebuild_task_rollups()
+        rebuild_finance_rollups()
+        self.exported = b''.join(iter_export(Task.objects.all(), TaskSerializer(), 'ndjson')).decode()
+        self.progress = self.client.get('/api/tasks/', {'progress_by_day': '1'}).json()
+
+    def archive(self, *args):
+        stdout = io.StringIO()
+        call_command('archive_data', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_hot_paths_only_read_the_working_set(self):
+        self.assertIn('tasks: 3 linhas arquivadas', self.archive('--tasks-days', '180', '--finances-days', '180', '--batch-size', '2'))
+        self.assertEqual(set(ArchivedTask.objects.values_list('title', flat=True)), {'Antiga 0', 'Antiga 1', 'Antiga 2'})
+        self.assertEqual(ArchivedFinance.objects.get().description, 'Aluguel antigo')
+        get_response_cache().clear()
+        with CaptureQueriesContext(connection) as captured:
+            listed = self.client.get('/api/tasks/').json()
+            tagged = self.client.get('/api/tasks/', {'tag': 'trabalho'}).json()
+            progress = self.client.get('/api/tasks/', {'progress_by_day': '1'}).json()
+            totals = self.client.get('/api/finances/totals/').json()
+        self.assertFalse(any('archived' in query['sql'] for query in captured))
+        self.assertEqual({task['title'] for task in listed}, {'Antiga pendente', 'Recente'})
+        self.assertEqual(tagged, [])
+        # O arquivado sai dos rollups, como sai das consultas por linha
+        self.assertEqual(totals, {'total': -50.0, 'count': 1})
+        self.assertEqual(len(self.progress), 4)
+        self.assertEqual(sorted(progress.values()), [0.0, 1.0]) # Restam o dia da pendente antiga e o da recente
+        self.assert_rollups_consistent()
+
+    def test_rollup_and_row_paths_agree_after_archiving(self):
+        self.archive('--tasks-days', '180', '--finances-days', '180')
+        start = (timezone.localdate() - timedelta(days=500)).isoformat()
+        for path, params in (
+            ('/api/tasks/', {'progress_by_day': '1'}),
+            ('/api/tasks/', {'progress_by_day': '1', 'tag': 'casa'}),
+            ('/api/finances/by_day/', {}),
+            ('/api/finances/totals/', {'tag': 'casa'}),
+            ('/api/finances/series/', {'granularity': 'month', 'start': start}),
+        ):
+            get_response_cache().clear()
+            from_rollups = self.client.get(path, params).json()
+            with mock.patch('tasks.views.rollup_tag', return_value=None): # Como com q, view/date ou várias tags
+                get_response_cache().clear()
+                self.assertEqual(self.client.get(path, params).json(), from_rollups, path)
+        # Várias tags (caminho por linha) contra uma tag só (rollups): as mesmas tarefas quentes
+        get_response_cache().clear()
+        multi = self.client.get('/api/tasks/', {'progress_by_day': '1', 'tag': 'casa,trabalho', 'tag_mode': 'any'}).json()
+        self.assertEqual(multi, self.client.get('/api/tasks/', {'progress_by_day': '1', 'tag': 'casa'}).json())
+
+    def import_exported(self):
+        return import_records(Task, read_records(io.BytesIO(self.exported.encode()), 'ndjson'), default_owner().pk)
+
+    def test_archive_endpoints_filters_and_reimport(self):
+        Task.objects.all().delete()
+        self.assertEqual(self.import_exported().inserted, 5) # Importadas, as tarefas ganham content_hash
+        self.archive('--only', 'tasks', '--tasks-days', '180')
+        self.assertEqual(ArchivedFinance.objects.count(), 0)
+        archived = self.client.get('/api/archive/tasks/').json()
+        self.assertEqual([task['title'] for task in archived], ['Antiga 2', 'Antiga 1', 'Antiga 0'])
+        self.assertNotIn('content_hash', archived[0])
+        tagged = self.client.get('/api/archive/tasks/', {'tag': 'casa,trabalho'}).json()
+        self.assertEqual([task['title'] for task in tagged], ['Antiga 1'])
+        tagged = self.client.get('/api/archive/tasks/', {'tag': 'casa,trabalho', 'tag_mode': 'any'}).json()
+        self.assertEqual(len(tagged), 3)
+        self.assertEqual(self.client.get('/api/archive/tasks/', {'q': 'antiga 1'}).json()[0]['title'], 'Antiga 1')
+        first = timezone.localtime(ArchivedTask.objects.get(title='Antiga 0').created_at).date().isoformat()
+        windowed = self.client.get('/api/archive/tasks/', {'start': first, 'end': first}).json()
+        self.assertEqual([task['title'] for task in windowed], ['Antiga 0'])
+        # Reimportar o que já foi arquivado não duplica
+        report = self.import_exported()
+        self.assertEqual((report.inserted, report.duplicates), (0, 5))
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_dry_run_and_disabled_policy(self):
+        output = self.archive('--tasks-days', '180', '--dry-run')
+        self.assertIn('tasks: 3 linhas seriam arquivadas', output)
+        self.assertIn('finances: política desligada', output) # ARCHIVE_FINANCES_AFTER_DAYS = 0
+        self.assertEqual(ArchivedTask.objects.count(), 0)
+        with self.assertRaises(CommandError):
+            self.archive('--batch-size', '0')
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento declarativo exige PostgreSQL')
+    def test_month_window_prunes_partitions(self):
+        call_command('partition_finances', stdout=io.StringIO())
+        lower, upper = day_window('2026-01-01', '2026-01-31')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN SELECT sum(value) FROM tasks_finance WHERE created_at >= %s AND created_at < %s', [lower, upper])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('tasks_finance_y2026m01', plan)
+        self.assertNotIn('tasks_finance_y2026m02', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento declarativo exige PostgreSQL')
+    def test_partitioning_keeps_owner_fk_and_empties_default(self):
+        Finance.objects.create(owner=default_owner(), description='Atual', value='-1.00')
+        call_command('partition_finances', stdout=io.StringIO())
+        # Data além do horizonte cai na DEFAULT; a partição do mês, criada depois, a recebe
+        future = Finance.objects.create(owner=default_owner(), description='Futura', value='-2.00')
+        Finance.objects.filter(pk=future.pk).update(created_at=local_midnight(datetime(2035, 1, 15).date()))
+        with connection.cursor() as cursor:
+            create_partition(cursor, datetime(2035, 1, 1).date())
+            counts = []
+            for table in ('tasks_finance_default', 'tasks_finance_y2035m01'):
+                cursor.execute(f'SELECT count(*) FROM {table}')
+                counts.append(cursor.fetchone()[0])
+            cursor.execute("SELECT confrelid::regclass::text FROM pg_constraint WHERE contype = 'f' AND conrelid = 'tasks_finance'::regclass")
+            references = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(counts, [0, 1])
+        self.assertEqual(references, ['auth_user'])
+        self.assertEqual(Finance.objects.count(), 2)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        self.task = Task.objects.create(owner=default_owner(), title='Primeira', tags='casa')
+        self.finance = Finance.objects.create(owner=default_owner(), description='Mercado', value='-10.00')
+
+    def sync(self, **params):
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_returns_only_changes_and_deletions_since_token(self):
+        first = self.sync()
+        self.assertEqual(([task['title'] for task in first['tasks']], first['finances'][0]['description']), (['Primeira'], 'Mercado'))
+        self.assertEqual((first['has_more'], first['reset'], first['deleted']), (False, False, {'tasks': [], 'finances': []}))
+        token = first['next']
+        unchanged = self.sync(since=token)
+        self.assertEqual((unchanged['tasks'], unchanged['finances'], unchanged['next']), ([], [], token))
+        with self.captureOnCommitCallbacks(execute=True): # Respostas em cache valem até a versão dos dados subir
+            self.client.patch(f'/api/tasks/{self.task.pk}/', {'title': 'Editada'}, format='json')
+            self.client.delete(f'/api/finances/{self.finance.pk}/')
+            other = Task.objects.create(owner=default_owner(), title='Segunda')
+            self.client.post('/api/tasks/bulk_complete/', {'ids': [other.pk]}, format='json')
+        changes = self.sync(since=token)
+        self.assertEqual([task['title'] for task in changes['tasks']], ['Editada', 'Segunda']) # Ordem da última alteração
+        self.assertTrue(changes['tasks'][1]['is_completed'])
+        self.assertGreater(changes['tasks'][0]['updated_at'], first['tasks'][0]['updated_at'])
+        self.assertEqual(changes['deleted'], {'tasks': [], 'finances': [self.finance.pk]})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/bulk_delete/', {'ids': [other.pk]}, format='json')
+        self.assertEqual(self.sync(since=changes['next'])['deleted']['tasks'], [other.pk])
+
+    def test_pages_follow_the_change_sequence(self):
+        self.client.post('/api/finances/bulk_create/', [{'description': f'L{i}', 'value': '1.00'} for i in range(3)], format='json')
+        self.client.patch('/api/tasks/bulk_update/', [{'id': self.task.pk, 'tags': 'trabalho'}], format='json')
+        seen, token = [], None
+        while True:
+            page = self.sync(**({'since': token} if token else {}), page_size=2)
+            seen += [('task', task['id']) for task in page['tasks']] + [('finance', item['id']) for item in page['finances']]
+            token = page['next']
+            if not page['has_more']:
+                break
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 5) # A tarefa editada aparece uma vez, na posição da edição
+        self.assertEqual(seen[-1], ('task', self.task.pk))
+        # Sem alterações, o cliente revalida com o ETag e recebe 304
+        response = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(self.client.get('/api/sync/', {'since': token}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_pruned_tombstones_force_reset(self):
+        token = self.sync()['next']
+        self.task.delete()
+        self.assertEqual(prune_tombstones(0), 1)
+        data = self.sync(since=token)
+        self.assertTrue(data['reset'])
+        self.assertEqual(([item['id'] for item in data['finances']], data['tasks']), ([self.finance.pk], []))
+        self.assertFalse(self.sync(since=data['next'])['reset'])
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'abc'}).status_code, 400)
+
+    def test_each_user_has_its_own_sequence(self):
+        token = self.sync()['next']
+        other = default_owner('other')
+        counters = lambda: dict(DataVersion.objects.filter(name__startswith='changes').values_list('name', 'version'))
+        before = counters()
+        other_task = Task.objects.create(owner=other, title='De outro')
+        api_client('other').post('/api/finances/bulk_create/', [{'description': 'Outro', 'value': '1.00'}], format='json')
+        other_task.delete()
+        after = counters()
+        self.assertEqual({name for name in after if after[name] != before.get(name)}, {f'changes:{other.pk}'}) # Nenhum lock em outro contador
+        self.assertEqual(after[f'changes:{other.pk}'], 3)
+        self.assertEqual(self.sync(since=token)['next'], token)
+        # Números repetidos entre usuários; o descarte usa o horizonte de cada um
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/tasks/{self.task.pk}/')
+        self.assertEqual(set(Tombstone.objects.values_list('change_seq', flat=True)), {3})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(prune_tombstones(0), 2)
+        self.assertEqual(self.sync(since=token)['reset'], True)
+        self.assertEqual(api_client('other').get('/api/sync/', {'since': '3'}).json()['reset'], False)
+
+
+class CompletionAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        tz = timezone.get_default_timezone()
+        january, february = timezone.make_aware(datetime(2026, 1, 10, 12), tz), timezone.make_aware(datetime(2026, 2, 3, 12), tz)
+        for created_at, hours, tags in [
+            (january, 1, 'casa'), (january, 3, 'casa, trabalho'), (january, 10, 'trabalho'), (january, None, 'casa'), (february, 2, 'casa'),
+        ]:
+            task = make_task(created_at, is_completed=hours is not None, tags=tags)
+            if hours is not None:
+                Task.objects.filter(pk=task.pk).update(completed_at=created_at + timedelta(hours=hours))
+        # Tarefas arquivadas também contam (os períodos antigos ficariam só com as pendentes)
+        ArchivedTask.objects.create(owner=default_owner(), id=999, title='Arquivada', created_at=january, completed_at=january + timedelta(hours=5), is_completed=True, tags='casa')
+
+    def analytics(self, **params):
+        response = self.client.get('/api/tasks/analytics/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rates_and_percentiles_per_period_and_tag(self):
+        data = self.analytics()
+        self.assertEqual((data['granularity'], data['overall']['total'], data['overall']['completed']), ('month', 6, 5))
+        january, february = data['periods']
+        self.assertEqual(january['start'], '2026-01-01')
+        self.assertEqual((january['total'], january['completed'], january['completion_rate']), (5, 4, 0.8))
+        # Latências de janeiro: 1h, 3h, 5h, 10h (percentis com interpolação linear, como o percentile_cont)
+        self.assertEqual(january['latency_seconds'], {'p50': 14400.0, 'p90': 30600.0, 'p99': 35460.0, 'mean': 17100.0})
+        self.assertEqual(january['tags']['casa']['latency_seconds']['p50'], 10800.0)
+        self.assertEqual((january['tags']['casa']['total'], january['tags']['trabalho']['completed']), (4, 2))
+        self.assertEqual(february['tags'], {'casa': february['tags']['casa']})
+        self.assertEqual(data['overall']['tags']['casa']['total'], 5)
+
+    def test_filters_and_validation(self):
+        data = self.analytics(tag='trabalho', granularity='year')
+        self.assertEqual((data['overall']['total'], list(data['overall']['tags'])), (2, ['trabalho']))
+        self.assertEqual([period['start'] for period in data['periods']], ['2026-01-01'])
+        february = self.analytics(start='2026-02-01', end='2026-02-28')
+        self.assertEqual((february['overall']['total'], february['overall']['latency_seconds']['p99']), (1, 7200.0))
+        empty = self.analytics(start='2030-01-01')
+        self.assertEqual((empty['periods'], empty['overall']['latency_seconds']['p50']), ([], None))
+        self.assertEqual(self.client.get('/api/tasks/analytics/', {'granularity': 'quarter'}).status_code, 400)
+
+    def test_memoized_per_data_version(self):
+        first = self.analytics()
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.analytics(), first)
+        self.assertFalse(any('tasks_task' in query['sql'] for query in captured))
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(tags='trabalho').get().delete() # Nova versão dos dados: recalcula
+        self.assertEqual(self.analytics()['overall']['total'], 5)
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name)) # Arquivos das exportações
+        make_task(datetime(2024, 5, 1, 12, 0, tzinfo=dt_timezone.utc), is_completed=True, tags='casa')
+        Task.objects.create(owner=default_owner(), title='Nova', tags='trabalho')
+
+    def work(self):
+        call_command('run_worker', '--once', stdout=io.StringIO())
+
+    def test_background_requests_match_direct_responses(self):
+        for path, params in [('/api/tasks/', {'progress_by_day': '1', 'tag': 'casa,trabalho'}), ('/api/tasks/analytics/', {'granularity': 'year'})]:
+            response = self.client.get(path, {**params, 'background': '1'})
+            self.assertEqual((response.status_code, response.json()['status']), (202, 'queued'))
+            location = response['Location']
+            self.work()
+            job = self.client.get(location).json()
+            self.assertEqual((job['status'], job['attempts']), ('done', 1))
+            self.assertEqual(job['result'], self.client.get(path, params).json())
+        self.assertEqual(self.client.get('/api/tasks/analytics/', {'granularity': 'quarter', 'background': '1'}).status_code, 400)
+
+    def test_background_export_and_output(self):
+        response = self.client.get('/api/tasks/export/', {'tag': 'casa', 'background': '1'})
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(response.json()['output'])
+        self.work()
+        job = self.client.get(response['Location']).json()
+        self.assertEqual(job['result']['size'], len(b''.join(self.client.get('/api/tasks/export/', {'tag': 'casa'}).streaming_content)))
+        output = self.client.get(job['output'])
+        self.assertEqual(output['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertTrue(output.streaming) # Lido do storage em blocos, não do banco
+        self.assertEqual(output['Content-Disposition'], f'attachment; filename="{job["result"]["filename"]}"')
+        direct = b''.join(self.client.get('/api/tasks/export/', {'tag': 'casa'}).streaming_content)
+        self.assertEqual(b''.join(output.streaming_content), direct)
+        stored = Job.objects.get(pk=job['id']).output
+        self.assertTrue(stored.storage.exists(stored.name))
+        # Outros usuários não veem o trabalho
+        self.assertEqual(api_client('other').get(response['Location']).status_code, 404)
+        # Trabalhos expirados levam o arquivo junto
+        self.assertEqual(prune_jobs(0), 1)
+        self.assertFalse(stored.storage.exists(stored.name))
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_retries_failures_and_validation(self):
+        job = enqueue('analytics')
+        with mock.patch('tasks.views.completion_analytics', side_effect=RuntimeError('banco fora')), self.assertLogs('tasks.jobs', 'ERROR'):
+            self.assertEqual(run_job(claim_job('w1')).status, Job.QUEUED)
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now()) # Pula a espera da nova tentativa
+            self.assertEqual(run_job(claim_job('w1')).status, Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.error), (2, 'RuntimeError: banco fora'))
+        invalid = enqueue('analytics', {'start': 'ontem'})
+        self.work()
+        invalid.refresh_from_db()
+        self.assertEqual((invalid.status, invalid.attempts), (Job.FAILED, 1)) # Erro nos parâmetros não é repetido
+        self.assertEqual(self.client.post('/api/jobs/', {'kind': 'rebuild_rollups'}, format='json').status_code, 403)
+        self.assertEqual(self.client.post('/api/jobs/', {'kind': 'shell'}, format='json').status_code, 400)
+
+    def test_claims_are_exclusive_and_leases_expire(self):
+        job = enqueue('progress_by_day')
+        self.assertEqual(claim_job('w1').pk, job.pk)
+        self.assertIsNone(claim_job('w2'))
+        # Worker que morreu: depois da concessão, outro worker retoma e o resultado antigo é descartado
+        stale = Job.objects.get(pk=job.pk)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_job('w2').locked_by, 'w2')
+        run_job(stale)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+
+class OwnershipTests(RollupAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = api_client()
+        self.other = api_client('other')
+        self.mine = Task.objects.create(owner=default_owner(), title='Minha', tags='casa', is_completed=True)
+        self.theirs = Task.objects.create(owner=default_owner('other'), title='Dela', tags='casa')
+        Finance.objects.create(owner=default_owner(), description='Café', value='4.50', tags='casa')
+        Finance.objects.create(owner=default_owner('other'), description='Aluguel', value='-900.00', tags='casa')
+        self.today = timezone.localdate().isoformat()
+
+    def test_reads_only_see_own_rows(self):
+        self.assertEqual([task['title'] for task in self.client.get('/api/tasks/', {'tag': 'casa'}).json()], ['Minha'])
+        self.assertEqual(self.client.get(f'/api/tasks/{self.theirs.pk}/').status_code, 404)
+        self.assertEqual(self.client.patch(f'/api/tasks/{self.theirs.pk}/', {'title': 'x'}, format='json').status_code, 404)
+        response = self.client.post('/api/tasks/bulk_complete/', {'ids': [self.theirs.pk]}, format='json')
+        self.assertEqual(response.json()['results'][0]['status'], 'not_found')
+        # Rollups e agregados são por usuário
+        day = {'progress_by_day': '1', 'start': self.today, 'end': self.today}
+        self.assertEqual(self.client.get('/api/tasks/', day).json(), {self.today: 1.0})
+        self.assertEqual(self.other.get('/api/tasks/', day).json(), {self.today: 0.0})
+        self.assertEqual(self.client.get('/api/finances/totals/').json(), {'total': 4.5, 'count': 1})
+        self.assertEqual(self.other.get('/api/calendar/', {'tag': 'casa'}).json()['totals']['finance'], -900.0)
+        sync = self.other.get('/api/sync/').json()
+        self.assertEqual(([task['title'] for task in sync['tasks']], len(sync['finances'])), (['Dela'], 1))
+        self.mine.delete()
+        self.assertEqual(self.other.get('/api/sync/', {'since': sync['next']}).json()['deleted'], {'tasks': [], 'finances': []})
+        self.assert_rollups_consistent()
+
+    def test_writes_and_imports_belong_to_the_user(self):
+        created = self.other.post('/api/tasks/', {'title': 'Nova', 'tags': 'casa'}, format='json').json()
+        self.assertEqual(Task.objects.get(pk=created['id']).owner, default_owner('other'))
+        self.assertNotIn('owner', created)
+        self.other.post('/api/tasks/bulk_create/', [{'title': 'Lote'}], format='json')
+        self.assertEqual(Task.objects.get(title='Lote').owner, default_owner('other'))
+        # O mesmo arquivo importado por dois usuários não é duplicata
+        content = 'data,descricao,valor\n2024-03-01,Mercado,-10.00\n'
+        for client in (self.client, self.other):
+            upload = SimpleUploadedFile('extrato.csv', content.encode())
+            response = client.post('/api/finances/import/', {'file': upload}, format='multipart')
+            self.assertEqual(response.json()['inserted'], 1)
+        self.assertEqual(Finance.objects.filter(description='Mercado').count(), 2)
+        self.assertEqual(self.client.get('/api/tasks/', {'tag': 'casa'}).json()[0]['title'], 'Minha')
+        self.assert_rollups_consistent()
+
+
+class CentsStorageTests(TestCase):
+    def setUp(self):
+        self.client = api_client()
+        for value in ('0.10', '0.20', '-0.29', '99999999.99'):
+            Finance.objects.create(owner=default_owner(), description='Lançamento', value=value, tags='casa')
+
+    def test_stored_as_integer_cents_with_same_api_format(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT value FROM tasks_finance ORDER BY id')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [10, 20, -29, 9999999999])
+        self.assertEqual(Finance.objects.get(value=Decimal('-0.29')).value, Decimal('-0.29'))
+        self.assertEqual(Finance.objects.filter(value__gt=0, value__lt=1).count(), 2)
+        values = [item['value'] for item in self.client.get('/api/finances/').json()]
+        self.assertEqual(values, ['99999999.99', '-0.29', '0.20', '0.10'])
+        created = self.client.post('/api/finances/', {'description': 'Café', 'value': '4.5'}, format='json').json()
+        self.assertEqual(created['value'], '4.50')
+
+    def test_aggregates_are_exact(self):
+        # Somas em inteiros: 0.10 + 0.20 dá 0.30, sem o erro de ponto flutuante do REAL
+        self.assertEqual(Finance.objects.filter(value__gt=0, value__lt=1).aggregate(total=Sum('value'))['total'], Decimal('0.30'))
+        today = timezone.localdate().isoformat()
+        totals = self.client.get('/api/finances/totals/', {'tag': 'casa'}).json()
+        self.assertEqual(totals, {'total': 100000000.0, 'count': 4})
+        self.assertEqual(FinanceDailyRollup.objects.get(tag='').income, Decimal('100000000.29'))
+        raw = self.client.get('/api/finances/by_day/', {'start': today, 'end': today, 'tag': 'casa,outra', 'tag_mode': 'any'}).json()
+        self.assertEqual(raw, self.client.get('/api/finances/by_day/', {'start': today, 'end': today}).json())
+
+
+# TransactionTestCase: as migrações alteram o esquema, o que não cabe na transação do TestCase.
+class CentsMigrationTests(TransactionTestCase):
+    before = [('tasks', '0013_owner_scoping')]
+    after = [('tasks', '0014_finance_cents')]
+    amounts = ['0.29', '-1234.56', '99999999.99', '-99999999.99', '0.01']
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def money(self, apps):
+        Finance, ArchivedFinance, FinanceDailyRollup = (apps.get_model('tasks', name) for name in ('Finance', 'ArchivedFinance', 'FinanceDailyRollup'))
+        return (
+            list(Finance.objects.order_by('id').values_list('value', flat=True)),
+            list(ArchivedFinance.objects.order_by('id').values_list('value', flat=True)),
+            list(FinanceDailyRollup.objects.order_by('day').values_list('total', 'income')),
+        )
+
+    def test_round_trip_is_exact(self):
+        apps = self.migrate(self.before)
+        owner = apps.get_model('auth', 'User').objects.create(username='migracao')
+        day = timezone.localdate()
+        for offset, amount in enumerate(self.amounts):
+            apps.get_model('tasks', 'Finance').objects.create(owner=owner, description='Lançamento', value=amount)
+            apps.get_model('tasks', 'ArchivedFinance').objects.create(id=1000 + offset, owner=owner, description='Antigo', value=amount, created_at=timezone.now())
+            apps.get_model('tasks', 'FinanceDailyRollup').objects.create(owner=owner, day=day - timedelta(days=offset), tag='', total=amount, income=amount.lstrip('-'))
+        original = self.money(apps)
+        self.assertEqual(original[0], [Decimal(amount) for amount in self.amounts])
+        apps = self.migrate(self.after)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT value FROM tasks_finance ORDER BY id')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [29, -123456, 9999999999, -9999999999, 1])
+        self.assertEqual(self.money(apps), original)
+        self.assertEqual(self.money(self.migrate(self.before)), original)
+
+
+# TransactionTestCase: o ReplicaRouter mantém no primário as leituras feitas dentro de
+# transaction.atomic, e o TestCase roda cada teste dentro de uma transação.
+@override_settings(DATABASE_REPLICAS=['replica'], API_CACHE_ENABLED=False)
+class ReadReplicaTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Réplica num arquivo SQLite à parte e outra inacessível; MIRROR: o flush entre testes só limpa o primário
+        directory = tempfile.TemporaryDirectory()
+        cls.replica_path = f'{directory.name}/replica.sqlite3'
+        for alias, name in (('replica', cls.replica_path), ('offline', f'{directory.name}/missing/offline.sqlite3')):
+            connections.settings[alias] = {**connections['default'].settings_dict, 'NAME': name, 'TEST': {'MIRROR': 'default'}}
+        cls.databases = {'default', 'replica', 'offline'} # Aqui, não no corpo da classe: o runner valida os aliases antes de eles existirem
+        super().setUpClass()
+        cls.addClassCleanup(directory.cleanup)
+        for alias in ('replica', 'offline'):
+            cls.addClassCleanup(connections.settings.pop, alias)
+        cls.addClassCleanup(connections.close_all)
+
+    def setUp(self):
+        replica_health.reset()
+        caches['default'].clear() # Marcas de leitura no primário (os ids de usuário se repetem entre testes)
+        self.client = api_client()
+
+    def sync_replica(self):
+        """Copia o primário para a réplica; o que for escrito depois é o "atraso" da replicação."""
+        connections['replica'].close()
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connections['default'].connection.backup(target)
+        finally:
+            target.close()
+
+    def titles(self, client=None):
+        return sorted(task['title'] for task in (client or self.client).get('/api/tasks/').json())
+
+    def test_reads_use_replica_until_the_client_writes(self):
+        make_task(timezone.now(), title='Antiga')
+        Finance.objects.create(owner=default_owner(), description='Mercado', value='10.00')
+        self.sync_replica()
+        late = make_task(timezone.now(), title='Atrasada') # Ainda não chegou na réplica
+        Finance.objects.create(owner=default_owner(), description='Padaria', value='5.00')
+        self.assertEqual(self.titles(), ['Antiga'])
+        self.assertEqual(self.client.get('/api/finances/totals/').json()['count'], 1)
+        self.assertEqual(self.client.get(f'/api/tasks/{late.pk}/').status_code, 200) # Detalhe: primário
+        # A escrita de outro usuário não tira este da réplica
+        other = api_client('outro')
+        other.post('/api/tasks/', {'title': 'Dele'}, format='json')
+        self.assertEqual(self.titles(other), ['Dele'])
+        self.assertEqual(self.titles(), ['Antiga'])
+        self.client.post('/api/tasks/', {'title': 'Recém-criada'}, format='json')
+        self.assertEqual(self.titles(), ['Antiga', 'Atrasada', 'Recém-criada'])
+        self.assertEqual(self.client.get('/api/finances/totals/').json()['count'], 2)
+
+    def test_writes_and_transactions_stay_on_primary(self):
+        token = _read_alias.set('replica')
+        try:
+            self.assertEqual(router.db_for_read(Task), 'replica')
+            self.assertEqual(router.db_for_write(Task), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Task), 'default')
+        finally:
+            _read_alias.reset(token)
+        self.assertEqual(router.db_for_read(Task), 'default')
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        self.sync_replica()
+        make_task(timezone.now(), title='Nova')
+        with override_settings(DATABASE_REPLICAS=['offline']), self.assertLogs('tasks.replicas', 'WARNING'):
+            self.assertEqual(self.titles(), ['Nova'])
+        with override_settings(DATABASE_REPLICAS=['offline', 'replica']):
+            self.assertEqual(self.titles(), []) # Só a réplica saudável é usada
+            # Erro de conexão no meio da requisição: a réplica sai de uso até o próximo teste de saúde
+            with connections['replica'].cursor() as cursor:
+                cursor.execute('DROP TABLE tasks_task')
+            with self.assertLogs('tasks.views', 'ERROR'):
+                self.assertEqual(self.client.get('/api/tasks/').status_code, 500)
+            self.assertEqual(self.titles(), ['Nova'])
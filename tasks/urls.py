@@ -1,10 +1,23 @@
 from django.urls import path
 from rest_framework import routers
-from .views import TaskViewSet, FinanceViewSet
+from .views import ArchivedFinanceViewSet, ArchivedTaskViewSet, TaskViewSet, FinanceViewSet, CalendarView, JobViewSet, MetricsView, SyncView
+from .async_views import AsyncCalendarView, AsyncFinanceByDayView, AsyncFinanceTotalsView, AsyncTaskListView
 
 router = routers.DefaultRouter()
 router.register(r'tasks', TaskViewSet)
 router.register(r'finances', FinanceViewSet, basename='finance')
+router.register(r'archive/tasks', ArchivedTaskViewSet, basename='archived-task') # Camada fria, somente leitura
+router.register(r'archive/finances', ArchivedFinanceViewSet, basename='archived-finance')
+router.register(r'jobs', JobViewSet, basename='job') # Trabalhos em segundo plano (status e resultado)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('calendar/', CalendarView.as_view(), name='calendar'), # Dados agregados do calendário em uma requisição
+    path('sync/', SyncView.as_view(), name='sync'), # Alterações desde o último token do cliente offline
+    path('_metrics', MetricsView.as_view(), name='metrics'), # Métricas Prometheus (somente admin)
+    # Leituras assíncronas (rodam sem bloquear o worker quando servidas via ASGI)
+    path('async/tasks/', AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/finances/by_day/', AsyncFinanceByDayView.as_view(), name='async-finance-by-day'),
+    path('async/finances/totals/', AsyncFinanceTotalsView.as_view(), name='async-finance-totals'),
+    path('async/calendar/', AsyncCalendarView.as_view(), name='async-calendar'),
+]
 # Este arquivo define as rotas da API do app tasks.
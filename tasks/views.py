@@ -1,172 +1,412 @@
 from django.shortcuts import render # Função para renderizar templates HTML
-from rest_framework import generics, viewsets # Views genéricas para API REST
-from .models import Task, Finance # Importa os modelos Task e Finance
-from .serializers import TaskSerializer, FinanceSerializer # Importa os serializers
+from rest_framework import mixins, viewsets # ViewSets da API REST
+from .models import ArchivedFinance, ArchivedTask, Job, Task, Finance # Importa os modelos (e as tabelas de arquivo)
+from .serializers import ArchivedFinanceSerializer, ArchivedTaskSerializer, JobSerializer, TaskSerializer, FinanceSerializer # Importa os serializers
+from .aggregations import GRANULARITIES, finance_bucket_rows, finance_series, finance_sums_by_day, finance_tag_bucket_rows, money, progress_by_day # Agregações feitas no banco
+from .rollups import finance_by_day_from_rollups, finance_rollup_buckets, finance_rollup_rows, finance_rollup_tag_buckets, progress_by_day_from_rollups, task_rollup_rows # Leituras O(dias) nos rollups
+from .filters import day_window, filter_by_tags, filter_window, parse_day, parse_timezone, view_window # Filtros por tag e janelas de data
+from .tagging import parse_tags
+from .search import search # Busca textual indexada (?q=)
+from .archiving import filter_archive_tags # Camada fria (tabelas de arquivo)
+from .analytics import completion_analytics # Tempo até a conclusão (percentis por tag e período)
+from .sync import change_stamps, changes_since, parse_token, sync_page_size # Sincronização incremental (/api/sync/)
+from .pagination import KeysetPagination # Paginação opcional por cursor
+from .bulk import BulkActionsMixin # Ações em lote
+from .caching import bump_data_version, cached_response # Cache de respostas GET com ETag
+from .fastpath import FastListMixin # Serialização rápida das listas
+from .exporting import ExportMixin # Exportação CSV/NDJSON em streaming
+from .importing import ImportMixin # Importação em lotes (CSV/NDJSON/OFX)
+from .jobs import enqueue, enqueue_response, job_params, job_response, wants_background # Fila de trabalhos em segundo plano
+from .instrumentation import InstrumentedViewMixin, registry # Métricas por requisição
+from .replicas import ReplicaReadMixin # Listagens e agregações nas réplicas de leitura
+from .rollups import FINANCE_ROLLUP_FIELDS, TASK_ROLLUP_FIELDS, apply_finance_rows, apply_task_rows
 from django.utils import timezone # Para manipular datas
 from rest_framework.response import Response # Para respostas customizadas
 from rest_framework.decorators import api_view, action # Para views baseadas em função
 from rest_framework.views import APIView
-from django.db.models import Sum
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from django.db import transaction
+from django.db.models import Count, Sum
+from decimal import Decimal
+import logging
+from django.http import FileResponse, HttpResponse
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+logger = logging.getLogger(__name__)
+
 # Aqui ficarão as funções (views) que recebem requisições HTTP e retornam respostas.
 # Exemplo: listar tarefas, criar tarefa, etc.
 # Cada view pode ser uma função ou uma classe.
 
-# View para listar e criar tarefas
-class TaskListCreateView(generics.ListCreateAPIView): # Herda comportamento padrão de listar/criar
-    queryset = Task.objects.all() # Busca todas as tarefas
-    serializer_class = TaskSerializer # Usa o serializer para conversão
+# Os helpers abaixo leem request.GET para servir tanto às views do DRF quanto às
+# views assíncronas de tasks/async_views.py (HttpRequest puro). Todos restringem os dados
+# ao usuário da requisição (request.user): tarefas, lançamentos e rollups têm dono.
+def uses_row_filters(request, *params):
+    """Indica se a requisição usa filtros que os rollups diários não cobrem."""
+    return any(request.GET.get(param) for param in params)
 
-    def get_queryset(self):
-        # Permite filtrar por tag, data, etc, via parâmetros na URL
-        queryset = super().get_queryset()
-        tag = self.request.query_params.get('tag')
-        if tag:
-            queryset = queryset.filter(tags__icontains=tag)
-        # Filtros por data (diário, semanal, mensal)
-        view = self.request.query_params.get('view')
-        date = self.request.query_params.get('date')
-        if view and date:
-            try:
-                ref_date = timezone.datetime.fromisoformat(date)
-            except Exception:
-                ref_date = timezone.now()
-            if view == 'day':
-                queryset = queryset.filter(created_at__date=ref_date.date())
-            elif view == 'week':
-                start = ref_date - timezone.timedelta(days=ref_date.weekday())
-                end = start + timezone.timedelta(days=6)
-                queryset = queryset.filter(created_at__date__range=[start.date(), end.date()])
-            elif view == 'month':
-                queryset = queryset.filter(created_at__year=ref_date.year, created_at__month=ref_date.month)
-        return queryset.order_by('-created_at')
+def rollup_tag(request):
+    """Tag a consultar nos rollups ('' = todas) ou None se houver mais de uma tag no filtro."""
+    tags = parse_tags(request.GET.get('tag'))
+    if len(tags) > 1:
+        return None
+    return tags[0] if tags else ''
 
-    def list(self, request, *args, **kwargs):
-        # Suporte ao progresso diário
-        print('DEBUG: Entrou no método list do TaskViewSet')
-        if request.query_params.get('progress_by_day') == '1':
-            start = request.query_params.get('start')
-            end = request.query_params.get('end')
-            qs = self.get_queryset()
-            from django.utils import timezone
-            if start and end:
-                qs = qs.filter(created_at__date__range=[start, end])
-            # DEBUG: loga as datas locais de criação das tarefas filtradas
-            print('DEBUG tarefas filtradas:', [timezone.localtime(t.created_at) for t in qs])
-            # Agrupa por dia de criação (timezone local)
-            from collections import defaultdict
-            total = defaultdict(int)
-            done = defaultdict(int)
-            for t in qs:
-                key = timezone.localtime(t.created_at).strftime('%Y-%m-%d')
-                total[key] += 1
-                if t.is_completed:
-                    done[key] += 1
-            result = {}
-            for k in total:
-                result[k] = done[k] / total[k] if total[k] else 0
-            return Response(result)
-        return super().list(request, *args, **kwargs)
+def filter_tasks(queryset, request):
+    """Tarefas do usuário com os filtros da lista: busca (q), tag (+ tag_mode) e janela view/date."""
+    queryset = search(queryset.filter(owner=request.user.pk), request.GET.get('q'))
+    tag = request.GET.get('tag')
+    if tag:
+        queryset = filter_by_tags(queryset, tag, request.GET.get('tag_mode'), owner=request.user.pk)
+    view = request.GET.get('view')
+    date = request.GET.get('date')
+    if view and date:
+        queryset = filter_window(queryset, view_window(view, date))
+    return queryset
+
+def filter_finances(queryset, request):
+    """Lançamentos do usuário com os filtros da lista: busca (q), tag (+ tag_mode) e dia (date)."""
+    queryset = search(queryset.filter(owner=request.user.pk), request.GET.get('q'))
+    tag = request.GET.get('tag')
+    date = request.GET.get('date')
+    if tag:
+        queryset = filter_by_tags(queryset, tag, request.GET.get('tag_mode'), owner=request.user.pk)
+    if date:
+        queryset = filter_window(queryset, day_window(date, date))
+    return queryset
+
+def finance_totals_query(request):
+    """(queryset, agregações) da soma e da quantidade de lançamentos em start/end.
+
+    Sem filtros por lançamento (no máximo uma tag), soma os rollups diários em vez da tabela.
+    """
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+    tag = rollup_tag(request)
+    if tag is not None and not uses_row_filters(request, 'date', 'q'):
+        window = (parse_day(start, 'start') if start else None, parse_day(end, 'end') if end else None)
+        return finance_rollup_rows(request.user.pk, *window, tag), {'total': Sum('total'), 'count': Sum('count')}
+    queryset = filter_window(filter_finances(Finance.objects.all(), request), day_window(start, end))
+    return queryset, {'total': Sum('value'), 'count': Count('id')}
 
-# View para detalhes, atualização e exclusão de tarefas individuais
-class TaskDetailView(generics.RetrieveUpdateAPIView): # Herda comportamento padrão de detalhar/atualizar
-    queryset = Task.objects.all() # Busca todas as tarefas
-    serializer_class = TaskSerializer # Usa o serializer para conversão
+def series_params(request, default='day'):
+    """(granularidade, fuso) de /api/finances/series/ e /api/tasks/analytics/; erro 400 se inválidos."""
+    granularity = request.GET.get('granularity') or default
+    if granularity not in GRANULARITIES:
+        raise ValidationError({'granularity': f'Use um de: {", ".join(GRANULARITIES)}.'})
+    return granularity, parse_timezone(request.GET.get('tz'))
+
+def series_rollup_tag(request, tz):
+    """Tag dos rollups que respondem a /api/finances/series/, ou None se a consulta precisar dos lançamentos."""
+    tag = rollup_tag(request)
+    if tag is None or uses_row_filters(request, 'date', 'q') or tz != timezone.get_default_timezone():
+        return None # Os rollups são por dia local de settings.TIME_ZONE, sem filtros por lançamento
+    if tag and request.GET.get('breakdown') == 'tags':
+        return None # As linhas por tag não dizem quais outras tags os lançamentos de uma tag têm
+    return tag
+
+def opening_balance(queryset, start, tz, tag, owner):
+    """Saldo anterior ao primeiro dia da janela (soma de tudo antes de start)."""
+    if not start:
+        return Decimal('0')
+    if tag is not None:
+        rows = finance_rollup_rows(owner, None, parse_day(start, 'start') - timezone.timedelta(days=1), tag)
+        return rows.aggregate(total=Sum('total'))['total'] or Decimal('0')
+    lower, _ = day_window(start, None, tz)
+    return queryset.filter(created_at__lt=lower).aggregate(total=Sum('value'))['total'] or Decimal('0')
+
+def finance_totals(aggregated):
+    """Normaliza o resultado de aggregate() (sem linhas, a soma vem None)."""
+    return {'total': aggregated['total'] or Decimal('0'), 'count': aggregated['count'] or 0}
+
+def task_progress(request):
+    """Resposta de /api/tasks/?progress_by_day=1 (também executada pelo worker, ver tasks/jobs.py)."""
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+    tag = rollup_tag(request)
+    if tag is not None and not uses_row_filters(request, 'view', 'q'):
+        # Sem filtros por tarefa (no máximo uma tag): lê direto dos rollups diários
+        return progress_by_day_from_rollups(request.user.pk, start, end, tag)
+    qs = filter_tasks(Task.objects.all(), request)
+    if start and end:
+        qs = filter_window(qs, day_window(start, end))
+    # Agrupa por dia de criação (timezone local) direto no banco
+    return progress_by_day(qs)
+
+def analytics_params(request):
+    """(janela, granularidade, fuso) de /api/tasks/analytics/; erro 400 se inválidos."""
+    granularity, tz = series_params(request, default='month')
+    return day_window(request.GET.get('start'), request.GET.get('end'), tz), granularity, tz
+
+def task_analytics(request):
+    """Resposta de /api/tasks/analytics/ (também executada pelo worker)."""
+    window, granularity, tz = analytics_params(request)
+    return completion_analytics(request.user.pk, window, request.GET.get('tag'), granularity, tz)
 
 # View para listar, criar, atualizar e excluir entradas financeiras
-class FinanceViewSet(viewsets.ModelViewSet):
+class FinanceViewSet(ReplicaReadMixin, InstrumentedViewMixin, BulkActionsMixin, ExportMixin, ImportMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Finance.objects.all().order_by('-created_at')
     serializer_class = FinanceSerializer
+    pagination_class = KeysetPagination
+    rollup_fields = FINANCE_ROLLUP_FIELDS
+    apply_rollup_rows = staticmethod(apply_finance_rows)
+    cache_models = ('finance',) # Versões de dados que invalidam o cache das respostas GET
+    replica_actions = ('list', 'by_day', 'totals', 'series') # GETs que podem ler de uma réplica
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        tag = self.request.query_params.get('tag')
-        date = self.request.query_params.get('date')
-        if tag:
-            queryset = queryset.filter(tags__icontains=tag)
-        if date:
-            queryset = queryset.filter(created_at__date=date)
-        return queryset
+        return filter_finances(super().get_queryset(), self.request)
+
+    def perform_create(self, serializer):
+        serializer.save(owner_id=self.request.user.pk)
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
+    @cached_response
     def by_day(self, request):
         # Retorna soma dos valores por dia
         start = request.query_params.get('start')
         end = request.query_params.get('end')
+        tag = rollup_tag(request)
+        if tag is not None and not uses_row_filters(request, 'date', 'q'):
+            # Sem filtros por lançamento (no máximo uma tag): lê direto dos rollups diários
+            return Response(finance_by_day_from_rollups(request.user.pk, start, end, tag))
         qs = self.get_queryset()
-        if start:
-            qs = qs.filter(created_at__date__gte=start)
-        if end:
-            qs = qs.filter(created_at__date__lte=end)
-        data = (
-            qs.values('created_at__date')
-            .annotate(total=Sum('value'))
-            .order_by('created_at__date')
-        )
-        return Response(data)
+        qs = filter_window(qs, day_window(start, end))
+        return Response(finance_sums_by_day(qs))
+
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def totals(self, request):
+        """Soma e quantidade de lançamentos no período (start/end), com os filtros da lista."""
+        queryset, aggregates = finance_totals_query(request)
+        return Response(finance_totals(queryset.aggregate(**aggregates)))
+
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def series(self, request):
+        """Saldo, entradas e saídas por período (granularity=day|week|month|year, no fuso tz).
+
+        Cada período traz o saldo acumulado (balance), que parte do saldo anterior a start;
+        breakdown=tags acrescenta os mesmos números por tag. Aceita os filtros da lista.
+        """
+        granularity, tz = series_params(request)
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        breakdown = request.query_params.get('breakdown') == 'tags'
+        tag = series_rollup_tag(request, tz)
+        queryset = self.get_queryset()
+        opening = opening_balance(queryset, start, tz, tag, request.user.pk)
+        if tag is not None:
+            # Sem filtros por lançamento e no fuso padrão: soma os rollups diários (O(dias))
+            window = (parse_day(start, 'start') if start else None, parse_day(end, 'end') if end else None)
+            rows = finance_rollup_buckets(request.user.pk, *window, tag, granularity)
+            tag_rows = finance_rollup_tag_buckets(request.user.pk, *window, granularity) if breakdown else None
+        else:
+            window = filter_window(queryset, day_window(start, end, tz))
+            rows = finance_bucket_rows(window, granularity, tz)
+            tag_rows = finance_tag_bucket_rows(window, granularity, tz) if breakdown else None
+        return Response({
+            'granularity': granularity, 'tz': str(tz), 'opening_balance': money(opening),
+            'buckets': finance_series(rows, opening, tag_rows),
+        })
 
 # ViewSet para tarefas, permitindo listagem, criação, atualização e exclusão
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ReplicaReadMixin, InstrumentedViewMixin, BulkActionsMixin, ExportMixin, ImportMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all().order_by('-created_at')
     serializer_class = TaskSerializer
+    pagination_class = KeysetPagination
+    rollup_fields = TASK_ROLLUP_FIELDS
+    apply_rollup_rows = staticmethod(apply_task_rows)
+    cache_models = ('task',) # Versões de dados que invalidam o cache das respostas GET
+    replica_actions = ('list', 'analytics') # GETs que podem ler de uma réplica
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        tag = self.request.query_params.get('tag')
-        if tag:
-            queryset = queryset.filter(tags__icontains=tag)
-        view = self.request.query_params.get('view')
-        date = self.request.query_params.get('date')
-        if view and date:
-            try:
-                ref_date = timezone.datetime.fromisoformat(date)
-            except Exception:
-                ref_date = timezone.now()
-            if view == 'day':
-                queryset = queryset.filter(created_at__date=ref_date.date())
-            elif view == 'week':
-                start = ref_date - timezone.timedelta(days=ref_date.weekday())
-                end = start + timezone.timedelta(days=6)
-                queryset = queryset.filter(created_at__date__range=[start.date(), end.date()])
-            elif view == 'month':
-                queryset = queryset.filter(created_at__year=ref_date.year, created_at__month=ref_date.month)
-        return queryset
+        return filter_tasks(super().get_queryset(), self.request)
+
+    def perform_create(self, serializer):
+        serializer.save(owner_id=self.request.user.pk)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
+    @cached_response
     def list(self, request, *args, **kwargs):
-        # Log amigável para produção
-        print(f'[TaskViewSet] list chamada por: {request.user} | params: {request.query_params}')
         try:
             # Suporte ao progresso diário
             if request.query_params.get('progress_by_day') == '1':
-                start = request.query_params.get('start')
-                end = request.query_params.get('end')
-                qs = self.get_queryset()
-                from django.utils import timezone
-                if start and end:
-                    qs = qs.filter(created_at__date__range=[start, end])
-                # Agrupa por dia de criação (timezone local)
-                from collections import defaultdict
-                total = defaultdict(int)
-                done = defaultdict(int)
-                for t in qs:
-                    key = timezone.localtime(t.created_at).strftime('%Y-%m-%d')
-                    total[key] += 1
-                    if t.is_completed:
-                        done[key] += 1
-                result = {}
-                for k in total:
-                    result[k] = done[k] / total[k] if total[k] else 0
+                if wants_background(request): # Histórico grande: calcula no worker (tasks/jobs.py)
+                    return enqueue_response(request, 'progress_by_day', job_params(request))
                 # Garante retorno 200 com objeto vazio se não houver dados
-                return Response(result, status=200)
+                return Response(task_progress(request), status=200)
             # Caso padrão: lista tarefas normalmente
             return super().list(request, *args, **kwargs)
-        except Exception as e:
-            # Loga erro para debug online
-            print(f'[TaskViewSet] ERRO: {e}')
+        except APIException:
+            raise # Erros da API (ex.: cursor ou data inválidos) seguem com o status próprio
+        except Exception:
+            # Loga o erro com traceback (tempos e parâmetros ficam na instrumentação, ver tasks/instrumentation.py)
+            logger.exception('Erro ao listar tarefas')
             return Response({'detail': 'Erro ao processar requisição.'}, status=500)
 
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def analytics(self, request):
+        """GET /api/tasks/analytics/?[start=][&end=][&granularity=month][&tz=][&tag=]
+
+        Taxa de conclusão e percentis do tempo até a conclusão, no total e por período de
+        criação, com a quebra por tag (ver tasks/analytics.py). Com background=1, responde 202
+        e o cálculo roda no worker (ver tasks/jobs.py).
+        """
+        if wants_background(request):
+            analytics_params(request) # Parâmetros inválidos respondem 400 na hora, não no worker
+            return enqueue_response(request, 'analytics', job_params(request))
+        return Response(task_analytics(request))
+
+    @action(detail=False, methods=['post'])
+    def bulk_complete(self, request):
+        """Conclui várias tarefas com um único update() filtrado."""
+        ids = self.get_bulk_ids(request)
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(pk__in=ids)
+            rows = {pk: (created_at, tags, done, owner) for pk, created_at, tags, done, owner in queryset.select_for_update().values_list('pk', *TASK_ROLLUP_FIELDS)}
+            pending = [pk for pk, (_, _, done, _) in rows.items() if not done]
+            if pending:
+                Task.objects.filter(pk__in=pending).update(is_completed=True, completed_at=timezone.now(), **change_stamps(pending, request.user.pk))
+                apply_task_rows([rows[pk] for pk in pending], -1) # Sai como pendente...
+                apply_task_rows([(*rows[pk][:2], True, rows[pk][3]) for pk in pending]) # ...e entra como concluída
+                bump_data_version('task', owner=request.user.pk)
+        statuses = {pk: 'completed' if pk in pending else 'already_completed' for pk in rows}
+        return Response({'results': [{'id': pk, 'status': statuses.get(pk, 'not_found')} for pk in ids]})
+
+# Dados do calendário (progresso das tarefas, gastos por dia e totais) em uma única requisição.
+# As funções abaixo são compartilhadas com a versão assíncrona (tasks/async_views.py).
+def calendar_params(request):
+    """(start, end, tag) de /calendar/; sem start/end, usa o mês atual."""
+    today = timezone.localdate()
+    start = parse_day(request.GET.get('start') or today.replace(day=1), 'start')
+    end = request.GET.get('end')
+    end = parse_day(end, 'end') if end else (start.replace(day=28) + timezone.timedelta(days=4)).replace(day=1) - timezone.timedelta(days=1)
+    tag = parse_tags(request.GET.get('tag'))
+    if len(tag) > 1:
+        raise ValidationError({'tag': 'O calendário aceita no máximo uma tag.'})
+    return start, end, tag[0] if tag else ''
+
+def calendar_tasks(owner, start, end, tag):
+    """Resumo das tarefas do usuário no período (include_tasks=1)."""
+    tasks = filter_window(Task.objects.filter(owner=owner), day_window(start, end))
+    if tag:
+        tasks = filter_by_tags(tasks, tag, owner=owner)
+    return tasks.order_by('created_at').values('id', 'title', 'is_completed', 'created_at')
+
+def build_calendar(start, end, task_rows, finance_rows):
+    """Monta a resposta a partir das linhas dos rollups de tarefas e de finanças."""
+    days = {}
+    totals = {'tasks': 0, 'completed': 0, 'finance': Decimal('0'), 'finance_count': 0}
+    for day, total, completed in task_rows:
+        entry = days.setdefault(day.isoformat(), {'tasks': 0, 'completed': 0, 'progress': 0, 'finance': Decimal('0')})
+        entry.update(tasks=total, completed=completed, progress=completed / total)
+        totals['tasks'] += total
+        totals['completed'] += completed
+    for day, value, count in finance_rows:
+        entry = days.setdefault(day.isoformat(), {'tasks': 0, 'completed': 0, 'progress': 0, 'finance': Decimal('0')})
+        entry['finance'] = value
+        totals['finance'] += value
+        totals['finance_count'] += count
+    totals['progress'] = totals['completed'] / totals['tasks'] if totals['tasks'] else 0
+    return {'start': start, 'end': end, 'days': dict(sorted(days.items())), 'totals': totals}
+
+# Leitura sob demanda das tabelas de arquivo (ver tasks/archiving.py): busca (q),
+# tag (+ tag_mode) e janela start/end, com a mesma paginação opcional das listas.
+class ArchiveViewSet(InstrumentedViewMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = search(super().get_queryset().filter(owner=self.request.user.pk), self.request.query_params.get('q'))
+        queryset = filter_archive_tags(queryset, self.request.query_params.get('tag'), self.request.query_params.get('tag_mode'))
+        return filter_window(queryset, day_window(self.request.query_params.get('start'), self.request.query_params.get('end')))
+
+class ArchivedTaskViewSet(ArchiveViewSet):
+    queryset = ArchivedTask.objects.all().order_by('-created_at')
+    serializer_class = ArchivedTaskSerializer
+
+class ArchivedFinanceViewSet(ArchiveViewSet):
+    queryset = ArchivedFinance.objects.all().order_by('-created_at')
+    serializer_class = ArchivedFinanceSerializer
+
+class CalendarView(InstrumentedViewMixin, APIView):
+    cache_models = ('task', 'finance')
+
+    def cache_key_parts(self, request):
+        # Sem start/end, o período é o mês atual: a chave (e o ETag) muda na virada do mês
+        return calendar_params(request)[:2]
+
+    @cached_response
+    def get(self, request):
+        """GET /api/calendar/?start=&end=[&tag=][&include_tasks=1]
+
+        Lê os rollups diários (uma consulta para tarefas, outra para finanças) e,
+        se pedido, um resumo das tarefas do período (mais uma consulta).
+        Sem start/end, usa o mês atual.
+        """
+        start, end, tag = calendar_params(request)
+        data = build_calendar(start, end, task_rollup_rows(request.user.pk, start, end, tag), finance_rollup_rows(request.user.pk, start, end, tag))
+        if request.query_params.get('include_tasks') == '1':
+            data['tasks'] = list(calendar_tasks(request.user.pk, start, end, tag))
+        return Response(data)
+
+class SyncView(InstrumentedViewMixin, APIView):
+    cache_models = ('task', 'finance') # Toda escrita (tombstones e carimbos incluídos) sobe a versão dos dados no commit
+
+    @cached_response
+    def get(self, request):
+        """GET /api/sync/?since=<token>[&page_size=]
+
+        Tarefas e lançamentos criados ou alterados e ids excluídos desde o token, em ordem de
+        alteração. Repita com since=next enquanto has_more; com reset=true o cliente descarta
+        o cache local e aplica a carga completa (ver tasks/sync.py).
+        """
+        since = parse_token(request.query_params.get('since'))
+        return Response(changes_since(since, sync_page_size(request.query_params.get('page_size')), request.user.pk))
+
+# Fila de trabalhos em segundo plano (ver tasks/jobs.py); cada usuário vê só os seus.
+class JobViewSet(InstrumentedViewMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    queryset = Job.objects.order_by('-created_at')
+    serializer_class = JobSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user.pk)
+
+    def create(self, request, *args, **kwargs):
+        """POST /api/jobs/ {"kind": ..., "params": {...}}: enfileira e responde 202 com Location."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(serializer.validated_data['kind'], serializer.validated_data.get('params'), request.user)
+        return job_response(request, job)
+
+    @action(detail=True, methods=['get'])
+    def output(self, request, pk=None):
+        """Arquivo gerado por um trabalho de exportação concluído."""
+        job = self.get_queryset().filter(pk=pk).first()
+        if job is None or job.status != Job.DONE or not job.output:
+            raise NotFound('Arquivo não disponível.')
+        return FileResponse(job.output.open('rb'), as_attachment=True, filename=job.filename, content_type=job.content_type) # Em streaming, em blocos
+
+# Métricas em formato Prometheus (somente administradores)
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Permitir acesso público ao endpoint de login
 class PublicTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]